@@ -0,0 +1,227 @@
+import json
+import threading
+import time
+import traceback
+from collections import deque
+
+from lazy_imports import lazy_import
+
+websocket = lazy_import('websocket')
+
+USER_STREAM_URL = "wss://stream.binance.com:9443/ws/{}"
+
+
+class AccountState:
+    """In-memory account snapshot kept current by the user-data stream
+
+    One REST snapshot (GET /api/v3/account) is loaded on first use and
+    balances are then updated from the user-data websocket:
+    outboundAccountPosition replaces the balances of the assets it lists
+    and balanceUpdate applies deposits and withdrawals. Reads are lookups
+    in memory.
+
+    While the stream is down the snapshot is refreshed over REST, at most
+    once per `rest_interval` seconds, and the stream is reconnected with a
+    growing delay.
+
+    Args:
+        client: binance.client.Client
+        rest_interval (float): Minimum seconds between REST refreshes
+        keepalive_interval (float): Seconds between listen key keepalives,
+            Binance expires an idle key after 60 minutes
+    """
+
+    def __init__(self, client, rest_interval=30.0, keepalive_interval=30 * 60):
+        self.client = client
+        self.rest_interval = rest_interval
+        self.keepalive_interval = keepalive_interval
+
+        self.balances = {}  # Asset -> (free, locked)
+        self.commission_rates = {}
+        self.can_trade = False
+        self.executions = deque(maxlen=100)  # Latest executionReport events
+        self.rest_calls = 0
+        self.stream_events = 0
+
+        self._snapshot_time = None  # monotonic time of the last REST snapshot
+        self._stale = True
+        self._forced = False  # Set by invalidate(), refreshes without waiting for rest_interval
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+        self._ws = None
+        self._listen_key = None
+        self._live = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    # Reads
+
+    def balance(self, asset):
+        """Free balance of an asset"""
+        self._ensure_current()
+        with self._lock:
+            return self.balances.get(asset, (0.0, 0.0))[0]
+
+    def locked(self, asset):
+        """Balance of an asset held by open orders"""
+        self._ensure_current()
+        with self._lock:
+            return self.balances.get(asset, (0.0, 0.0))[1]
+
+    def maker_commission(self):
+        self._ensure_current()
+        with self._lock:
+            return self.commission_rates.get('maker')
+
+    def trading_allowed(self):
+        self._ensure_current()
+        with self._lock:
+            return self.can_trade
+
+    @property
+    def live(self):
+        """Whether the user-data stream is connected"""
+        return self._live
+
+    def invalidate(self):
+        """Refresh the snapshot on the next read unless the stream is live
+
+        Used after an order: while the stream is down the next read loads a
+        new snapshot right away instead of waiting for rest_interval.
+        """
+        with self._lock:
+            self._stale = True
+            self._forced = True
+
+    # Snapshot
+
+    def _ensure_current(self):
+        if self._thread is None:
+            self.start()
+        with self._lock:
+            needs_refresh = self._snapshot_time is None or (self._stale and not self._live)
+            # Only periodic staleness waits for rest_interval, an explicit invalidation does not
+            due = (self._snapshot_time is None or self._forced
+                   or time.monotonic() - self._snapshot_time >= self.rest_interval)
+        if needs_refresh and due:
+            self.refresh()
+
+    def refresh(self):
+        """Load a REST snapshot; concurrent callers share one request"""
+        if not self._refresh_lock.acquire(blocking=False):
+            # Another thread is refreshing, wait for its result
+            with self._refresh_lock:
+                return
+        try:
+            account = self.client.get_account()
+            self.rest_calls += 1
+            with self._lock:
+                self.balances = {
+                    b['asset']: (float(b['free']), float(b['locked'])) for b in account['balances']
+                }
+                self.commission_rates = dict(account.get('commissionRates', {}))
+                self.can_trade = bool(account.get('canTrade', False))
+                self._snapshot_time = time.monotonic()
+                self._stale = False
+                self._forced = False
+        finally:
+            self._refresh_lock.release()
+
+    # User-data stream
+
+    def start(self):
+        """Connect the user-data stream on a daemon thread"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="account-stream", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        ws = self._ws
+        if ws is not None:
+            ws.close()
+        if self._thread is not None:
+            self._thread.join(5)
+            self._thread = None
+        if self._listen_key is not None:
+            try:
+                self.client.stream_close(self._listen_key)
+            except Exception:
+                pass
+            self._listen_key = None
+
+    def _run(self):
+        delay = 1.0
+        while not self._stop.is_set():
+            try:
+                self._listen_key = self.client.stream_get_listen_key()
+                self._ws = websocket.WebSocketApp(
+                    USER_STREAM_URL.format(self._listen_key),
+                    on_open=lambda ws: self._on_open(),
+                    on_message=lambda ws, message: self.on_message(message),
+                    on_error=lambda ws, error: print(f"Account stream error: {error}"),
+                )
+                keepalive = threading.Thread(target=self._keepalive, args=(self._listen_key,), daemon=True)
+                keepalive.start()
+                started = time.monotonic()
+                self._ws.run_forever(ping_interval=60, ping_timeout=20)
+                if time.monotonic() - started > 60:
+                    delay = 1.0
+            except Exception as e:
+                print(f"Account stream failed: {e}")
+            finally:
+                self._live = False
+                with self._lock:
+                    self._stale = True
+            # Readers fall back to REST until the stream is back
+            self._stop.wait(delay)
+            delay = min(delay * 2, 60.0)
+
+    def _on_open(self):
+        # Changes between the snapshot and the subscription are covered by
+        # refreshing once the stream is live
+        self._live = True
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"Account snapshot failed: {e}")
+            traceback.print_exc()
+
+    def _keepalive(self, listen_key):
+        while not self._stop.wait(self.keepalive_interval):
+            if listen_key != self._listen_key or not self._live:
+                return
+            try:
+                self.client.stream_keepalive(listen_key)
+            except Exception as e:
+                print(f"Listen key keepalive failed: {e}")
+
+    def on_message(self, message):
+        """Apply one user-data stream event"""
+        event = json.loads(message) if isinstance(message, str) else message
+        kind = event.get('e')
+        with self._lock:
+            self.stream_events += 1
+            if kind == 'outboundAccountPosition':
+                for b in event.get('B', []):
+                    self.balances[b['a']] = (float(b['f']), float(b['l']))
+            elif kind == 'balanceUpdate':
+                free, locked = self.balances.get(event['a'], (0.0, 0.0))
+                self.balances[event['a']] = (free + float(event['d']), locked)
+            elif kind == 'executionReport':
+                self.executions.append({
+                    'symbol': event.get('s'),
+                    'order_id': event.get('i'),
+                    'side': event.get('S'),
+                    'status': event.get('X'),
+                    'filled': float(event.get('z', 0)),
+                    'price': float(event.get('L', 0)),
+                    'time': event.get('T'),
+                })
+            elif kind == 'listenKeyExpired':
+                # run_forever returns and _run connects with a new key
+                if self._ws is not None:
+                    self._ws.close()
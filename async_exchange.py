@@ -0,0 +1,224 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from lazy_imports import lazy_import
+from request_scheduler import request_priority, request_weight
+
+aiohttp = lazy_import('aiohttp')
+
+API_URL = "https://api.binance.com"
+
+
+class ExchangeError(RuntimeError):
+    """Error response of the Binance REST API"""
+
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        try:
+            body = json.loads(text)
+            self.code, self.message = body.get('code'), body.get('msg', text)
+        except (ValueError, AttributeError):
+            self.code, self.message = None, text
+        super().__init__(f"Binance API error (HTTP {status_code}, code {self.code}): {self.message}")
+
+
+class AsyncExchange:
+    """asyncio client for the Binance REST endpoints the bot uses
+
+    Requests share a pool of keep-alive connections, and at most
+    `concurrency` are in flight at a time, so fetching from hundreds of
+    symbols costs a few round trips instead of one per symbol. With a
+    request_scheduler.RequestScheduler every request is admitted within
+    the request weight limit like the calls of ScheduledClient; GET
+    requests rejected with 429 are retried once the pause is over.
+
+    Args:
+        api_key (str): Needed for account and order endpoints
+        api_secret (str): Signs account and order requests
+        scheduler: Optional RequestScheduler shared with the other clients
+        concurrency (int): Requests and connections at the same time
+        timeout (float): Seconds per request
+    """
+
+    def __init__(self, api_key=None, api_secret=None, scheduler=None, concurrency=32,
+                 timeout=10.0, base_url=API_URL, retries=2, recv_window=5000):
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.scheduler = scheduler
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.base_url = base_url
+        self.retries = retries
+        self.recv_window = recv_window
+        self._session = None
+        self._semaphore = None
+        # The scheduler blocks until a request is admitted, keep that off the loop
+        self._admission = ThreadPoolExecutor(concurrency, thread_name_prefix="exchange-admission") \
+            if scheduler is not None else None
+
+    async def _open(self):
+        if self._session is None or self._session.closed:
+            headers = {'X-MBX-APIKEY': self.api_key} if self.api_key else {}
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=60, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers=headers,
+            )
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        if self._admission is not None:
+            self._admission.shutdown(wait=False)
+
+    def _query(self, params, signed):
+        if signed:
+            if not self.api_secret:
+                raise ValueError("API secret required for signed requests")
+            params = dict(params, recvWindow=self.recv_window, timestamp=int(time.time() * 1000))
+            query = urlencode(params)
+            signature = hmac.new(self.api_secret.encode(), query.encode(), hashlib.sha256).hexdigest()
+            return f"{query}&signature={signature}"
+        return urlencode(params)
+
+    async def request(self, method, path, params=None, signed=False, priority=None):
+        """Send one request and return its decoded JSON
+
+        Raises:
+            ExchangeError: Binance answered with an error status
+        """
+        params = {key: value for key, value in (params or {}).items() if value is not None}
+        weight = request_weight(method, path, params)
+        if priority is None:
+            priority = request_priority(method, path, params)
+
+        session = await self._open()
+        async with self._semaphore:
+            for attempt in range(self.retries + 1):
+                if self.scheduler is not None:
+                    await asyncio.get_running_loop().run_in_executor(
+                        self._admission, self.scheduler.acquire, weight, priority
+                    )
+                query = self._query(params, signed)
+                url = f"{self.base_url}{path}?{query}" if query else f"{self.base_url}{path}"
+                async with session.request(method, url) as response:
+                    text = await response.text()
+                    if self.scheduler is not None:
+                        self.scheduler.observe(response.status, response.headers)
+                    if 200 <= response.status < 300:
+                        return json.loads(text) if text else {}
+                    if response.status != 429 or method.upper() != 'GET' or attempt == self.retries:
+                        raise ExchangeError(response.status, text)
+
+    # Endpoints
+
+    async def ping(self):
+        return await self.request('GET', '/api/v3/ping')
+
+    async def ticker(self, symbol=None, priority=None):
+        """24h ticker of one symbol, or of all symbols as a list"""
+        return await self.request('GET', '/api/v3/ticker/24hr', {'symbol': symbol}, priority=priority)
+
+    async def klines(self, symbol, interval, startTime=None, endTime=None, limit=500, priority=None):
+        params = {'symbol': symbol, 'interval': interval, 'startTime': startTime,
+                  'endTime': endTime, 'limit': limit}
+        return await self.request('GET', '/api/v3/klines', params, priority=priority)
+
+    async def exchange_info(self, symbol=None):
+        return await self.request('GET', '/api/v3/exchangeInfo', {'symbol': symbol})
+
+    async def account(self):
+        return await self.request('GET', '/api/v3/account', signed=True)
+
+    async def order(self, **params):
+        """Place an order, parameters as for POST /api/v3/order"""
+        return await self.request('POST', '/api/v3/order', params, signed=True)
+
+    async def klines_many(self, requests, priority=None):
+        """Klines of several requests at once
+
+        Args:
+            requests (list): Keyword arguments of klines() per request
+
+        Returns:
+            list: Klines per request in the same order, or the exception
+                the request failed with
+        """
+        return await asyncio.gather(
+            *(self.klines(**request, priority=priority) for request in requests),
+            return_exceptions=True
+        )
+
+
+class SyncExchange:
+    """Blocking adapter running an AsyncExchange on a background event loop
+
+    Methods are named like their binance.client.Client counterparts, so
+    code written for Client, e.g. KlineDownloader, can use it unchanged;
+    get_klines_many() fetches many symbols concurrently. Calls can come
+    from any thread, including Qt threads. The priority of a call is the
+    one the calling thread set on the scheduler, see
+    RequestScheduler.priority.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.exchange = AsyncExchange(*args, **kwargs)
+        self.scheduler = self.exchange.scheduler
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _run(self, coroutine):
+        with self._lock:
+            if self._thread is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="exchange-loop", daemon=True)
+                self._thread.start()
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def priority(self, level):
+        """Send this thread's calls with priority `level` inside the block"""
+        return self.scheduler.priority(level)
+
+    def current_priority(self):
+        return self.scheduler.current_priority() if self.scheduler is not None else None
+
+    def ping(self):
+        return self._run(self.exchange.ping())
+
+    def get_ticker(self, symbol=None):
+        return self._run(self.exchange.ticker(symbol, priority=self.current_priority()))
+
+    def get_klines(self, symbol, interval, startTime=None, endTime=None, limit=500):
+        return self._run(self.exchange.klines(symbol, interval, startTime, endTime, limit,
+                                              priority=self.current_priority()))
+
+    def get_klines_many(self, requests):
+        """Klines of several requests concurrently, see AsyncExchange.klines_many"""
+        return self._run(self.exchange.klines_many(requests, priority=self.current_priority()))
+
+    def get_exchange_info(self):
+        return self._run(self.exchange.exchange_info())
+
+    def get_account(self):
+        return self._run(self.exchange.account())
+
+    def create_order(self, **params):
+        return self._run(self.exchange.order(**params))
+
+    def close(self):
+        if self._thread is None:
+            return
+        self._run(self.exchange.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+        self._thread = None
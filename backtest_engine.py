@@ -0,0 +1,298 @@
+import numpy as np
+import pandas as pd
+
+import indicator_kernels
+
+# Parameters of the built-in strategies. The first keys of every strategy
+# configure its indicators, the remaining ones are signal thresholds.
+DEFAULT_PARAMS = {
+    "Special": {'channel_length': 10, 'average_length': 21, 'oversold': -60, 'overbought': 60},
+    "RSI": {'length': 14, 'oversold': 30, 'overbought': 70},
+    "MACD": {'fast': 12, 'slow': 26, 'signal': 9},
+}
+
+INDICATOR_PARAMS = {
+    "Special": ('channel_length', 'average_length'),
+    "RSI": ('length',),
+    "MACD": ('fast', 'slow', 'signal'),
+}
+
+
+def strategy_params(strategy_type, params=None):
+    """Defaults of a built-in strategy updated with `params`"""
+    if strategy_type not in DEFAULT_PARAMS:
+        return dict(params or {})
+    merged = dict(DEFAULT_PARAMS[strategy_type])
+    unknown = set(params or {}) - set(merged)
+    if unknown:
+        raise ValueError(f"Unknown {strategy_type} parameters: {', '.join(sorted(unknown))}")
+    merged.update(params or {})
+    return merged
+
+
+def compute_indicators(strategy_type, high, low, close, params=None):
+    """Indicator columns a built-in strategy trades on, as float64 arrays"""
+    params = strategy_params(strategy_type, params)
+    if strategy_type == "Special":
+        wt1, wt2 = indicator_kernels.wave_trend(
+            high, low, close, params['channel_length'], params['average_length']
+        )
+        return {'wt1': wt1, 'wt2': wt2}
+    if strategy_type == "RSI":
+        return {'rsi': indicator_kernels.rsi(close, params['length'])}
+    if strategy_type == "MACD":
+        macd, signal, histogram = indicator_kernels.macd(
+            close, params['fast'], params['slow'], params['signal']
+        )
+        return {'macd': macd, 'signal': signal, 'histogram': histogram}
+    return {}
+
+
+def previous(values):
+    """Values shifted one bar to the right, NaN on the first bar"""
+    values = np.asarray(values, dtype=np.float64)
+    shifted = np.empty_like(values)
+    shifted[:1] = np.nan
+    shifted[1:] = values[:-1]
+    return shifted
+
+
+def crossover_masks(a, b):
+    """Bars where a crosses above b and where it crosses below b
+
+    Same test as TradingBot.get_signal applied to every pair of
+    consecutive bars at once.
+    """
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    a_prev, b_prev = previous(a), previous(b)
+    with np.errstate(invalid='ignore'):
+        above = (a_prev <= b_prev) & (a > b)
+        below = (a_prev >= b_prev) & (a < b)
+    return above, below
+
+
+def signal_masks(df, strategy_type, params=None):
+    """Buy and sell crossover masks of a built-in strategy
+
+    Args:
+        df (DataFrame): Candles with the strategy's indicator columns
+            (wt1/wt2 for Special, rsi for RSI, macd/signal for MACD), or a
+            dict of those columns
+        strategy_type (str): 'Special', 'RSI' or 'MACD'
+        params (dict): Overrides of DEFAULT_PARAMS; only the thresholds
+            are used here
+
+    Returns:
+        tuple: (buy, sell) boolean arrays, always False on the first bar.
+            Unknown strategies never signal.
+    """
+    params = strategy_params(strategy_type, params)
+
+    # Comparisons with NaN are False, like the scalar checks they replace
+    with np.errstate(invalid='ignore'):
+        if strategy_type == "Special":
+            wt1 = np.asarray(df['wt1'], dtype=np.float64)
+            wt2 = np.asarray(df['wt2'], dtype=np.float64)
+            wt1_prev, wt2_prev = previous(wt1), previous(wt2)
+
+            oversold, overbought = params['oversold'], params['overbought']
+
+            # Buy signal: WT1 and WT2 cross above the oversold level (-60)
+            buy = ((wt1_prev <= oversold) | (wt2_prev <= oversold)) & (wt1 > oversold) & (wt2 > oversold)
+
+            # Sell signal: WT1 and WT2 cross below the overbought level (60)
+            sell = ((wt1_prev >= overbought) | (wt2_prev >= overbought)) & (wt1 < overbought) & (wt2 < overbought)
+
+        elif strategy_type == "RSI":
+            rsi = np.asarray(df['rsi'], dtype=np.float64)
+            rsi_prev = previous(rsi)
+
+            oversold, overbought = params['oversold'], params['overbought']
+
+            # Buy signal: RSI crosses above 30, sell signal: RSI crosses below 70
+            buy = (rsi_prev <= oversold) & (rsi > oversold)
+            sell = (rsi_prev >= overbought) & (rsi < overbought)
+
+        elif strategy_type == "MACD":
+            # Buy signal: MACD crosses above Signal, sell signal: MACD crosses below Signal
+            buy, sell = crossover_masks(df['macd'], df['signal'])
+
+        else:
+            length = len(df['close']) if 'close' in df else len(df)
+            buy = np.zeros(length, dtype=bool)
+            sell = np.zeros(length, dtype=bool)
+
+    return buy, sell
+
+
+def resolve_positions(buy, sell):
+    """Run the long-only position state machine over signal masks
+
+    Starting flat, a buy opens a position and the next sell closes it;
+    signals that do not change the position are ignored. Only bars with a
+    signal are visited, so the cost grows with the number of signals rather
+    than the number of bars.
+
+    Returns:
+        tuple: (entries, exits) bar indices; exits has one element less
+            than entries when the last position is still open
+    """
+    buy = np.asarray(buy, dtype=bool)
+    sell = np.asarray(sell, dtype=bool)
+    events = np.flatnonzero(buy | sell)
+    if len(events) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    if not np.any(buy[events] & sell[events]):
+        # Without bars that carry both signals the position after every
+        # event is simply the last signal seen: 1 after a buy, 0 after a sell
+        state = buy[events].astype(np.int8)
+        before = np.concatenate(([0], state[:-1]))
+        entries = events[(state == 1) & (before == 0)]
+        exits = events[(state == 0) & (before == 1)]
+        return entries.astype(np.int64), exits.astype(np.int64)
+
+    # A bar with both signals buys when flat and sells when long
+    entries = []
+    exits = []
+    long = False
+    for i, is_buy, is_sell in zip(events.tolist(), buy[events].tolist(), sell[events].tolist()):
+        if not long and is_buy:
+            entries.append(i)
+            long = True
+        elif long and is_sell:
+            exits.append(i)
+            long = False
+    return np.array(entries, dtype=np.int64), np.array(exits, dtype=np.int64)
+
+
+def trade_bars(entries, exits):
+    """Entry and exit bar indices interleaved in trade order"""
+    index = np.empty(len(entries) + len(exits), dtype=np.int64)
+    index[0::2] = entries
+    index[1::2] = exits
+    return index
+
+
+def compound_trades(close, entries, exits, initial_capital, commission_fee):
+    """Compound a long-only trade sequence with a proportional commission
+
+    Entering costs `commission_fee` of the assets and the return of every
+    closed trade is reduced by the same fee. Open positions are marked to
+    market at each close in the equity curve.
+
+    Returns:
+        tuple: (assets, equity) where assets[k] are the total assets after
+            trade k (entries and exits interleaved) and equity has one
+            value per bar
+    """
+    close = np.asarray(close, dtype=np.float64)
+    index = trade_bars(entries, exits)
+
+    factors = np.empty(len(index) + 1)
+    factors[0] = initial_capital
+    factors[1::2] = 1 - commission_fee
+    factors[2::2] = 1 + (close[exits] / close[entries[:len(exits)]] - 1) * (1 - commission_fee)
+    levels = np.cumprod(factors)
+
+    # Number of trades done up to and including each bar
+    done = np.searchsorted(index, np.arange(len(close)), side='right')
+    equity = levels[done]
+    holding = done % 2 == 1
+    if np.any(holding):
+        entry_price = close[entries[(done[holding] - 1) // 2]]
+        equity[holding] *= 1 + (close[holding] / entry_price - 1) * (1 - commission_fee)
+    return levels[1:], equity
+
+
+def timestamps_ms(index):
+    """Millisecond timestamps of a DatetimeIndex or a float millisecond index"""
+    if isinstance(index, pd.DatetimeIndex):
+        return index.values.astype('datetime64[ms]').astype(np.int64)
+    return np.asarray(index, dtype=np.float64).astype(np.int64)
+
+
+class BacktestTrades:
+    """Columnar backtest result, one row per trade in time order
+
+    Attributes:
+        index (ndarray): Bar index of each trade
+        timestamp (ndarray): Trade time in milliseconds
+        type (ndarray): 'BUY' or 'SELL'
+        price (ndarray): Close price of the trade bar
+        profit (ndarray): Price difference to the entry on sells, 0 on buys
+    """
+
+    def __init__(self, index, timestamp, type, price, profit):
+        self.index = index
+        self.timestamp = timestamp
+        self.type = type
+        self.price = price
+        self.profit = profit
+
+    def __len__(self):
+        return len(self.index)
+
+    def to_list(self):
+        """Trades as the list of dicts TradingBot.backtest returns"""
+        trades = []
+        for timestamp, side, price, profit in zip(self.timestamp.tolist(), self.type.tolist(),
+                                                  self.price, self.profit):
+            trades.append({
+                'timestamp': timestamp,
+                'type': side,
+                'price': price,
+                'profit': profit if side == 'SELL' else 0
+            })
+        return trades
+
+    def to_frame(self):
+        return pd.DataFrame({
+            'timestamp': self.timestamp,
+            'type': self.type,
+            'price': self.price,
+            'profit': self.profit
+        }, index=pd.Index(self.index, name='bar'))
+
+
+def run_backtest(df, strategy_type, params=None):
+    """Backtest a built-in strategy on candles with its indicator columns
+
+    Produces the same trades as bar-by-bar simulation: a long position is
+    opened at the close of a buy bar and closed at the close of the next
+    sell bar.
+
+    Args:
+        df (DataFrame): Candles with the strategy's indicator columns
+        strategy_type (str): 'Special', 'RSI' or 'MACD'
+        params (dict): Threshold overrides, see DEFAULT_PARAMS
+
+    Returns:
+        BacktestTrades: Executed trades
+    """
+    buy, sell = signal_masks(df, strategy_type, params)
+    return trades_from_masks(df, buy, sell)
+
+
+def trades_from_masks(df, buy, sell):
+    """Long-only trades of per-bar buy and sell masks on the candles of df"""
+    close = np.asarray(df['close'], dtype=np.float64)
+    entries, exits = resolve_positions(buy, sell)
+
+    index = trade_bars(entries, exits)
+
+    profit = np.zeros(len(index))
+    profit[1::2] = close[exits] - close[entries[:len(exits)]]
+
+    side = np.empty(len(index), dtype=object)
+    side[0::2] = 'BUY'
+    side[1::2] = 'SELL'
+
+    return BacktestTrades(
+        index=index,
+        timestamp=timestamps_ms(df.index)[index],
+        type=side,
+        price=close[index],
+        profit=profit
+    )
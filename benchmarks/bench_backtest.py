@@ -0,0 +1,112 @@
+"""Vectorized backtest engine versus the original per-row iloc loop
+
+Checks that both produce identical trades for the Special, RSI and MACD
+strategies and reports the time taken.
+
+Usage:
+    python benchmarks/bench_backtest.py [--bars 500000] [--loop-bars 500000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import indicator_kernels
+from backtest_engine import run_backtest
+
+
+def make_candles(bars, seed=7):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, bars)))
+    high = close * (1 + rng.random(bars) * 0.002)
+    low = close * (1 - rng.random(bars) * 0.002)
+    index = pd.to_datetime(1_600_000_000_000 + np.arange(bars) * 60_000, unit='ms')
+    df = pd.DataFrame({'open': close, 'high': high, 'low': low, 'close': close}, index=index)
+
+    wt1, wt2 = indicator_kernels.wave_trend(high, low, close)
+    macd, signal, histogram = indicator_kernels.macd(close)
+    df['wt1'] = wt1
+    df['wt2'] = wt2
+    df['rsi'] = indicator_kernels.rsi(close)
+    df['macd'] = macd
+    df['signal'] = signal
+    df['histogram'] = histogram
+    return df
+
+
+def loop_backtest(df, strategy_type):
+    """The per-row simulation TradingBot.backtest used before the engine"""
+    position = None
+    entry_price = 0
+    trades = []
+    for i in range(1, len(df)):
+        current_price = df['close'].iloc[i]
+        timestamp = df.index[i]
+
+        if strategy_type == "Special":
+            wt1 = df['wt1'].iloc[i]
+            wt2 = df['wt2'].iloc[i]
+            wt1_prev = df['wt1'].iloc[i-1]
+            wt2_prev = df['wt2'].iloc[i-1]
+            buy_signal = (wt1_prev <= -60 or wt2_prev <= -60) and (wt1 > -60 and wt2 > -60)
+            sell_signal = (wt1_prev >= 60 or wt2_prev >= 60) and (wt1 < 60 and wt2 < 60)
+        elif strategy_type == "RSI":
+            rsi = df['rsi'].iloc[i]
+            rsi_prev = df['rsi'].iloc[i-1]
+            buy_signal = rsi_prev <= 30 and rsi > 30
+            sell_signal = rsi_prev >= 70 and rsi < 70
+        elif strategy_type == "MACD":
+            macd = df['macd'].iloc[i]
+            signal = df['signal'].iloc[i]
+            macd_prev = df['macd'].iloc[i-1]
+            signal_prev = df['signal'].iloc[i-1]
+            buy_signal = macd_prev <= signal_prev and macd > signal
+            sell_signal = macd_prev >= signal_prev and macd < signal
+        else:
+            continue
+
+        if position is None and buy_signal:
+            position = "LONG"
+            entry_price = current_price
+            trades.append({'timestamp': int(timestamp.timestamp() * 1000), 'type': 'BUY',
+                           'price': current_price, 'profit': 0})
+        elif position == "LONG" and sell_signal:
+            trades.append({'timestamp': int(timestamp.timestamp() * 1000), 'type': 'SELL',
+                           'price': current_price, 'profit': current_price - entry_price})
+            position = None
+            entry_price = 0
+    return trades
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--bars', type=int, default=500_000)
+    parser.add_argument('--loop-bars', type=int, default=None,
+                        help="bars given to the slow reference loop (default: all)")
+    args = parser.parse_args()
+
+    df = make_candles(args.bars)
+    loop_df = df.iloc[:args.loop_bars] if args.loop_bars else df
+    print(f"{args.bars} bars, reference loop on {len(loop_df)} bars")
+
+    for strategy_type in ("Special", "RSI", "MACD"):
+        started = time.perf_counter()
+        trades = run_backtest(df, strategy_type)
+        vectorized = time.perf_counter() - started
+
+        started = time.perf_counter()
+        expected = loop_backtest(loop_df, strategy_type)
+        loop = time.perf_counter() - started
+
+        identical = run_backtest(loop_df, strategy_type).to_list() == expected
+        print(f"{strategy_type:8s} trades={len(trades):6d}  vectorized={vectorized * 1000:8.1f} ms  "
+              f"loop={loop:7.2f} s  identical={identical}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Benchmark KlineDownloader against a local fake Binance klines endpoint
+
+Usage:
+    python benchmarks/bench_kline_downloader.py [--days 365] [--latency 0.08]
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kline_downloader import KlineDownloader
+from kline_store import interval_to_ms
+
+
+def make_handler(latency):
+    class FakeBinanceHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != '/api/v3/klines':
+                self.send_error(404)
+                return
+
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            step = interval_to_ms(params['interval'])
+            start = int(params['startTime'])
+            end = int(params['endTime'])
+            limit = int(params.get('limit', 500))
+
+            # Align to candle open times like the real endpoint
+            open_time = start + (-start % step)
+            klines = []
+            while open_time <= end and len(klines) < limit:
+                price = 100 + (open_time // step) % 50
+                klines.append([
+                    open_time, str(price), str(price + 1), str(price - 1), str(price + 0.5),
+                    '10', open_time + step - 1, '1000', 42, '5', '500', '0'
+                ])
+                open_time += step
+
+            time.sleep(latency)
+            body = json.dumps(klines).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FakeBinanceHandler
+
+
+class FakeClient:
+    """Minimal stand-in for binance.client.Client talking to the fake server"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.session = requests.Session()
+
+    def get_klines(self, **params):
+        response = self.session.get(f"{self.base_url}/api/v3/klines", params=params)
+        response.raise_for_status()
+        return response.json()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--interval', default='15m')
+    parser.add_argument('--latency', type=float, default=0.08)
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(args.latency))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    end_time = 1_700_000_000_000
+    start_time = end_time - args.days * 24 * 60 * 60 * 1000
+
+    results = {}
+    for workers in (1, args.workers):
+        downloader = KlineDownloader(FakeClient(base_url), max_workers=workers, max_weight=100000)
+        started = time.perf_counter()
+        klines = downloader.download('BTCUSDT', args.interval, start_time, end_time)
+        elapsed = time.perf_counter() - started
+        results[workers] = klines
+        pages = len(downloader.windows(args.interval, start_time, end_time))
+        print(f"workers={workers:2d} pages={pages:4d} candles={len(klines):7d} time={elapsed:.2f}s")
+
+    server.shutdown()
+
+    sequential, parallel = results[1], results[args.workers]
+    open_times = [k[0] for k in parallel]
+    assert sequential == parallel, "Parallel download differs from sequential download"
+    assert open_times == sorted(set(open_times)), "Candles are not ordered or contain duplicates"
+    print("Parallel result matches sequential result")
+
+
+if __name__ == "__main__":
+    main()
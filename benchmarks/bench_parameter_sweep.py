@@ -0,0 +1,65 @@
+"""Scaling of parameter_sweep.sweep with the number of worker processes
+
+Runs a 1,000-combination Wave Trend sweep over a year of 15m candles with
+1, 2, 4, ... processes up to the CPU count and checks every run ranks the
+same results.
+
+Usage:
+    python benchmarks/bench_parameter_sweep.py [--bars 35040] [--start-method spawn]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parameter_sweep import sweep
+
+GRID = {
+    'channel_length': [6, 8, 10, 12, 14],
+    'average_length': [15, 18, 21, 24, 27],
+    'oversold': [-80, -70, -60, -50, -40, -30, -20, -10],
+    'overbought': [10, 20, 30, 40, 50],
+}
+
+
+def make_candles(bars, seed=11):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.004, bars)))
+    index = pd.to_datetime(1_600_000_000_000 + np.arange(bars) * 900_000, unit='ms')
+    return pd.DataFrame({
+        'high': close * (1 + rng.random(bars) * 0.003),
+        'low': close * (1 - rng.random(bars) * 0.003),
+        'close': close
+    }, index=index)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--bars', type=int, default=365 * 96)
+    parser.add_argument('--start-method', default=None)
+    args = parser.parse_args()
+
+    df = make_candles(args.bars)
+    cpus = os.cpu_count() or 1
+    counts = sorted({1, cpus} | {2 ** i for i in range(1, cpus.bit_length()) if 2 ** i <= cpus})
+
+    baseline = None
+    reference = None
+    for processes in counts:
+        started = time.perf_counter()
+        results = sweep(df, 'Special', GRID, processes=processes, start_method=args.start_method)
+        elapsed = time.perf_counter() - started
+
+        baseline = baseline or elapsed
+        reference = results if reference is None else reference
+        print(f"processes={processes:3d}  combinations={len(results)}  {elapsed:7.2f} s  "
+              f"speedup={baseline / elapsed:5.2f}x  same={results.equals(reference)}")
+
+
+if __name__ == "__main__":
+    main()
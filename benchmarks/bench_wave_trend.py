@@ -0,0 +1,75 @@
+"""Per-candle cost of the streaming WaveTrend versus the batch pandas_ta version
+
+Usage:
+    python benchmarks/bench_wave_trend.py [--candles 5000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pandas_ta as ta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from indicators import WaveTrend
+
+
+def batch_wave_trend(high, low, close, channel_length=10, average_length=21):
+    """Same calculation as TradingBot.calculate_wave_trend"""
+    hcl3 = pd.Series((high + close + low) / 3)
+    esa = ta.ema(hcl3, channel_length)
+    d = ta.ema(abs(hcl3 - esa), channel_length)
+    ci = (hcl3 - esa) / (0.015 * d)
+    wt1 = ta.ema(ci, average_length)
+    wt2 = ta.sma(wt1, 4)
+    return wt1, wt2
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--candles', type=int, default=5000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    close = 100 + np.cumsum(rng.normal(0, 1, args.candles))
+    high = close + rng.random(args.candles)
+    low = close - rng.random(args.candles)
+
+    # Accuracy against the batch calculation over the full history
+    wt1, wt2 = batch_wave_trend(high, low, close)
+    wave_trend = WaveTrend()
+    streamed = np.array([wave_trend.update(high[i], low[i], close[i]) for i in range(args.candles)])
+    print(f"max |wt1 diff| = {np.nanmax(np.abs(streamed[:, 0] - wt1.values)):.2e}")
+    print(f"max |wt2 diff| = {np.nanmax(np.abs(streamed[:, 1] - wt2.values)):.2e}")
+
+    # Streaming: one update per candle
+    wave_trend = WaveTrend()
+    started = time.perf_counter()
+    for i in range(args.candles):
+        wave_trend.update(high[i], low[i], close[i])
+    streaming = (time.perf_counter() - started) / args.candles
+    print(f"streaming update:        {streaming * 1e6:9.2f} us/candle")
+
+    # Provisional update plus rollback, as done for a partial candle
+    started = time.perf_counter()
+    for i in range(args.candles):
+        wave_trend.update(high[i], low[i], close[i], provisional=True)
+    wave_trend.rollback()
+    provisional = (time.perf_counter() - started) / args.candles
+    print(f"provisional update:      {provisional * 1e6:9.2f} us/candle")
+
+    # Batch: recompute the whole window on every candle
+    for window in (50, 100, 1000):
+        runs = min(args.candles - window, 500)
+        started = time.perf_counter()
+        for i in range(window, window + runs):
+            batch_wave_trend(high[i - window:i], low[i - window:i], close[i - window:i])
+        batch = (time.perf_counter() - started) / runs
+        print(f"batch window={window:5d}:     {batch * 1e6:9.2f} us/candle ({batch / streaming:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
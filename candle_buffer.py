@@ -0,0 +1,72 @@
+import numpy as np
+
+FIELDS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+
+
+class CandleBuffer:
+    """Fixed-capacity ring buffer of candles backed by preallocated NumPy arrays
+
+    Every value is written twice, at `i` and `i + capacity`, so the last
+    `len(buffer)` candles in chronological order are always one contiguous
+    slice. Appending is O(1) and ordered views never copy.
+
+    Args:
+        capacity (int): Maximum number of candles kept
+        fields (tuple): Column names, 'timestamp' must be the first one
+    """
+
+    def __init__(self, capacity=50, fields=FIELDS):
+        self.capacity = capacity
+        self.fields = fields
+        self._arrays = {name: np.full(2 * capacity, np.nan) for name in fields}
+        self._next = 0   # Slot the next candle is written to
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, name):
+        return self.view(name)
+
+    def __contains__(self, name):
+        return name in self._arrays
+
+    def clear(self):
+        self._next = 0
+        self._size = 0
+
+    def last_timestamp(self):
+        if self._size == 0:
+            return None
+        return self._arrays['timestamp'][self._next + self.capacity - 1]
+
+    def append(self, timestamp, **values):
+        """Add a candle, replacing the newest one if it has the same timestamp
+
+        Replacing keeps warm-up history and the first websocket candle from
+        producing a duplicated row.
+        """
+        if self._size and self.last_timestamp() == timestamp:
+            slot = (self._next - 1) % self.capacity
+        else:
+            slot = self._next
+            self._next = (self._next + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+
+        values['timestamp'] = timestamp
+        for name, array in self._arrays.items():
+            value = values.get(name, np.nan)
+            array[slot] = value
+            array[slot + self.capacity] = value
+
+    def extend(self, candles):
+        """Append an iterable of dicts with the buffer's field names"""
+        for candle in candles:
+            self.append(**candle)
+
+    def view(self, name):
+        """Return the candles of one field in chronological order without copying"""
+        end = self._next + self.capacity
+        view = self._arrays[name][end - self._size:end]
+        view.flags.writeable = False
+        return view
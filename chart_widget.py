@@ -1,71 +1,51 @@
 from PyQt5.QtWidgets import QWidget, QVBoxLayout
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
-from matplotlib.figure import Figure
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import mplfinance as mpf
-import matplotlib.dates as mdates
 import traceback
+from lazy_imports import lazy_import
+
+# matplotlib is only imported when the first chart is shown
+backend_qt5agg = lazy_import('matplotlib.backends.backend_qt5agg')
+mfigure = lazy_import('matplotlib.figure')
+mticker = lazy_import('matplotlib.ticker')
+mdates = lazy_import('matplotlib.dates')
 
 class TradingChart(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         
-        # Create figure and canvas
-        self.figure = Figure(figsize=(12, 8), dpi=100, facecolor='#1e1e1e')
-        self.canvas = FigureCanvas(self.figure)
-        self.toolbar = NavigationToolbar(self.canvas, self)
-        
-        # Create layout
-        layout = QVBoxLayout()
-        layout.addWidget(self.toolbar)
-        layout.addWidget(self.canvas)
-        self.setLayout(layout)
+        # Figure and canvas are created by ensure_canvas()
+        self._figure = None
+        self._canvas = None
+        self.toolbar = None
+        self.setLayout(QVBoxLayout())
         
         # Initialize variables
         self.axes = []  # List to store all axes
         self.trade_markers = []  # List to store trade markers
         
-        # Define style
-        self.style = mpf.make_mpf_style(
-            base_mpf_style='charles',
-            gridstyle='--',
-            gridcolor='#424242',
-            gridaxis='both',
-            facecolor='#1e1e1e',
-            edgecolor='#424242',
-            figcolor='#1e1e1e',
-            y_on_right=False,
-            rc={
-                'axes.labelcolor': 'white',
-                'axes.edgecolor': '#424242',
-                'xtick.color': 'white',
-                'ytick.color': 'white',
-                'text.color': 'white',
-                'figure.facecolor': '#1e1e1e',
-                'figure.edgecolor': '#1e1e1e',
-                'savefig.facecolor': '#1e1e1e',
-                'savefig.edgecolor': '#1e1e1e',
-                'grid.color': '#424242',
-                'grid.linestyle': '--',
-                'grid.alpha': 0.3
-            },
-            marketcolors=mpf.make_marketcolors(
-                up='#26a69a',
-                down='#ef5350',
-                edge='inherit',
-                wick='inherit',
-                volume='in',
-                ohlc='inherit'
-            ),
-            style_name='custom_dark'
-        )
+    def ensure_canvas(self):
+        """Create the matplotlib figure, canvas and toolbar on first use"""
+        if self._canvas is None:
+            self._figure = mfigure.Figure(figsize=(12, 8), dpi=100, facecolor='#1e1e1e')
+            self._canvas = backend_qt5agg.FigureCanvasQTAgg(self._figure)
+            self.toolbar = backend_qt5agg.NavigationToolbar2QT(self._canvas, self)
+            self.layout().addWidget(self.toolbar)
+            self.layout().addWidget(self._canvas)
+            
+    @property
+    def figure(self):
+        self.ensure_canvas()
+        return self._figure
+        
+    @property
+    def canvas(self):
+        self.ensure_canvas()
+        return self._canvas
         
     def clear(self):
         """Clear all plots from the chart"""
-        if self.figure:
+        if self._figure is not None:
             self.figure.clear()
             self.axes = []
             self.trade_markers = []
@@ -132,7 +112,7 @@ class TradingChart(QWidget):
                 # Format volume axis
                 self.axes[1].set_ylabel('Volume', color='white', fontsize=8, labelpad=5)
                 volume_max = df.volume.max()
-                self.axes[1].yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'{x/volume_max:.1%}'))
+                self.axes[1].yaxis.set_major_formatter(mticker.FuncFormatter(lambda x, p: f'{x/volume_max:.1%}'))
             
             # Add indicators on a separate axis
             if isinstance(indicators, dict) and indicators:
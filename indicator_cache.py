@@ -0,0 +1,108 @@
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+def sizeof(value):
+    """Approximate memory used by a cached indicator result in bytes"""
+    if isinstance(value, (pd.Series, pd.DataFrame)):
+        return int(np.sum(value.memory_usage(index=True, deep=False)))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sum(sizeof(v) for v in value)
+    if isinstance(value, dict):
+        return sum(sizeof(v) for v in value.values())
+    return sys.getsizeof(value)
+
+
+def window_key(data):
+    """Identify the candles an indicator was computed from
+
+    The last closed candle is identified by its timestamp. The newest row is
+    also fingerprinted by its prices because it may still be forming, so a
+    changing open candle never returns a stale result.
+    """
+    if data is None or len(data) == 0:
+        return None
+    last = data.iloc[-1]
+    return (
+        data.index[0],
+        data.index[-1],
+        len(data),
+        float(last['high']) if 'high' in data else None,
+        float(last['low']) if 'low' in data else None,
+        float(last['close'])
+    )
+
+
+class IndicatorCache:
+    """Process-wide LRU cache of indicator series with a memory cap
+
+    Entries are keyed by (symbol, interval, indicator, params, window) and
+    evicted least recently used first once `max_bytes` is exceeded.
+    Cached results are shared between threads and must not be modified.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_or_compute(self, symbol, interval, indicator, params, data, compute):
+        """Return the cached result for these candles or compute and store it
+
+        Args:
+            symbol (str): Trading pair
+            interval (str): Kline interval
+            indicator (str): Indicator name, e.g. 'wave_trend'
+            params (tuple): Indicator parameters
+            data (DataFrame): Candles the indicator is computed from
+            compute (callable): Called as compute(data) on a cache miss
+        """
+        if symbol is None or interval is None:
+            return compute(data)
+        window = window_key(data)
+        if window is None:
+            return compute(data)
+
+        key = (symbol, interval, indicator, tuple(params), window)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+
+        result = compute(data)
+        size = sizeof(result)
+        if size > self.max_bytes:
+            return result
+
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (result, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes and self._entries:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+
+# Shared by every TradingBot and GUI view in the process
+indicator_cache = IndicatorCache()
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+from indicator_kernels import sma, rsi, macd, wave_trend
+
+
+def stack_columns(frames, column, length=None):
+    """Stack one column of several DataFrames into a (symbols x time) matrix
+
+    Shorter histories are left-padded with NaN so the newest candles of
+    all symbols share the last column.
+    """
+    length = length or max((len(df) for df in frames), default=0)
+    matrix = np.full((len(frames), length), np.nan)
+    for i, df in enumerate(frames):
+        values = df[column].values[-length:].astype(np.float64)
+        if len(values):
+            matrix[i, length - len(values):] = values
+    return matrix
+
+
+def cross_up(a, b):
+    """True where a crossed above b on the last column (a[-2] <= b[-2] and a[-1] > b[-1])"""
+    a, b = np.broadcast_arrays(np.atleast_2d(a), np.atleast_2d(b))
+    if a.shape[1] < 2:
+        return np.zeros(a.shape[0], dtype=bool)
+    return (a[:, -2] <= b[:, -2]) & (a[:, -1] > b[:, -1])
+
+
+def cross_down(a, b):
+    """True where a crossed below b on the last column"""
+    a, b = np.broadcast_arrays(np.atleast_2d(a), np.atleast_2d(b))
+    if a.shape[1] < 2:
+        return np.zeros(a.shape[0], dtype=bool)
+    return (a[:, -2] >= b[:, -2]) & (a[:, -1] < b[:, -1])
+
+
+def scan(symbols, high, low, close, channel_length=10, average_length=21,
+         rsi_length=14, sma_length=20, macd_fast=12, macd_slow=26, macd_signal=9):
+    """Compute indicators for many symbols in one vectorized pass
+
+    Args:
+        symbols (list): Row labels of the matrices
+        high, low, close (ndarray): (symbols x time) price matrices, oldest
+            candle first, shorter histories left-padded with NaN
+
+    Returns:
+        DataFrame: Per-symbol last indicator values and crossover flags. The
+            'signal' column follows TradingBot.get_signal ('buy', 'sell' or
+            'neutral' on a wt1/wt2 crossover).
+    """
+    close = np.atleast_2d(np.asarray(close, dtype=np.float64))
+    wt1, wt2 = wave_trend(high, low, close, channel_length, average_length)
+    rsi_values = rsi(close, rsi_length)
+    sma_values = sma(close, sma_length)
+    macd_line, macd_signal_line, macd_histogram = macd(close, macd_fast, macd_slow, macd_signal)
+
+    wt_buy = cross_up(wt1, wt2)
+    wt_sell = cross_down(wt1, wt2)
+
+    return pd.DataFrame({
+        'close': close[:, -1],
+        'wt1': wt1[:, -1],
+        'wt2': wt2[:, -1],
+        'signal': np.where(wt_buy, 'buy', np.where(wt_sell, 'sell', 'neutral')),
+        'rsi': rsi_values[:, -1],
+        'sma': sma_values[:, -1],
+        'macd': macd_line[:, -1],
+        'macd_signal': macd_signal_line[:, -1],
+        'macd_histogram': macd_histogram[:, -1],
+        'wt_cross_up': wt_buy,
+        'wt_cross_down': wt_sell,
+        'rsi_cross_up_30': cross_up(rsi_values, 30.0),
+        'rsi_cross_down_70': cross_down(rsi_values, 70.0),
+        'macd_cross_up': cross_up(macd_line, macd_signal_line),
+        'macd_cross_down': cross_down(macd_line, macd_signal_line),
+    }, index=pd.Index(symbols, name='symbol'))
@@ -0,0 +1,226 @@
+"""Indicator kernels on contiguous float64 arrays
+
+All kernels accept a 1-D series or a 2-D (rows x time) matrix and return
+arrays of the same shape. Results match pandas_ta's pure-pandas code
+paths. The recursive EMA/RMA loops are compiled with numba when it is
+installed and fall back to plain Python loops otherwise.
+"""
+import math
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def _ema_rows_python(x, length, start):
+    rows, columns = x.shape
+    alpha = 2.0 / (length + 1)
+    out = np.full(x.shape, np.nan)
+    for r in range(rows):
+        values = x[r].tolist()
+        result = [math.nan] * columns
+        seed_sum = 0.0
+        seed_valid = 0
+        value = math.nan
+        first = int(start[r])
+        for t in range(first, columns):
+            v = values[t]
+            count = t - first + 1
+            if count <= length:
+                if v == v:
+                    seed_sum += v
+                    seed_valid += 1
+                if count == length:
+                    value = seed_sum / seed_valid if seed_valid else math.nan
+                    result[t] = value
+            else:
+                if value != value:
+                    # Recursion starts at the first valid value like DataFrame.ewm
+                    value = v
+                elif v == v:
+                    value = alpha * v + (1 - alpha) * value
+                result[t] = value
+        out[r] = result
+    return out
+
+
+def _rma_rows_python(x, length):
+    rows, columns = x.shape
+    decay = 1.0 - 1.0 / length
+    out = np.full(x.shape, np.nan)
+    for r in range(rows):
+        values = x[r].tolist()
+        result = [math.nan] * columns
+        numerator = 0.0
+        denominator = 0.0
+        valid = 0
+        value = math.nan
+        for t in range(columns):
+            v = values[t]
+            if v == v:
+                numerator = v + decay * numerator
+                denominator = 1.0 + decay * denominator
+                valid += 1
+                if valid >= length:
+                    value = numerator / denominator
+            result[t] = value
+        out[r] = result
+    return out
+
+
+def _ema_rows_numba(x, length, start):
+    rows, columns = x.shape
+    alpha = 2.0 / (length + 1)
+    out = np.full(x.shape, np.nan)
+    for r in range(rows):
+        seed_sum = 0.0
+        seed_valid = 0
+        value = np.nan
+        for t in range(start[r], columns):
+            v = x[r, t]
+            count = t - start[r] + 1
+            if count <= length:
+                if not np.isnan(v):
+                    seed_sum += v
+                    seed_valid += 1
+                if count == length:
+                    value = seed_sum / seed_valid if seed_valid > 0 else np.nan
+                    out[r, t] = value
+            else:
+                if np.isnan(value):
+                    value = v
+                elif not np.isnan(v):
+                    value = alpha * v + (1 - alpha) * value
+                out[r, t] = value
+    return out
+
+
+def _rma_rows_numba(x, length):
+    rows, columns = x.shape
+    decay = 1.0 - 1.0 / length
+    out = np.full(x.shape, np.nan)
+    for r in range(rows):
+        numerator = 0.0
+        denominator = 0.0
+        valid = 0
+        value = np.nan
+        for t in range(columns):
+            v = x[r, t]
+            if not np.isnan(v):
+                numerator = v + decay * numerator
+                denominator = 1.0 + decay * denominator
+                valid += 1
+                if valid >= length:
+                    value = numerator / denominator
+            out[r, t] = value
+    return out
+
+
+if njit is not None:
+    _ema_rows = njit(cache=True, nogil=True)(_ema_rows_numba)
+    _rma_rows = njit(cache=True, nogil=True)(_rma_rows_numba)
+else:
+    _ema_rows = _ema_rows_python
+    _rma_rows = _rma_rows_python
+
+
+def _as_rows(x):
+    """Return x as a contiguous float64 2-D array and whether it was 1-D"""
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    if x.ndim == 1:
+        return x.reshape(1, -1), True
+    return x, False
+
+
+def _shape_like(out, was_1d):
+    return out[0] if was_1d else out
+
+
+def first_valid(x):
+    """Column index of the first non-NaN value of every row (row length if none)"""
+    x, was_1d = _as_rows(x)
+    valid = ~np.isnan(x)
+    start = np.where(valid.any(axis=1), valid.argmax(axis=1), x.shape[1]).astype(np.int64)
+    return _shape_like(start, was_1d)
+
+
+def ema(x, length, start=None):
+    """EMA matching pandas_ta.ema (SMA seed, adjust=False)
+
+    Args:
+        x (ndarray): Series or (rows x time) matrix
+        length (int): EMA length
+        start (ndarray): Per-row column where the series begins, defaults to
+            the first non-NaN value. NaN inputs after the start still count
+            towards the seed window, like in pandas_ta.
+    """
+    x, was_1d = _as_rows(x)
+    if start is None:
+        start = first_valid(x)
+    start = np.ascontiguousarray(np.atleast_1d(start), dtype=np.int64)
+    return _shape_like(_ema_rows(x, int(length), start), was_1d)
+
+
+def sma(x, length):
+    """SMA matching pandas_ta.sma (NaN until `length` valid values)"""
+    x, was_1d = _as_rows(x)
+    out = np.full(x.shape, np.nan)
+    if x.shape[1] >= length:
+        zeros = np.zeros((x.shape[0], 1))
+        cumsum = np.concatenate([zeros, np.cumsum(np.nan_to_num(x), axis=1)], axis=1)
+        invalid = np.concatenate([zeros, np.cumsum(np.isnan(x), axis=1)], axis=1)
+
+        window_sum = cumsum[:, length:] - cumsum[:, :-length]
+        window_invalid = invalid[:, length:] - invalid[:, :-length]
+        out[:, length - 1:] = np.where(window_invalid == 0, window_sum / length, np.nan)
+    return _shape_like(out, was_1d)
+
+
+def rma(x, length):
+    """pandas_ta.rma: ewm(alpha=1/length, min_periods=length, adjust=True)"""
+    x, was_1d = _as_rows(x)
+    return _shape_like(_rma_rows(x, int(length)), was_1d)
+
+
+def rsi(close, length=14):
+    """RSI matching pandas_ta.rsi"""
+    close, was_1d = _as_rows(close)
+    change = np.full(close.shape, np.nan)
+    change[:, 1:] = np.diff(close, axis=1)
+    missing = np.isnan(change)
+    gain = rma(np.where(missing, np.nan, np.maximum(change, 0.0)), length)
+    loss = rma(np.where(missing, np.nan, np.maximum(-change, 0.0)), length)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out = 100 * gain / (gain + loss)
+    return _shape_like(out, was_1d)
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    """MACD line, signal and histogram matching pandas_ta.macd"""
+    close, was_1d = _as_rows(close)
+    start = first_valid(close)
+    line = ema(close, fast, start) - ema(close, slow, start)
+    signal_line = ema(line, signal, first_valid(line))
+    histogram = line - signal_line
+    return tuple(_shape_like(v, was_1d) for v in (line, signal_line, histogram))
+
+
+def wave_trend(high, low, close, channel_length=10, average_length=21, signal_length=4):
+    """Wave Trend wt1/wt2 matching TradingBot's original pandas_ta calculation"""
+    high, was_1d = _as_rows(high)
+    low, _ = _as_rows(low)
+    close, _ = _as_rows(close)
+
+    hcl3 = (high + close + low) / 3
+    start = first_valid(hcl3)
+    esa = ema(hcl3, channel_length, start)
+    d = ema(np.abs(hcl3 - esa), channel_length, start)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ci = (hcl3 - esa) / (0.015 * d)
+    ci[~np.isfinite(ci)] = np.nan
+    wt1 = ema(ci, average_length, start)
+    wt2 = sma(wt1, signal_length)
+    return _shape_like(wt1, was_1d), _shape_like(wt2, was_1d)
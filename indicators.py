@@ -0,0 +1,329 @@
+import math
+
+import numpy as np
+
+from candle_buffer import CandleBuffer
+
+nan = float('nan')
+
+
+class StreamingEMA:
+    """Exponential moving average updated one value at a time
+
+    Matches pandas_ta.ema with its default SMA seed: the first `length`
+    inputs are averaged (ignoring NaN) and emitted at position length - 1,
+    afterwards the usual adjust=False recursion is applied.
+    """
+
+    def __init__(self, length):
+        self.length = length
+        self.alpha = 2.0 / (length + 1)
+        self.count = 0
+        self.seed_sum = 0.0
+        self.seed_valid = 0
+        self.value = nan
+
+    def state(self):
+        return (self.count, self.seed_sum, self.seed_valid, self.value)
+
+    def restore(self, state):
+        self.count, self.seed_sum, self.seed_valid, self.value = state
+
+    def update(self, x):
+        self.count += 1
+        if self.count < self.length:
+            if not math.isnan(x):
+                self.seed_sum += x
+                self.seed_valid += 1
+            return nan
+
+        if self.count == self.length:
+            if not math.isnan(x):
+                self.seed_sum += x
+                self.seed_valid += 1
+            self.value = self.seed_sum / self.seed_valid if self.seed_valid else nan
+        elif math.isnan(self.value):
+            # Recursion starts at the first valid value like DataFrame.ewm
+            self.value = x
+        elif not math.isnan(x):
+            self.value = self.alpha * x + (1 - self.alpha) * self.value
+        return self.value
+
+    def seed(self, values):
+        """Feed a history array and return the latest value"""
+        for x in values:
+            self.update(float(x))
+        return self.value
+
+
+class StreamingSMA:
+    """Simple moving average over a fixed window, updated in O(1)"""
+
+    def __init__(self, length):
+        self.length = length
+        self.window = [nan] * length
+        self.position = 0
+        self.count = 0
+        self.total = 0.0
+        self.invalid = length  # NaN values currently inside the window
+        self.value = nan
+
+    def state(self):
+        return (list(self.window), self.position, self.count, self.total, self.invalid, self.value)
+
+    def restore(self, state):
+        window, self.position, self.count, self.total, self.invalid, self.value = state
+        self.window = list(window)
+
+    def update(self, x):
+        old = self.window[self.position]
+        if math.isnan(old):
+            self.invalid -= 1
+        else:
+            self.total -= old
+
+        self.window[self.position] = x
+        self.position = (self.position + 1) % self.length
+        self.count += 1
+        if math.isnan(x):
+            self.invalid += 1
+        else:
+            self.total += x
+
+        if self.invalid == 0:
+            self.value = self.total / self.length
+        else:
+            self.value = nan
+        return self.value
+
+    def seed(self, values):
+        """Feed a history array and return the latest value"""
+        for x in values:
+            self.update(float(x))
+        return self.value
+
+
+class StreamingRMA:
+    """Wilder's moving average as computed by pandas_ta.rma
+
+    pandas_ta uses DataFrame.ewm(alpha=1/length, min_periods=length) with
+    the default adjust=True, so both the weighted sum and the sum of
+    weights are carried along.
+    """
+
+    def __init__(self, length):
+        self.length = length
+        self.decay = 1.0 - 1.0 / length
+        self.numerator = 0.0
+        self.denominator = 0.0
+        self.valid = 0
+        self.value = nan
+
+    def state(self):
+        return (self.numerator, self.denominator, self.valid, self.value)
+
+    def restore(self, state):
+        self.numerator, self.denominator, self.valid, self.value = state
+
+    def update(self, x):
+        if math.isnan(x):
+            return self.value
+        self.numerator = x + self.decay * self.numerator
+        self.denominator = 1.0 + self.decay * self.denominator
+        self.valid += 1
+        if self.valid >= self.length:
+            self.value = self.numerator / self.denominator
+        return self.value
+
+
+class StreamingRSI:
+    """Relative Strength Index matching pandas_ta.rsi (Wilder smoothing)"""
+
+    def __init__(self, length=14):
+        self.length = length
+        self.gain = StreamingRMA(length)
+        self.loss = StreamingRMA(length)
+        self.prev_close = nan
+        self.value = nan
+
+    def state(self):
+        return (self.gain.state(), self.loss.state(), self.prev_close, self.value)
+
+    def restore(self, state):
+        gain, loss, self.prev_close, self.value = state
+        self.gain.restore(gain)
+        self.loss.restore(loss)
+
+    def update(self, close):
+        change = close - self.prev_close
+        self.prev_close = close
+        if math.isnan(change):
+            return self.value
+
+        gain = self.gain.update(max(change, 0.0))
+        loss = self.loss.update(max(-change, 0.0))
+        total = gain + loss
+        self.value = 100 * gain / total if total else nan
+        return self.value
+
+    def seed(self, values):
+        """Feed a history of closes and return the latest value"""
+        for x in values:
+            self.update(float(x))
+        return self.value
+
+
+class StreamingMACD:
+    """MACD line, signal and histogram matching pandas_ta.macd
+
+    The signal EMA only starts once the MACD line has its first value,
+    like pandas_ta which runs it from macd.first_valid_index().
+    """
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = StreamingEMA(fast)
+        self.slow = StreamingEMA(slow)
+        self.signal_ema = StreamingEMA(signal)
+        self.macd = nan
+        self.signal = nan
+        self.histogram = nan
+
+    def state(self):
+        return (
+            self.fast.state(), self.slow.state(), self.signal_ema.state(),
+            self.macd, self.signal, self.histogram
+        )
+
+    def restore(self, state):
+        fast, slow, signal_ema, self.macd, self.signal, self.histogram = state
+        self.fast.restore(fast)
+        self.slow.restore(slow)
+        self.signal_ema.restore(signal_ema)
+
+    def update(self, close):
+        """Add one close and return (macd, signal, histogram)"""
+        self.macd = self.fast.update(close) - self.slow.update(close)
+        if not math.isnan(self.macd):
+            self.signal = self.signal_ema.update(self.macd)
+        self.histogram = self.macd - self.signal
+        return self.macd, self.signal, self.histogram
+
+    def seed(self, values):
+        """Feed a history of closes and return the latest (macd, signal, histogram)"""
+        for x in values:
+            self.update(float(x))
+        return self.macd, self.signal, self.histogram
+
+
+class WaveTrend:
+    """Incremental Wave Trend (wt1/wt2) matching TradingBot's batch calculation
+
+    Each closed candle is added with update() in constant time. Partial
+    candles can be added with provisional=True; such an update is undone
+    automatically by the next update() call or explicitly with rollback().
+
+    Args:
+        channel_length (int): EMA length of esa and d
+        average_length (int): EMA length of wt1
+        signal_length (int): SMA length of wt2
+    """
+
+    def __init__(self, channel_length=10, average_length=21, signal_length=4):
+        self.esa = StreamingEMA(channel_length)
+        self.d = StreamingEMA(channel_length)
+        self.tci = StreamingEMA(average_length)
+        self.wt2_sma = StreamingSMA(signal_length)
+        self.wt1 = nan
+        self.wt2 = nan
+        self.prev_wt1 = nan
+        self.prev_wt2 = nan
+        self._pending = None
+
+    def _state(self):
+        return (
+            self.esa.state(), self.d.state(), self.tci.state(), self.wt2_sma.state(),
+            self.wt1, self.wt2, self.prev_wt1, self.prev_wt2
+        )
+
+    def _restore(self, state):
+        esa, d, tci, sma, self.wt1, self.wt2, self.prev_wt1, self.prev_wt2 = state
+        self.esa.restore(esa)
+        self.d.restore(d)
+        self.tci.restore(tci)
+        self.wt2_sma.restore(sma)
+
+    def rollback(self):
+        """Undo the last provisional update"""
+        if self._pending is not None:
+            self._restore(self._pending)
+            self._pending = None
+
+    def update(self, high, low, close, provisional=False):
+        """Add one candle and return (wt1, wt2)"""
+        self.rollback()
+        if provisional:
+            self._pending = self._state()
+
+        hcl3 = (high + close + low) / 3
+        esa = self.esa.update(hcl3)
+        d = self.d.update(abs(hcl3 - esa))
+        ci = (hcl3 - esa) / (0.015 * d) if d else nan
+        wt1 = self.tci.update(ci)
+        wt2 = self.wt2_sma.update(wt1)
+
+        self.prev_wt1, self.prev_wt2 = self.wt1, self.wt2
+        self.wt1, self.wt2 = wt1, wt2
+        return wt1, wt2
+
+    def seed(self, high, low, close):
+        """Feed a history of closed candles"""
+        for h, l, c in zip(high, low, close):
+            self.update(float(h), float(l), float(c))
+        return self.wt1, self.wt2
+
+
+class WaveTrendSeries:
+    """Wave Trend over the last `capacity` candles of a polled kline window
+
+    Keeps a WaveTrend state plus a ring buffer of its outputs so a poller
+    that re-downloads the same recent window only feeds the new candles.
+    The newest candle of every window is treated as still open.
+    """
+
+    def __init__(self, capacity=100, channel_length=10, average_length=21):
+        self.capacity = capacity
+        self.channel_length = channel_length
+        self.average_length = average_length
+        self.reset()
+
+    def reset(self):
+        self.wave_trend = WaveTrend(self.channel_length, self.average_length)
+        self.values = CandleBuffer(self.capacity, fields=('timestamp', 'wt1', 'wt2'))
+        self.last_closed = None
+
+    def sync(self, timestamps, high, low, close):
+        """Feed a window of candles and return the wt1/wt2 arrays aligned with its tail"""
+        timestamps = np.asarray(timestamps)
+        high = np.asarray(high, dtype=np.float64)
+        low = np.asarray(low, dtype=np.float64)
+        close = np.asarray(close, dtype=np.float64)
+        if len(timestamps) == 0:
+            return self.values['wt1'], self.values['wt2']
+
+        # Window no longer connects to what we have seen, start over
+        if self.last_closed is not None and timestamps[0] > self.last_closed:
+            self.reset()
+
+        start = 0
+        if self.last_closed is not None:
+            start = int(np.searchsorted(timestamps, self.last_closed, side='right'))
+
+        last = len(timestamps) - 1
+        for i in range(start, len(timestamps)):
+            provisional = i == last
+            wt1, wt2 = self.wave_trend.update(float(high[i]), float(low[i]), float(close[i]), provisional=provisional)
+            self.values.append(timestamps[i], wt1=wt1, wt2=wt2)
+            if not provisional:
+                self.last_closed = timestamps[i]
+
+        return self.values['wt1'], self.values['wt2']
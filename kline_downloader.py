@@ -0,0 +1,166 @@
+import contextlib
+import threading
+import time
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from kline_store import interval_to_ms
+from request_scheduler import BACKFILL, LIVE
+
+# Binance returns at most this many candles per /api/v3/klines request
+PAGE_LIMIT = 1000
+# Request weight of a /api/v3/klines call
+KLINES_WEIGHT = 2
+
+
+class WeightBudget:
+    """Sliding one-minute window of REST request weight shared by worker threads
+
+    Only used with clients without a request_scheduler.RequestScheduler,
+    which keeps the weight of all REST calls itself.
+    """
+
+    def __init__(self, max_weight=1200, period=60.0):
+        self.max_weight = max_weight
+        self.period = period
+        self._used = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self, weight):
+        """Block until `weight` fits into the budget, then consume it"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._used and now - self._used[0][0] >= self.period:
+                    self._used.popleft()
+                used = sum(w for _, w in self._used)
+                if used + weight <= self.max_weight:
+                    self._used.append((now, weight))
+                    return
+                wait = self.period - (now - self._used[0][0])
+            time.sleep(max(wait, 0.01))
+
+
+class KlineDownloader:
+    """Download a kline range as concurrent 1000-candle pages
+
+    Args:
+        client: Object exposing get_klines(symbol, interval, startTime, endTime, limit)
+            like binance.client.Client
+        max_workers (int): Number of pages fetched at the same time
+        max_weight (int): Request weight allowed per minute for downloads,
+            for clients without a request scheduler
+        retries (int): Attempts per page before giving up
+    """
+
+    def __init__(self, client, max_workers=8, max_weight=1200, retries=3):
+        self.client = client
+        self.max_workers = max_workers
+        self.budget = WeightBudget(max_weight)
+        self.retries = retries
+
+    def windows(self, interval, start_time, end_time):
+        """Split [start_time, end_time] into windows of at most PAGE_LIMIT candles"""
+        step = PAGE_LIMIT * interval_to_ms(interval)
+        windows = []
+        window_start = int(start_time)
+        while window_start <= end_time:
+            window_end = min(window_start + step - 1, int(end_time))
+            windows.append((window_start, window_end))
+            window_start = window_end + 1
+        return windows
+
+    def page_priority(self, pages):
+        """Request priority of a download on a scheduled client, None for other clients
+
+        The calling thread's priority is passed on to the worker threads;
+        without one a single page counts as live data and more as backfill.
+        """
+        if getattr(self.client, 'scheduler', None) is None:
+            return None
+        priority = self.client.current_priority()
+        if priority is None:
+            priority = LIVE if pages == 1 else BACKFILL
+        return priority
+
+    def fetch_page(self, symbol, interval, start_time, end_time, priority=None):
+        for attempt in range(self.retries):
+            if priority is None:
+                self.budget.acquire(KLINES_WEIGHT)
+            try:
+                with self.client.priority(priority) if priority is not None else contextlib.nullcontext():
+                    return self.client.get_klines(
+                        symbol=symbol,
+                        interval=interval,
+                        startTime=start_time,
+                        endTime=end_time,
+                        limit=PAGE_LIMIT
+                    )
+            except Exception as e:
+                if attempt == self.retries - 1:
+                    raise
+                print(f"Kline page {symbol} {start_time}-{end_time} failed ({e}), retrying...")
+                time.sleep(2 ** attempt)
+
+    def download(self, symbol, interval, start_time, end_time, progress=None):
+        """Download all klines in [start_time, end_time]
+
+        Args:
+            symbol (str): Trading pair, e.g. BTCUSDT
+            interval (str): Kline interval, e.g. 1m
+            start_time (int): Start timestamp in milliseconds
+            end_time (int): End timestamp in milliseconds
+            progress (callable): Called as progress(done_pages, total_pages) from
+                the calling thread after each finished page
+
+        Returns:
+            list: Raw klines ordered by open time without duplicated candles
+        """
+        return self.download_ranges(symbol, interval, [(start_time, end_time)], progress)
+
+    def download_ranges(self, symbol, interval, ranges, progress=None):
+        """Download several (start, end) ranges in one concurrent pass
+
+        Used to fill the gaps of a partly stored range. Pages of all ranges
+        share the same worker pool and weight budget.
+        """
+        windows = []
+        for start_time, end_time in sorted(ranges):
+            windows.extend(self.windows(interval, start_time, end_time))
+        if not windows:
+            return []
+
+        pages = [None] * len(windows)
+        priority = self.page_priority(len(windows))
+        if len(windows) == 1:
+            pages[0] = self.fetch_page(symbol, interval, *windows[0], priority)
+            if progress:
+                progress(1, 1)
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(windows))) as executor:
+                futures = {
+                    executor.submit(self.fetch_page, symbol, interval, window_start, window_end, priority): i
+                    for i, (window_start, window_end) in enumerate(windows)
+                }
+                for done, future in enumerate(as_completed(futures), 1):
+                    try:
+                        pages[futures[future]] = future.result()
+                    except Exception:
+                        for pending in futures:
+                            pending.cancel()
+                        traceback.print_exc()
+                        raise
+                    if progress:
+                        progress(done, len(windows))
+
+        # Stitch pages in order and drop candles repeated on page boundaries
+        klines = []
+        last_open_time = None
+        for page in pages:
+            for kline in page or []:
+                if last_open_time is not None and kline[0] <= last_open_time:
+                    continue
+                klines.append(kline)
+                last_open_time = kline[0]
+        return klines
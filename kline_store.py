@@ -0,0 +1,334 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+# Column layout of the on-disk store. Every column lives in its own
+# fixed-width binary file so a range query only touches the bytes it needs.
+COLUMNS = [
+    ('timestamp', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8'),
+    ('quote_volume', '<f8'),
+    ('trades_count', '<i8'),
+]
+
+# Position of each stored column inside a raw Binance kline list
+KLINE_FIELDS = {
+    'timestamp': 0,
+    'open': 1,
+    'high': 2,
+    'low': 3,
+    'close': 4,
+    'volume': 5,
+    'quote_volume': 7,
+    'trades_count': 8,
+}
+
+INTERVAL_MS = {
+    '1s': 1000,
+    '1m': 60 * 1000,
+    '3m': 3 * 60 * 1000,
+    '5m': 5 * 60 * 1000,
+    '15m': 15 * 60 * 1000,
+    '30m': 30 * 60 * 1000,
+    '1h': 60 * 60 * 1000,
+    '2h': 2 * 60 * 60 * 1000,
+    '4h': 4 * 60 * 60 * 1000,
+    '6h': 6 * 60 * 60 * 1000,
+    '8h': 8 * 60 * 60 * 1000,
+    '12h': 12 * 60 * 60 * 1000,
+    '1d': 24 * 60 * 60 * 1000,
+    '3d': 3 * 24 * 60 * 60 * 1000,
+    '1w': 7 * 24 * 60 * 60 * 1000,
+    '1M': 30 * 24 * 60 * 60 * 1000,  # Approximation, months are not fixed width
+}
+
+
+def interval_to_ms(interval):
+    """Return the length of a Binance kline interval in milliseconds"""
+    if interval not in INTERVAL_MS:
+        raise ValueError(f"Unsupported interval: {interval}")
+    return INTERVAL_MS[interval]
+
+
+def now_ms():
+    return int(time.time() * 1000)
+
+
+def empty_columns():
+    return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS}
+
+
+def klines_to_columns(klines):
+    """Convert raw Binance kline lists into a dict of typed column arrays"""
+    if not klines:
+        return empty_columns()
+
+    raw = np.asarray(klines, dtype=object)
+    columns = {}
+    for name, dtype in COLUMNS:
+        values = raw[:, KLINE_FIELDS[name]]
+        if dtype == '<i8':
+            columns[name] = values.astype(np.int64)
+        else:
+            columns[name] = values.astype(np.float64)
+    return columns
+
+
+def columns_to_frame(columns, fields=None, datetime_index=True):
+    """Build a DataFrame indexed by timestamp from stored columns
+
+    Args:
+        columns (dict): Column arrays as returned by KlineStore.read
+        fields (list): Columns to include, defaults to all price/volume columns
+        datetime_index (bool): Use a DatetimeIndex instead of float milliseconds
+    """
+    fields = fields or [name for name, _ in COLUMNS if name != 'timestamp']
+    df = pd.DataFrame({name: np.array(columns[name]) for name in fields})
+
+    if datetime_index:
+        df.index = pd.to_datetime(np.array(columns['timestamp']), unit='ms')
+    else:
+        df.index = np.array(columns['timestamp'], dtype=np.float64)
+    df.index.name = 'timestamp'
+    return df
+
+
+class KlineStore:
+    """Persistent columnar kline store keyed by symbol and interval
+
+    Each symbol/interval pair gets its own directory with one fixed-width
+    file per column and a small manifest. Readers memory-map the column
+    files and locate ranges with a binary search on the timestamp column.
+    The manifest is replaced atomically and is the source of truth for the
+    number of valid rows, so a crash in the middle of a write never exposes
+    a partially written candle.
+    """
+
+    def __init__(self, root=os.path.join('data', 'klines')):
+        self.root = root
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._maps = {}
+
+    def _lock(self, symbol, interval):
+        key = (symbol, interval)
+        with self._locks_guard:
+            if key not in self._locks:
+                self._locks[key] = threading.RLock()
+            return self._locks[key]
+
+    def _directory(self, symbol, interval):
+        return os.path.join(self.root, symbol.upper(), interval)
+
+    def _column_path(self, directory, name, generation):
+        return os.path.join(directory, f"{name}.{generation}.bin")
+
+    def _load_manifest(self, symbol, interval):
+        path = os.path.join(self._directory(symbol, interval), 'manifest.json')
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'generation': 0, 'rows': 0, 'covered': []}
+
+    def _save_manifest(self, symbol, interval, manifest):
+        directory = self._directory(symbol, interval)
+        path = os.path.join(directory, 'manifest.json')
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _columns(self, symbol, interval, manifest):
+        """Return memory-mapped columns for the current manifest"""
+        key = (symbol, interval)
+        stamp = (manifest['generation'], manifest['rows'])
+        cached = self._maps.get(key)
+        if cached and cached[0] == stamp:
+            return cached[1]
+
+        rows = manifest['rows']
+        if rows == 0:
+            columns = empty_columns()
+        else:
+            directory = self._directory(symbol, interval)
+            columns = {}
+            for name, dtype in COLUMNS:
+                columns[name] = np.memmap(
+                    self._column_path(directory, name, manifest['generation']),
+                    dtype=dtype,
+                    mode='r',
+                    shape=(rows,)
+                )
+        self._maps[key] = (stamp, columns)
+        return columns
+
+    def read(self, symbol, interval, start_time=None, end_time=None):
+        """Return the stored candles whose open time is within [start_time, end_time]
+
+        The returned arrays are read-only views on the memory-mapped files.
+        """
+        with self._lock(symbol, interval):
+            manifest = self._load_manifest(symbol, interval)
+            columns = self._columns(symbol, interval, manifest)
+
+        timestamps = columns['timestamp']
+        lo = 0 if start_time is None else int(np.searchsorted(timestamps, int(start_time), side='left'))
+        hi = len(timestamps) if end_time is None else int(np.searchsorted(timestamps, int(end_time), side='right'))
+        return {name: values[lo:hi] for name, values in columns.items()}
+
+    def covers(self, symbol, interval, start_time, end_time):
+        """Check whether [start_time, end_time] has already been fetched with closed candles only"""
+        return not self.missing(symbol, interval, start_time, end_time)
+
+    def missing(self, symbol, interval, start_time, end_time):
+        """Return the (start, end) ranges of [start_time, end_time] that still have to be fetched
+
+        Ranges are in milliseconds and inclusive. The still-open last candle is
+        never covered, so a range reaching the present always ends with a gap.
+        """
+        manifest = self._load_manifest(symbol, interval)
+        start_time, end_time = int(start_time), int(end_time)
+
+        gaps = []
+        cursor = start_time
+        for covered_start, covered_end in manifest.get('covered', []):
+            if covered_end < cursor:
+                continue
+            if covered_start > end_time:
+                break
+            if covered_start > cursor:
+                gaps.append((cursor, covered_start - 1))
+            cursor = covered_end + 1
+            if cursor > end_time:
+                break
+        if cursor <= end_time:
+            gaps.append((cursor, end_time))
+        return gaps
+
+    def write(self, symbol, interval, columns, ranges=None):
+        """Merge candles into the store
+
+        Candles newer than the last stored one are appended in place and
+        candles overlapping the stored tail (e.g. a refreshed open candle)
+        are overwritten in place. Anything else triggers a rewrite into a
+        new file generation. The fetched (start, end) ranges are recorded
+        as covered up to the last candle that was closed at write time, in
+        the same manifest update that publishes the new rows.
+        """
+        with self._lock(symbol, interval):
+            manifest = self._load_manifest(symbol, interval)
+            directory = self._directory(symbol, interval)
+            os.makedirs(directory, exist_ok=True)
+
+            new_ts = np.asarray(columns['timestamp'], dtype=np.int64)
+            if len(new_ts):
+                order = np.argsort(new_ts, kind='stable')
+                # Keep the last occurrence of duplicated timestamps
+                _, last = np.unique(new_ts[order][::-1], return_index=True)
+                keep = order[::-1][last]
+                new = {name: np.asarray(columns[name], dtype=dtype)[keep] for name, dtype in COLUMNS}
+
+                stored = self._columns(symbol, interval, manifest)
+                stored_ts = stored['timestamp']
+                rows = manifest['rows']
+
+                if rows == 0:
+                    self._rewrite(directory, manifest, new)
+                else:
+                    split = int(np.searchsorted(new['timestamp'], stored_ts[-1], side='right'))
+                    overlap_ts = new['timestamp'][:split]
+                    tail_start = int(np.searchsorted(stored_ts, overlap_ts[0])) if split else rows
+
+                    in_place = tail_start + split == rows and np.array_equal(stored_ts[tail_start:], overlap_ts)
+                    if split == 0 or in_place:
+                        self._append(directory, manifest, new, split, tail_start)
+                    else:
+                        merged = {}
+                        all_ts = np.concatenate([np.array(stored_ts), new['timestamp']])
+                        order = np.argsort(all_ts, kind='stable')
+                        _, last = np.unique(all_ts[order][::-1], return_index=True)
+                        keep = order[::-1][last]
+                        for name, dtype in COLUMNS:
+                            merged[name] = np.concatenate([np.array(stored[name]), new[name]])[keep]
+                        self._rewrite(directory, manifest, merged)
+
+            # Candles that were still open when fetched must be fetched again
+            current = now_ms()
+            closed_until = current - current % interval_to_ms(interval) - 1
+            open_ts = new_ts[new_ts + interval_to_ms(interval) > current]
+            if len(open_ts):
+                closed_until = min(closed_until, int(open_ts.min()) - 1)
+
+            for start_time, end_time in ranges or []:
+                self._mark_covered(manifest, int(start_time), min(int(end_time), closed_until))
+
+            self._maps.pop((symbol, interval), None)
+            self._save_manifest(symbol, interval, manifest)
+            self._remove_stale(directory, manifest['generation'])
+
+    def _append(self, directory, manifest, new, split, tail_start):
+        """Overwrite the overlapping tail and append the remaining rows"""
+        generation = manifest['generation']
+        rows = manifest['rows']
+        for name, dtype in COLUMNS:
+            path = self._column_path(directory, name, generation)
+            itemsize = np.dtype(dtype).itemsize
+            with open(path, 'r+b') as f:
+                # Drop bytes past the manifest left over from an interrupted write
+                if os.path.getsize(path) > rows * itemsize:
+                    f.truncate(rows * itemsize)
+                if split:
+                    f.seek(tail_start * itemsize)
+                    f.write(new[name][:split].tobytes())
+                f.seek(rows * itemsize)
+                f.write(new[name][split:].tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+        manifest['rows'] = rows + len(new['timestamp']) - split
+
+    def _rewrite(self, directory, manifest, columns):
+        """Write all columns into a fresh generation"""
+        generation = manifest['generation'] + 1
+        for name, dtype in COLUMNS:
+            path = self._column_path(directory, name, generation)
+            with open(path, 'wb') as f:
+                f.write(np.asarray(columns[name], dtype=dtype).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+        manifest['generation'] = generation
+        manifest['rows'] = len(columns['timestamp'])
+
+    def _mark_covered(self, manifest, start_time, end_time):
+        if end_time < start_time:
+            return
+
+        # Insert the range and merge it with touching or overlapping ones
+        merged = []
+        for covered_start, covered_end in sorted(manifest.get('covered', []) + [[start_time, end_time]]):
+            if merged and covered_start <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], covered_end)
+            else:
+                merged.append([covered_start, covered_end])
+        manifest['covered'] = merged
+
+    def _remove_stale(self, directory, generation):
+        """Remove column files left behind by older generations"""
+        suffix = f".{generation}.bin"
+        for file in os.listdir(directory):
+            if file.endswith('.bin') and not file.endswith(suffix):
+                try:
+                    os.remove(os.path.join(directory, file))
+                except OSError:
+                    # Still mapped by a reader on platforms that lock mapped files
+                    pass
@@ -0,0 +1,95 @@
+import importlib
+import threading
+import time
+import types
+from contextlib import contextmanager
+
+# Reference point of the startup report, close enough to interpreter start
+# because trading_gui imports this module first
+PROCESS_START = time.perf_counter()
+
+
+class StartupTimer:
+    """Collects how long imports and startup phases take
+
+    Every entry is (kind, name, seconds) where kind is 'import' for eager
+    imports, 'lazy' for deferred imports and 'phase' for constructor steps.
+    """
+
+    def __init__(self):
+        self.records = []
+        self.marks = {}
+        self._lock = threading.Lock()
+
+    def record(self, kind, name, seconds):
+        with self._lock:
+            self.records.append((kind, name, seconds))
+
+    @contextmanager
+    def phase(self, name, kind='phase'):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(kind, name, time.perf_counter() - started)
+
+    def mark(self, name):
+        """Remember the time since process start under `name`, e.g. 'window shown'"""
+        with self._lock:
+            self.marks[name] = time.perf_counter() - PROCESS_START
+
+    def report(self):
+        """Return the timings as a printable table in milliseconds"""
+        with self._lock:
+            records = list(self.records)
+            marks = dict(self.marks)
+
+        lines = ["Startup timing (ms):"]
+        for kind, name, seconds in records:
+            lines.append(f"  {kind:<7} {name:<40} {seconds * 1000:9.1f}")
+        for name, seconds in marks.items():
+            lines.append(f"  {'mark':<7} {name:<40} {seconds * 1000:9.1f}")
+        return "\n".join(lines)
+
+
+startup_timer = StartupTimer()
+
+
+class LazyModule(types.ModuleType):
+    """Stand-in for a module that is imported on first attribute access
+
+    The import time is recorded in startup_timer as a 'lazy' entry.
+    Loading is thread safe, so worker threads may trigger it as well.
+    """
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__['_module'] = None
+        self.__dict__['_lock'] = threading.Lock()
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            with self.__dict__['_lock']:
+                module = self.__dict__['_module']
+                if module is None:
+                    with startup_timer.phase(self.__name__, kind='lazy'):
+                        module = importlib.import_module(self.__name__)
+                    self.__dict__['_module'] = module
+        return module
+
+    @property
+    def is_loaded(self):
+        return self.__dict__['_module'] is not None
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+
+def lazy_import(name):
+    """Return a LazyModule for `name`; nothing is imported until it is used"""
+    return LazyModule(name)
+
@@ -0,0 +1,502 @@
+import json
+import math
+import queue
+import threading
+import time
+
+from candle_buffer import CandleBuffer
+from indicators import StreamingRSI, StreamingSMA
+from kline_store import interval_to_ms, now_ms
+from lazy_imports import lazy_import
+
+websocket = lazy_import('websocket')
+
+MARKET_STREAM_URL = "wss://stream.binance.com:9443/stream?streams=!miniTicker@arr"
+# Binance allows 1024 streams per connection and 5 incoming messages per second
+MAX_STREAMS = 1024
+# Seconds before a stream whose history failed to load is retried, doubling up to the maximum
+RETRY_DELAY = 10.0
+MAX_RETRY_DELAY = 600.0
+
+
+def market_row(symbol, ticker, market):
+    """Row of the market table: 24h ticker values, RSI, trend and signal"""
+    rsi, sma = (market.rsi, market.sma) if market is not None else (math.nan, math.nan)
+    price = ticker['price']
+
+    if rsi > 50 and price > sma:
+        trend = "BULLISH"
+    elif rsi < 50 and price < sma:
+        trend = "BEARISH"
+    else:
+        trend = "NEUTRAL"
+
+    if rsi < 30:
+        signal = "BUY"
+    elif rsi > 70:
+        signal = "SELL"
+    else:
+        signal = "NEUTRAL"
+
+    return {
+        'symbol': symbol,
+        'price': price,
+        'change': ticker['change'],
+        'high': ticker['high'],
+        'low': ticker['low'],
+        'volume': ticker['volume'],
+        'signal': signal,
+        'rsi': rsi,
+        'trend': trend,
+    }
+
+
+class _Market:
+    """Candles and indicators of one symbol fed by its kline stream
+
+    Indicators are advanced on closed candles; the forming candle is applied
+    on top of the closed state and rolled back on its next update.
+    """
+
+    def __init__(self, interval, history):
+        self.interval_ms = interval_to_ms(interval)
+        self.candles = CandleBuffer(history)
+        self.rsi_indicator = StreamingRSI(14)
+        self.sma_indicator = StreamingSMA(20)
+        self.closed_state = (self.rsi_indicator.state(), self.sma_indicator.state())
+        self.rsi = math.nan
+        self.sma = math.nan
+        self.last_closed = None  # Open time of the newest closed candle
+
+    def close_candle(self, timestamp, open, high, low, close, volume):
+        self.candles.append(timestamp, open=open, high=high, low=low, close=close, volume=volume)
+        self.rsi = self.rsi_indicator.update(close)
+        self.sma = self.sma_indicator.update(close)
+        self.closed_state = (self.rsi_indicator.state(), self.sma_indicator.state())
+        self.last_closed = timestamp
+
+    def update_candle(self, timestamp, open, high, low, close, volume):
+        self.candles.append(timestamp, open=open, high=high, low=low, close=close, volume=volume)
+        self.rsi = self.rsi_indicator.update(close)
+        self.sma = self.sma_indicator.update(close)
+        self.rsi_indicator.restore(self.closed_state[0])
+        self.sma_indicator.restore(self.closed_state[1])
+
+
+class MarketFeed:
+    """Market overview kept in memory from Binance websocket streams
+
+    One connection receives !miniTicker@arr, the 24h ticker of every symbol
+    that changed in the last second, and the <symbol>@kline_<interval>
+    streams of the quote-asset pairs above `min_volume`, which are
+    subscribed as pairs cross the threshold. Each such pair keeps a ring
+    buffer of candles with RSI(14) and SMA(20); its history is loaded once
+    through `load_history`, after that candles only come from the stream.
+    Other symbols and intervals are followed the same way while watched,
+    see watch().
+
+    Symbols whose row changed are collected until changes() is called, so
+    a consumer only redraws what moved; `listeners` are called with
+    (symbol, interval) after every kline update. The connection is
+    reopened with a growing delay when it drops.
+
+    Args:
+        load_history: Function (symbol, interval, limit) -> DataFrame of
+            recent candles indexed by open time in milliseconds
+        load_histories: Optional function (symbols, interval, limit) -> dict
+            of such DataFrames, used to load streams queued together at once
+        interval (str): Kline interval of the indicators, e.g. 1m
+        min_volume (float): 24h quote volume a pair needs to be listed
+        quote (str): Quote asset of the listed pairs
+        history (int): Candles kept per symbol
+    """
+
+    def __init__(self, load_history, interval='1m', min_volume=5_000_000, quote='USDT', history=50,
+                 load_histories=None):
+        self.load_history = load_history
+        self.load_histories = load_histories
+        self.interval = interval
+        self.min_volume = min_volume
+        self.quote = quote
+        self.history = history
+
+        self.tickers = {}    # Symbol -> latest 24h mini ticker
+        self.markets = {}    # (symbol, interval) -> _Market, for seeded streams
+        self.listeners = []  # Functions (symbol, interval) called on kline updates
+        self.history_loads = 0
+        self.stream_events = 0
+
+        self._changed = set()
+        self._watched = {}        # (symbol, interval) -> [watchers, candles kept]
+        self._subscribed = set()  # Kline streams requested on the current connection
+        self._pending = set()     # Seeded streams waiting to be subscribed
+        self._dropped = set()     # Streams waiting to be unsubscribed
+        self._seeding = set()
+        self._failed = {}         # (symbol, interval) -> (monotonic time of the next try, delay)
+        self._seed_queue = queue.Queue()
+        self._lock = threading.RLock()
+        self._ws = None
+        self._message_id = 0
+        self._live = False
+        self._stop = threading.Event()
+        self._threads = []
+
+    # Reads
+
+    @property
+    def live(self):
+        """Whether the market stream is connected"""
+        return self._live
+
+    def is_listed(self, symbol):
+        """Whether a symbol passes the quote asset and volume filter"""
+        ticker = self.tickers.get(symbol)
+        return ticker is not None and symbol.endswith(self.quote) and ticker['volume'] > self.min_volume
+
+    def listed(self):
+        """Symbols that pass the quote asset and volume filter"""
+        with self._lock:
+            return [symbol for symbol in self.tickers if self.is_listed(symbol)]
+
+    def rows(self, symbols=None):
+        """Market table rows of the listed symbols with indicators"""
+        with self._lock:
+            if symbols is None:
+                symbols = self.listed()
+            return [
+                market_row(symbol, self.tickers[symbol], self.markets[(symbol, self.interval)])
+                for symbol in symbols
+                if (symbol, self.interval) in self.markets and symbol in self.tickers
+            ]
+
+    def changes(self):
+        """Rows that changed since the previous call, listed symbols only"""
+        with self._lock:
+            changed, self._changed = self._changed, set()
+            return self.rows([symbol for symbol in changed if self.is_listed(symbol)])
+
+    def ticker(self, symbol):
+        """Copy of the latest 24h ticker of a symbol, None if none arrived yet"""
+        with self._lock:
+            ticker = self.tickers.get(symbol)
+            return dict(ticker) if ticker is not None else None
+
+    def ticker_snapshot(self):
+        """Copy of the latest 24h tickers of all symbols"""
+        with self._lock:
+            return {symbol: dict(ticker) for symbol, ticker in self.tickers.items()}
+
+    def candles(self, symbol, interval, limit=None):
+        """Copy of the newest `limit` candles of a followed stream
+
+        Returns:
+            dict: Field name -> array, None if the stream is not loaded yet
+                or keeps fewer than `limit` candles
+        """
+        with self._lock:
+            market = self.markets.get((symbol, interval))
+            if market is None or (limit is not None and market.candles.capacity < limit):
+                return None
+            size = len(market.candles) if limit is None else min(limit, len(market.candles))
+            return {name: market.candles[name][len(market.candles) - size:].copy()
+                    for name in market.candles.fields}
+
+    def watch(self, symbol, interval, history=None):
+        """Follow the kline stream of a symbol until unwatch() is called as often
+
+        The stream shares the connection with the market overview; watching
+        a stream that is already followed adds no exchange traffic.
+        """
+        key = (symbol, interval)
+        with self._lock:
+            watch = self._watched.setdefault(key, [0, self.history])
+            watch[0] += 1
+            watch[1] = max(watch[1], history or 0)
+            market = self.markets.get(key)
+            if market is not None and market.candles.capacity < watch[1]:
+                # Needs more candles than the stream currently keeps
+                self._reseed(key)
+            elif market is None:
+                self._dropped.discard(key)
+                self._seed_later(key)
+        self.start()
+
+    def unwatch(self, symbol, interval):
+        key = (symbol, interval)
+        with self._lock:
+            watch = self._watched.get(key)
+            if watch is None:
+                return
+            watch[0] -= 1
+            if watch[0] > 0:
+                return
+            del self._watched[key]
+            if not self._wanted(key):
+                self.markets.pop(key, None)
+                self._pending.discard(key)
+                if key in self._subscribed:
+                    self._dropped.add(key)
+
+    def _wanted(self, key):
+        symbol, interval = key
+        return key in self._watched or (interval == self.interval and self.is_listed(symbol))
+
+    def stats(self, rows=None):
+        """Totals of the market tab, in the format MarketUpdateThread emits"""
+        rows = self.rows() if rows is None else rows
+        volumes = {row['symbol']: row['volume'] for row in rows}
+        btc = self.tickers.get('BTC' + self.quote)
+        total_volume = sum(volumes.values())
+        return {
+            'total_volume': total_volume,
+            'total_market_cap': total_volume,
+            'btc_price': btc['price'] if btc else 0,
+            'btc_market_cap': volumes.get('BTC' + self.quote, 0),
+            'eth_market_cap': volumes.get('ETH' + self.quote, 0),
+            'price_changes': [(row['symbol'], row['change']) for row in rows],
+            'volumes': volumes,
+        }
+
+    # Connection
+
+    def start(self):
+        """Connect the stream and start loading history on daemon threads"""
+        with self._lock:
+            if self._threads:
+                return
+            self._stop.clear()
+            self._threads = [
+                threading.Thread(target=self._run, name="market-stream", daemon=True),
+                threading.Thread(target=self._seed_loop, name="market-history", daemon=True),
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._seed_queue.put(None)
+        ws = self._ws
+        if ws is not None:
+            ws.close()
+        for thread in self._threads:
+            thread.join(5)
+        self._threads = []
+
+    def _run(self):
+        delay = 1.0
+        while not self._stop.is_set():
+            try:
+                self._ws = websocket.WebSocketApp(
+                    MARKET_STREAM_URL,
+                    on_open=lambda ws: self._on_open(),
+                    on_message=lambda ws, message: self.on_message(message),
+                    on_error=lambda ws, error: print(f"Market stream error: {error}"),
+                )
+                started = time.monotonic()
+                self._ws.run_forever(ping_interval=60, ping_timeout=20)
+                if time.monotonic() - started > 60:
+                    delay = 1.0
+            except Exception as e:
+                print(f"Market stream failed: {e}")
+            finally:
+                self._live = False
+            self._stop.wait(delay)
+            delay = min(delay * 2, 60.0)
+
+    def _on_open(self):
+        with self._lock:
+            self._live = True
+            # A new connection starts without kline streams
+            self._pending |= self._subscribed
+            self._subscribed = set()
+            self._dropped = set()
+
+    def _stream(self, key):
+        symbol, interval = key
+        return f"{symbol.lower()}@kline_{interval}"
+
+    def _send(self, method, keys):
+        self._message_id += 1
+        self._ws.send(json.dumps({
+            'method': method,
+            'params': [self._stream(key) for key in keys],
+            'id': self._message_id,
+        }))
+
+    def _subscribe(self):
+        """Send the pending subscription changes, at most one message per kind"""
+        with self._lock:
+            if self._ws is None or not self._live:
+                return
+            dropped = sorted(self._dropped)
+            self._dropped = set()
+            self._subscribed.difference_update(dropped)
+            room = MAX_STREAMS - 1 - len(self._subscribed)
+            keys = sorted(self._pending)[:max(room, 0)]
+            self._pending.difference_update(keys)
+            self._subscribed.update(keys)
+        try:
+            if dropped:
+                self._send('UNSUBSCRIBE', dropped)
+            if keys:
+                self._send('SUBSCRIBE', keys)
+        except Exception as e:
+            print(f"Market stream subscribe failed: {e}")
+            with self._lock:
+                self._subscribed.difference_update(keys)
+                self._pending.update(keys)
+
+    # Stream events
+
+    def on_message(self, message):
+        """Apply one combined stream message"""
+        message = json.loads(message) if isinstance(message, str) else message
+        data = message.get('data')
+        if data is None:
+            return  # Reply to a SUBSCRIBE request
+
+        self.stream_events += 1
+        if isinstance(data, list):
+            self._on_tickers(data)
+            # Piggyback on the once-per-second ticker to stay under the message limit
+            self._subscribe()
+        elif data.get('e') == 'kline':
+            k = data['k']
+            if self._on_kline((data['s'], k['i']), k):
+                for listener in list(self.listeners):
+                    try:
+                        listener(data['s'], k['i'])
+                    except Exception as e:
+                        print(f"Market listener error: {e}")
+
+    def _on_tickers(self, tickers):
+        with self._lock:
+            for t in tickers:
+                symbol = t['s']
+                close, open = float(t['c']), float(t['o'])
+                self.tickers[symbol] = {
+                    'price': close,
+                    'change': (close - open) / open * 100 if open else 0.0,
+                    'high': float(t['h']),
+                    'low': float(t['l']),
+                    'volume': float(t['q']),
+                }
+                if not self.is_listed(symbol):
+                    continue
+                key = (symbol, self.interval)
+                if key in self.markets:
+                    self._changed.add(symbol)
+                elif key not in self._failed or self._failed[key][0] <= time.monotonic():
+                    self._seed_later(key)
+
+    def _on_kline(self, key, k):
+        """Apply a kline update, True if it changed the candles"""
+        with self._lock:
+            market = self.markets.get(key)
+            if market is None:
+                return False
+            timestamp = float(k['t'])
+            candle = (timestamp, float(k['o']), float(k['h']), float(k['l']), float(k['c']), float(k['v']))
+            last = market.last_closed
+            if last is not None and timestamp <= last:
+                return False
+            if last is not None and timestamp > last + market.interval_ms:
+                # A closed candle was missed, e.g. while reconnecting
+                self._reseed(key)
+                return False
+
+            if k['x']:
+                market.close_candle(*candle)
+            else:
+                market.update_candle(*candle)
+            if key[1] == self.interval:
+                self._changed.add(key[0])
+            return True
+
+    # History
+
+    def _seed_later(self, key):
+        if key not in self._seeding:
+            self._seeding.add(key)
+            self._seed_queue.put(key)
+
+    def _reseed(self, key):
+        # The kline stream stays subscribed while the history reloads
+        del self.markets[key]
+        self._seed_later(key)
+
+    def _seed_loop(self):
+        while not self._stop.is_set():
+            keys = [self._seed_queue.get()]
+            # Everything queued meanwhile is loaded in the same batch
+            while True:
+                try:
+                    keys.append(self._seed_queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in keys:
+                break
+            self._seed(keys)
+
+    def _seed(self, keys):
+        """Load the history of queued streams, batched by interval and length"""
+        batches = {}
+        with self._lock:
+            for key in keys:
+                if self._wanted(key):
+                    history = max(self.history, self._watched.get(key, (0, 0))[1])
+                    batches.setdefault((key[1], history), []).append(key[0])
+                else:
+                    self._seeding.discard(key)
+
+        for (interval, history), symbols in batches.items():
+            try:
+                frames = self._load(symbols, interval, history)
+            except Exception as e:
+                print(f"Market history for {len(symbols)} {interval} streams failed: {e}")
+                frames = {}
+            with self._lock:
+                for symbol in symbols:
+                    key = (symbol, interval)
+                    self._seeding.discard(key)
+                    if not self._wanted(key):
+                        continue
+                    if symbol not in frames:
+                        # Delisted or failing symbols must not be reloaded on every ticker
+                        delay = RETRY_DELAY
+                        if key in self._failed:
+                            delay = min(self._failed[key][1] * 2, MAX_RETRY_DELAY)
+                        self._failed[key] = (time.monotonic() + delay, delay)
+                        continue
+                    self._failed.pop(key, None)
+                    self.markets[key] = self._market(interval, history, frames[symbol])
+                    if key not in self._subscribed:
+                        self._pending.add(key)
+                    if interval == self.interval:
+                        self._changed.add(symbol)
+
+    def _load(self, symbols, interval, history):
+        """Recent candles of several symbols: symbol -> DataFrame"""
+        self.history_loads += len(symbols)
+        if self.load_histories is not None:
+            return self.load_histories(symbols, interval, history)
+        frames = {}
+        for symbol in symbols:
+            try:
+                frames[symbol] = self.load_history(symbol, interval, history)
+            except Exception as e:
+                print(f"Market history for {symbol} {interval} failed: {e}")
+        return frames
+
+    def _market(self, interval, history, df):
+        """Market state of a stream from its recent closed candles"""
+        market = _Market(interval, history)
+        if df is None or df.empty:
+            return market
+
+        # The forming candle comes from the stream
+        closed = df[df.index.to_numpy(dtype=float) + market.interval_ms <= now_ms()]
+        for timestamp, row in zip(closed.index, closed.itertuples(index=False)):
+            market.close_candle(float(timestamp), float(row.open), float(row.high), float(row.low),
+                                float(row.close), float(getattr(row, 'volume', math.nan)))
+        return market
@@ -0,0 +1,298 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from market_feed import MarketFeed
+from request_scheduler import SCANNER
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Runs one call per key at a time; concurrent callers share its result
+
+    Results are kept for `ttl` seconds, so callers arriving shortly after a
+    call finished are served without repeating it, and dropped after that.
+    Errors are raised to the callers of the failed call only.
+    """
+
+    def __init__(self, ttl=0.0):
+        self.ttl = ttl
+        self.calls = 0
+        self._results = {}   # key -> (monotonic time, result)
+        self._flights = {}   # key -> _Flight in progress
+        self._swept = 0.0
+        self._lock = threading.Lock()
+
+    def do(self, key, function):
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None and time.monotonic() - cached[0] < self.ttl:
+                return cached[1]
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.calls += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = function()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                if flight.error is None:
+                    self._store(key, flight.result)
+            flight.done.set()
+        return flight.result
+
+    def do_many(self, keys, function):
+        """do() for several keys with one call for all keys nobody else is running
+
+        function(keys) receives the keys this caller leads and returns a
+        dict key -> result; keys missing from it count as failed. Keys
+        already in flight are waited for instead of being requested again.
+
+        Returns:
+            dict: Key -> result, failed keys are left out
+        """
+        results = {}
+        led = {}
+        followed = {}
+        with self._lock:
+            now = time.monotonic()
+            for key in keys:
+                cached = self._results.get(key)
+                if cached is not None and now - cached[0] < self.ttl:
+                    results[key] = cached[1]
+                elif key in self._flights:
+                    followed[key] = self._flights[key]
+                elif key not in led:
+                    led[key] = self._flights[key] = _Flight()
+            self.calls += bool(led)
+
+        if led:
+            try:
+                loaded = function(list(led))
+            except Exception as e:
+                loaded = {}
+                error = e
+            else:
+                error = None
+            with self._lock:
+                for key, flight in led.items():
+                    del self._flights[key]
+                    if key in loaded:
+                        flight.result = results[key] = loaded[key]
+                        self._store(key, flight.result)
+                    else:
+                        flight.error = error or LookupError(f"{key} failed to load")
+            for flight in led.values():
+                flight.done.set()
+            if error is not None:
+                raise error
+
+        for key, flight in followed.items():
+            flight.done.wait()
+            if flight.error is None:
+                results[key] = flight.result
+        return results
+
+    def _store(self, key, result):
+        # Called with the lock held; expired results are swept at most once per ttl
+        now = time.monotonic()
+        self._results[key] = (now, result)
+        if now - self._swept >= self.ttl:
+            self._results = {k: v for k, v in self._results.items() if now - v[0] < self.ttl}
+            self._swept = now
+
+
+class MarketHub:
+    """One place every view and thread gets tickers and candles from
+
+    The hub owns the market websocket connection (see MarketFeed) and the
+    candle buffers behind it. Consumers subscribe to the symbol and
+    interval they follow and read snapshots; a stream followed by several
+    consumers is subscribed once. Data that is not streamed yet is loaded
+    over REST with concurrent requests for the same data merged into one
+    call (single flight) and shared for `ttl` seconds, so adding another
+    view or scanner adds no exchange traffic.
+
+    Args:
+        bot: TradingBot whose client and kline store are used for REST
+        ttl (float): Seconds a REST result is shared with later callers
+    """
+
+    def __init__(self, bot, ttl=2.0):
+        self.bot = bot
+        self.feed = MarketFeed(self._load_history, interval=bot.interval, load_histories=self._load_histories)
+        self._requests = SingleFlight(ttl)
+        self._subscriptions = {}  # (symbol, interval) -> callbacks
+        self._lock = threading.Lock()
+        self.feed.listeners.append(self._notify)
+
+    def _load_history(self, symbol, interval, limit):
+        # Streams only the market overview follows load at scanner priority
+        with self._lock:
+            subscribed = (symbol, interval) in self._subscriptions
+        priority = getattr(self.bot.client, 'priority', None)
+        if subscribed or priority is None:
+            return self._load_candles(symbol, interval, limit)
+        with priority(SCANNER):
+            return self._load_candles(symbol, interval, limit)
+
+    def _load_histories(self, symbols, interval, limit):
+        with self._lock:
+            subscribed = any((symbol, interval) in self._subscriptions for symbol in symbols)
+        priority = getattr(self.bot.client, 'priority', None)
+        if subscribed or priority is None:
+            return self._load_candles_many(symbols, interval, limit)
+        with priority(SCANNER):
+            return self._load_candles_many(symbols, interval, limit)
+
+    def _load_candles(self, symbol, interval, limit):
+        return self._requests.do(
+            ('klines', symbol, interval, limit),
+            lambda: self.bot.get_recent_data(symbol=symbol, interval=interval, limit=limit)
+        )
+
+    def _load_candles_many(self, symbols, interval, limit):
+        """_load_candles() of many symbols in one fan-out, sharing flights with other callers"""
+        def load(keys):
+            frames = self.bot.get_recent_data_many([key[1] for key in keys], interval, limit)
+            return {key: frames[key[1]] for key in keys if key[1] in frames}
+
+        loaded = self._requests.do_many([('klines', symbol, interval, limit) for symbol in symbols], load)
+        return {key[1]: df for key, df in loaded.items()}
+
+    # Subscriptions
+
+    def subscribe(self, symbol, interval, callback=None, history=100):
+        """Follow the candles of a symbol over the shared connection
+
+        callback(symbol, interval), if given, is called from the stream
+        thread whenever a candle of the stream updates.
+        """
+        with self._lock:
+            self._subscriptions.setdefault((symbol, interval), []).append(callback)
+        self.feed.watch(symbol, interval, history)
+
+    def unsubscribe(self, symbol, interval, callback=None):
+        with self._lock:
+            callbacks = self._subscriptions.get((symbol, interval))
+            if not callbacks or callback not in callbacks:
+                return
+            callbacks.remove(callback)
+            if not callbacks:
+                del self._subscriptions[(symbol, interval)]
+        self.feed.unwatch(symbol, interval)
+
+    def _notify(self, symbol, interval):
+        with self._lock:
+            callbacks = [c for c in self._subscriptions.get((symbol, interval), ()) if c is not None]
+        for callback in callbacks:
+            callback(symbol, interval)
+
+    def start(self):
+        self.feed.start()
+
+    def stop(self):
+        self.feed.stop()
+
+    # Snapshots
+
+    def candles(self, symbol, interval, limit=100):
+        """Recent candles, the forming one included, as get_recent_data returns them
+
+        Served from the stream buffer when the stream is followed and holds
+        enough candles, otherwise loaded once for all concurrent callers.
+        """
+        df = self._buffered(symbol, interval, limit)
+        if df is not None:
+            return df
+        return self._load_candles(symbol, interval, limit)
+
+    def candles_many(self, symbols, interval, limit=100):
+        """candles() of many symbols, loading the ones not streamed concurrently
+
+        Returns:
+            dict: Symbol -> DataFrame, symbols that failed to load are left out
+        """
+        frames = {}
+        missing = []
+        for symbol in symbols:
+            df = self._buffered(symbol, interval, limit)
+            if df is None:
+                missing.append(symbol)
+            else:
+                frames[symbol] = df
+        if missing:
+            frames.update(self._load_candles_many(missing, interval, limit))
+        return frames
+
+    def _buffered(self, symbol, interval, limit):
+        """Candles of a streamed symbol from its buffer, None if not streamed"""
+        columns = self.feed.candles(symbol, interval, limit)
+        if columns is None or not len(columns['timestamp']):
+            return None
+        df = pd.DataFrame({name: columns[name] for name in ('open', 'high', 'low', 'close', 'volume')})
+        df.index = np.asarray(columns['timestamp'], dtype=np.float64)
+        df.index.name = 'timestamp'
+        return df
+
+    def tickers(self):
+        """24h tickers of all symbols: symbol -> price, change, high, low and quote volume"""
+        self.feed.start()
+        tickers = self.feed.ticker_snapshot()
+        if self.feed.live and tickers:
+            return tickers
+        return self._requests.do('tickers', self._load_tickers)
+
+    def ticker(self, symbol):
+        """24h ticker of one symbol in the format of tickers()"""
+        self.feed.start()
+        ticker = self.feed.ticker(symbol)
+        if self.feed.live and ticker is not None:
+            return ticker
+        return self._requests.do(
+            ('ticker', symbol),
+            lambda: _ticker(self.bot.exchange.get_ticker(symbol=symbol))
+        )
+
+    def _load_tickers(self):
+        return {t['symbol']: _ticker(t) for t in self.bot.exchange.get_ticker()}
+
+    def usdt_symbols(self, min_volume=0):
+        """USDT pairs whose 24h quote volume is at least min_volume, largest first"""
+        pairs = [
+            (ticker['volume'], symbol) for symbol, ticker in self.tickers().items()
+            if symbol.endswith('USDT') and ticker['volume'] >= min_volume
+        ]
+        return [symbol for _, symbol in sorted(pairs, reverse=True)]
+
+
+def _ticker(ticker):
+    """REST 24h ticker in the format of MarketHub.tickers()"""
+    price = float(ticker['lastPrice'])
+    return {
+        'price': price,
+        'change': float(ticker['priceChangePercent']),
+        'high': float(ticker['highPrice']),
+        'low': float(ticker['lowPrice']),
+        'volume': float(ticker['volume']) * price,
+    }
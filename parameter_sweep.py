@@ -0,0 +1,237 @@
+import itertools
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+import backtest_engine
+
+PRICE_FIELDS = ('high', 'low', 'close')
+
+# Prices attached by every worker process, see _attach_prices
+_shared = None
+
+
+def parse_grid(text):
+    """Parse a grid such as 'channel_length=8:12:2; oversold=-70,-60'
+
+    Values are separated by commas, 'start:stop:step' is an inclusive range.
+
+    Returns:
+        dict: Parameter name -> list of values
+    """
+    grid = {}
+    for part in text.replace('\n', ';').split(';'):
+        if not part.strip():
+            continue
+        if '=' not in part:
+            raise ValueError(f"Expected name=values, got '{part.strip()}'")
+        name, values = part.split('=', 1)
+        grid[name.strip()] = [v for item in values.split(',') if item.strip()
+                              for v in _parse_values(item.strip())]
+    return grid
+
+
+def _parse_number(text):
+    value = float(text)
+    return int(value) if value.is_integer() and '.' not in text else value
+
+
+def _parse_values(text):
+    if ':' not in text:
+        return [_parse_number(text)]
+    parts = [_parse_number(p) for p in text.split(':')]
+    start, stop = parts[0], parts[1]
+    step = parts[2] if len(parts) > 2 else 1
+    if step <= 0:
+        raise ValueError(f"Range step must be positive: '{text}'")
+    count = int(round((stop - start) / step)) + 1
+    return [start + i * step for i in range(max(count, 0))]
+
+
+def parameter_grid(grid):
+    """All combinations of a {name: values} grid as a list of dicts"""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+
+
+class SharedPrices:
+    """High/low/close columns in a shared memory block
+
+    Worker processes attach to the block by name and read the prices
+    without a copy, so a sweep never pickles candle data.
+    """
+
+    def __init__(self, high, low, close):
+        self.shape = (len(PRICE_FIELDS), len(close))
+        self.shm = shared_memory.SharedMemory(create=True, size=max(8 * self.shape[0] * self.shape[1], 8))
+        prices = np.ndarray(self.shape, dtype=np.float64, buffer=self.shm.buf)
+        for row, values in enumerate((high, low, close)):
+            prices[row] = np.asarray(values, dtype=np.float64)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def release(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+def _attach_prices(name, shape):
+    """Pool initializer: map the shared prices read-only into this process"""
+    global _shared
+    shm = shared_memory.SharedMemory(name=name)
+    prices = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    prices.flags.writeable = False
+    _shared = (shm, prices)
+
+
+def backtest_metrics(close, columns, strategy_type, params, initial_capital, commission_fee, lead_in=0):
+    """Backtest one parameter set on indicator columns and summarize it
+
+    The first `lead_in` bars only provide the previous values of the first
+    traded bar; they never signal and are not part of the equity curve.
+
+    Returns:
+        tuple: (metrics dict, equity curve)
+    """
+    buy, sell = backtest_engine.signal_masks(columns, strategy_type, params)
+    buy, sell, close = buy[lead_in:], sell[lead_in:], close[lead_in:]
+    entries, exits = backtest_engine.resolve_positions(buy, sell)
+    _, equity = backtest_engine.compound_trades(close, entries, exits, initial_capital, commission_fee)
+
+    profits = close[exits] - close[entries[:len(exits)]]
+    peak = np.maximum.accumulate(equity) if len(equity) else equity
+    metrics = dict(
+        trades=len(exits),
+        win_rate=float(np.mean(profits > 0) * 100) if len(profits) else 0.0,
+        total_profit=float(profits.sum()),
+        total_return=float((equity[-1] / initial_capital - 1) * 100) if len(equity) else 0.0,
+        max_drawdown=float(np.max(1 - equity / peak) * 100) if len(equity) else 0.0
+    )
+    return metrics, equity
+
+
+def evaluate(prices, strategy_type, indicator_params, variants, initial_capital, commission_fee):
+    """Backtest every threshold variant of one indicator setting
+
+    The indicators are computed once and shared by all variants.
+
+    Returns:
+        list: One dict of parameters and metrics per variant
+    """
+    high, low, close = prices
+    columns = backtest_engine.compute_indicators(strategy_type, high, low, close, indicator_params)
+    columns['close'] = close
+
+    results = []
+    for thresholds in variants:
+        params = dict(indicator_params, **thresholds)
+        metrics, _ = backtest_metrics(close, columns, strategy_type, params, initial_capital, commission_fee)
+        results.append(dict(params, **metrics))
+    return results
+
+
+def _call_with_prices(task):
+    function, args = task
+    return function(_shared[1], *args)
+
+
+def price_matrix(df):
+    """High, low and close of df as a (3 x bars) float64 array"""
+    return np.vstack([np.asarray(df[f], dtype=np.float64) for f in PRICE_FIELDS])
+
+
+def run_tasks(prices, function, tasks, processes=1, start_method=None):
+    """Call function(prices, *args) for every args tuple in `tasks`
+
+    prices is a price_matrix. With more than one process the calls run on
+    a pool whose workers read the prices from shared memory; `function`
+    must be a module-level function.
+
+    Returns:
+        list: Return values in task order
+    """
+    processes = max(min(processes or os.cpu_count() or 1, len(tasks)), 1)
+    if processes == 1:
+        return [function(prices, *args) for args in tasks]
+
+    shared = SharedPrices(*prices)
+    try:
+        context = multiprocessing.get_context(start_method)
+        with context.Pool(processes, initializer=_attach_prices, initargs=(shared.name, shared.shape)) as pool:
+            return pool.map(_call_with_prices, [(function, args) for args in tasks])
+    finally:
+        shared.release()
+
+
+def group_combinations(strategy_type, combinations):
+    """Group parameter combinations by their indicator setting
+
+    Returns:
+        dict: Indicator parameters as a tuple of (name, value) pairs ->
+            list of threshold dicts combined with that setting
+    """
+    indicator_names = backtest_engine.INDICATOR_PARAMS.get(strategy_type, ())
+    groups = {}
+    for params in combinations:
+        params = backtest_engine.strategy_params(strategy_type, params)
+        key = tuple((name, params[name]) for name in indicator_names)
+        thresholds = {k: v for k, v in params.items() if k not in indicator_names}
+        groups.setdefault(key, []).append(thresholds)
+    return groups
+
+
+def _tasks(strategy_type, combinations, max_variants, initial_capital, commission_fee):
+    """One task per indicator setting so its indicators are computed once
+
+    Groups larger than `max_variants` are split to keep all workers busy.
+    """
+    tasks = []
+    for key, variants in group_combinations(strategy_type, combinations).items():
+        for i in range(0, len(variants), max_variants):
+            tasks.append((strategy_type, dict(key), variants[i:i + max_variants], initial_capital, commission_fee))
+    return tasks
+
+
+def sweep(df, strategy_type, grid, processes=None, initial_capital=100000,
+          commission_fee=0.001, sort_by='total_return', start_method=None):
+    """Backtest every combination of a parameter grid on a process pool
+
+    Args:
+        df (DataFrame): Candles with high, low and close columns
+        strategy_type (str): 'Special', 'RSI' or 'MACD'
+        grid (dict): Parameter name -> values, names as in
+            backtest_engine.DEFAULT_PARAMS; missing ones keep their default
+        processes (int): Worker processes, defaults to the CPU count; 1
+            runs in the calling process
+        sort_by (str): Metric the results are ranked by, highest first
+        start_method (str): multiprocessing start method, e.g. 'spawn'
+            when called from a thread of a GUI process
+
+    Returns:
+        DataFrame: One row per combination with its parameters, trades,
+            win_rate, total_profit, total_return and max_drawdown (both
+            in percent), ranked by `sort_by`
+    """
+    if strategy_type not in backtest_engine.DEFAULT_PARAMS:
+        raise ValueError(f"Parameter sweeps support {', '.join(backtest_engine.DEFAULT_PARAMS)}")
+
+    combinations = parameter_grid(grid)
+    processes = processes or os.cpu_count() or 1
+    if processes > 1:
+        max_variants = max(1, -(-len(combinations) // (processes * 4)))
+    else:
+        max_variants = max(len(combinations), 1)
+    tasks = _tasks(strategy_type, combinations, max_variants, initial_capital, commission_fee)
+    chunks = run_tasks(price_matrix(df), evaluate, tasks, processes, start_method)
+
+    results = pd.DataFrame([row for chunk in chunks for row in chunk])
+    if results.empty:
+        return results
+    results = results.sort_values(sort_by, ascending=False, kind='stable').reset_index(drop=True)
+    results.index = pd.RangeIndex(1, len(results) + 1, name='rank')
+    return results
@@ -0,0 +1,82 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import backtest_engine
+from parameter_sweep import backtest_metrics, price_matrix, run_tasks
+
+
+def simulate_symbol(prices, symbol, start, stop, strategy_type, params, commission_fee):
+    """Backtest one symbol whose candles are columns start:stop of prices
+
+    Returns:
+        tuple: (symbol, metrics, equity curve starting from 1.0)
+    """
+    high, low, close = prices[:, start:stop]
+    columns = backtest_engine.compute_indicators(strategy_type, high, low, close, params)
+    columns['close'] = close
+    metrics, equity = backtest_metrics(close, columns, strategy_type, params, 1.0, commission_fee)
+    return symbol, metrics, equity
+
+
+def run_portfolio(frames, strategy_type, params=None, processes=None, initial_capital=100000,
+                  commission_fee=0.001, start_method=None):
+    """Backtest a strategy on many symbols and combine them into one portfolio
+
+    Capital is split equally between the symbols and never rebalanced. A
+    symbol's share stays in cash until its first candle and keeps its last
+    value after its final one.
+
+    Args:
+        frames (dict): Symbol -> candles with high, low and close columns,
+            indexed by time
+        strategy_type (str): 'Special', 'RSI' or 'MACD'
+        params (dict): Overrides of backtest_engine.DEFAULT_PARAMS
+        processes (int): Worker processes, defaults to the CPU count
+
+    Returns:
+        tuple: (stats, equity) where stats has one row of metrics per
+            symbol and equity is the combined portfolio value over time
+    """
+    if strategy_type not in backtest_engine.DEFAULT_PARAMS:
+        raise ValueError(f"Portfolio backtests support {', '.join(backtest_engine.DEFAULT_PARAMS)}")
+    params = backtest_engine.strategy_params(strategy_type, params)
+
+    frames = {symbol: df for symbol, df in frames.items() if not df.empty}
+    if not frames:
+        return pd.DataFrame(), pd.Series(dtype=float, name='equity')
+
+    # All symbols side by side in one price matrix, so the workers share a
+    # single read-only block
+    tasks = []
+    offset = 0
+    for symbol, df in frames.items():
+        tasks.append((symbol, offset, offset + len(df), strategy_type, params, commission_fee))
+        offset += len(df)
+    prices = np.hstack([price_matrix(df) for df in frames.values()])
+
+    results = run_tasks(prices, simulate_symbol, tasks, processes or os.cpu_count() or 1, start_method)
+
+    allocation = initial_capital / len(frames)
+    rows = []
+    values = {}
+    for symbol, metrics, equity in results:
+        df = frames[symbol]
+        values[symbol] = pd.Series(equity * allocation, index=df.index)
+        rows.append(dict(
+            symbol=symbol,
+            candles=len(df),
+            allocation=allocation,
+            final_value=float(equity[-1] * allocation),
+            **metrics
+        ))
+
+    # Combined value on the union of all timestamps
+    combined = pd.DataFrame(values).sort_index().ffill()
+    for symbol in combined.columns:
+        combined[symbol] = combined[symbol].fillna(allocation)
+    equity = combined.sum(axis=1).rename('equity')
+
+    stats = pd.DataFrame(rows).set_index('symbol').sort_values('total_return', ascending=False, kind='stable')
+    return stats, equity
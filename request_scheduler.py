@@ -0,0 +1,226 @@
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from binance.client import Client
+from binance.exceptions import BinanceAPIException
+
+# Request priorities, lower numbers are served first
+ORDERS, ACCOUNT, LIVE, SCANNER, BACKFILL = range(5)
+
+# Share of the weight limit a priority leaves free for the ones above it
+RESERVE = {ORDERS: 0.0, ACCOUNT: 0.02, LIVE: 0.05, SCANNER: 0.15, BACKFILL: 0.15}
+
+# Request weight of /api/v3 endpoints; endpoints not listed weigh 1
+ENDPOINT_WEIGHTS = {
+    '/api/v3/account': 20,
+    '/api/v3/allOrders': 20,
+    '/api/v3/avgPrice': 2,
+    '/api/v3/exchangeInfo': 20,
+    '/api/v3/klines': 2,
+    '/api/v3/myTrades': 20,
+    '/api/v3/userDataStream': 2,
+}
+
+ORDER_PATHS = ('/api/v3/order', '/api/v3/orderList', '/api/v3/sor/order')
+ACCOUNT_PATHS = ('/api/v3/account', '/api/v3/myTrades', '/api/v3/allOrders',
+                 '/api/v3/openOrders', '/api/v3/userDataStream')
+
+
+def request_weight(method, path, params):
+    """Request weight Binance charges for a call, see the endpoint documentation"""
+    symbol = params.get('symbol')
+    symbols = params.get('symbols')
+    if path == '/api/v3/ticker/24hr':
+        if symbol:
+            return 2
+        count = len(symbols) if isinstance(symbols, (list, tuple)) else symbols.count(',') + 1 if symbols else 0
+        return 2 if 0 < count <= 20 else 40 if 0 < count <= 100 else 80
+    if path == '/api/v3/ticker/price':
+        return 2 if symbol else 4
+    if path == '/api/v3/openOrders':
+        return 6 if symbol else 80
+    if path == '/api/v3/order':
+        return 4 if method.upper() == 'GET' else 1
+    if path == '/api/v3/depth':
+        limit = int(params.get('limit', 100))
+        return 5 if limit <= 100 else 25 if limit <= 500 else 50 if limit <= 1000 else 250
+    return ENDPOINT_WEIGHTS.get(path, 1)
+
+
+def request_priority(method, path, params):
+    """Default priority of a call when the calling thread did not set one"""
+    if path.startswith(ORDER_PATHS) or (path == '/api/v3/openOrders' and method.upper() == 'DELETE'):
+        return ORDERS
+    if path.startswith(ACCOUNT_PATHS):
+        return ACCOUNT
+    if path == '/api/v3/ticker/24hr' and not params.get('symbol'):
+        return SCANNER
+    return LIVE
+
+
+class RequestScheduler:
+    """Admits REST requests by priority within Binance's request weight limit
+
+    Binance counts request weight per IP in one-minute windows and answers
+    429 once the limit is passed, and 418 (a temporary ban) if requests
+    continue. The scheduler keeps the weight used in the current window,
+    from its own accounting and from the X-MBX-USED-WEIGHT-1M header of
+    every response, which also covers other programs on the same IP.
+
+    A request waits until its weight fits; waiting requests are served in
+    priority order, and each priority leaves a share of the limit free for
+    the ones above it (RESERVE), so backfills and scans use all spare
+    weight but never delay an order. A 429 or 418 pauses all requests for
+    the Retry-After time and lowers the usable limit, which recovers by a
+    tenth per window without rejections.
+
+    The scheduler is shared by all clients of the same IP, see
+    ScheduledClient and async_exchange.AsyncExchange. A thread sets the
+    priority of its calls through any of them with
+    `with scheduler.priority(BACKFILL):`.
+
+    Args:
+        max_weight (int): Request weight limit per window, see exchangeInfo rateLimits
+        period (float): Window length in seconds
+    """
+
+    def __init__(self, max_weight=6000, period=60.0):
+        self.max_weight = max_weight
+        self.period = period
+        self.limit_factor = 1.0
+        self.requests = 0
+        self.rejections = 0
+        self.waited = 0.0  # Seconds requests spent queued
+
+        self._window = None
+        self._used = 0
+        self._blocked_until = 0.0
+        self._queue = []  # Heap of (priority, sequence) of waiting requests
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._local = threading.local()
+
+    @contextmanager
+    def priority(self, level):
+        """Send this thread's calls with priority `level` inside the block"""
+        previous = getattr(self._local, 'priority', None)
+        self._local.priority = level
+        try:
+            yield
+        finally:
+            self._local.priority = previous
+
+    def current_priority(self):
+        """Priority set by priority() on this thread, None outside of it"""
+        return getattr(self._local, 'priority', None)
+
+    @property
+    def used_weight(self):
+        with self._condition:
+            self._roll(time.time())
+            return self._used
+
+    def _roll(self, now):
+        window = int(now // self.period)
+        if window != self._window:
+            if self._window is not None:
+                self.limit_factor = min(1.0, self.limit_factor + 0.1)
+            self._window = window
+            self._used = 0
+
+    def acquire(self, weight, priority=LIVE):
+        """Block until a request of `weight` may be sent, then count it"""
+        started = time.monotonic()
+        with self._condition:
+            entry = (priority, next(self._sequence))
+            heapq.heappush(self._queue, entry)
+            self._condition.notify_all()
+            while True:
+                now = time.time()
+                self._roll(now)
+                if now < self._blocked_until:
+                    wait = self._blocked_until - now
+                elif self._queue[0] == entry:
+                    allowed = self.max_weight * self.limit_factor * (1 - RESERVE.get(priority, 0.0))
+                    # A window's first request always goes, whatever its weight
+                    if self._used + weight <= allowed or self._used == 0:
+                        heapq.heappop(self._queue)
+                        self._used += weight
+                        self.requests += 1
+                        self.waited += time.monotonic() - started
+                        self._condition.notify_all()
+                        return
+                    wait = (self._window + 1) * self.period - now
+                else:
+                    wait = None  # Until the requests ahead are admitted
+                self._condition.wait(wait)
+
+    def observe(self, status, headers):
+        """Update the budget from a response's status and rate limit headers"""
+        used = headers.get('X-MBX-USED-WEIGHT-1M')
+        with self._condition:
+            now = time.time()
+            self._roll(now)
+            if used is not None:
+                # The server count misses requests still in flight
+                self._used = max(self._used, int(used))
+            if status in (418, 429):
+                retry_after = float(headers.get('Retry-After') or self.period)
+                self._blocked_until = max(self._blocked_until, now + retry_after)
+                self.limit_factor = max(0.5, self.limit_factor * 0.8)
+                self.rejections += 1
+                print(f"Binance rate limit hit (HTTP {status}), pausing requests for {retry_after:.0f} s")
+            self._condition.notify_all()
+
+
+class ScheduledClient(Client):
+    """binance Client whose REST calls go through a RequestScheduler
+
+    Calls are prioritized by endpoint (orders, then account, then market
+    data, then full-market tickers); a thread can set the priority of its
+    calls with `with client.priority(BACKFILL):`. GET requests rejected
+    with 429 are retried once the pause is over, other requests raise.
+    """
+
+    def __init__(self, *args, scheduler=None, retries=2, **kwargs):
+        self.scheduler = scheduler or RequestScheduler()
+        self.retries = retries
+        super().__init__(*args, **kwargs)
+
+    def _init_session(self):
+        session = super()._init_session()
+        session.hooks['response'].append(self._on_response)
+        return session
+
+    def _on_response(self, response, *args, **kwargs):
+        if urlparse(response.url).path.startswith('/api/'):
+            self.scheduler.observe(response.status_code, response.headers)
+
+    def priority(self, level):
+        """Send this thread's calls with priority `level` inside the block"""
+        return self.scheduler.priority(level)
+
+    def current_priority(self):
+        return self.scheduler.current_priority()
+
+    def _request(self, method, uri, signed, force_params=False, **kwargs):
+        path = urlparse(uri).path
+        params = kwargs.get('data') or {}
+        weight = request_weight(method, path, params)
+        priority = self.current_priority()
+        if priority is None:
+            priority = request_priority(method, path, params)
+
+        for attempt in range(self.retries + 1):
+            self.scheduler.acquire(weight, priority)
+            # Signing adds to the parameters, every attempt starts from the originals
+            attempt_kwargs = dict(kwargs, data=dict(params)) if 'data' in kwargs else dict(kwargs)
+            try:
+                return super()._request(method, uri, signed, force_params, **attempt_kwargs)
+            except BinanceAPIException as e:
+                if e.status_code != 429 or method.upper() != 'GET' or attempt == self.retries:
+                    raise
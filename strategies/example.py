@@ -1,3 +1,11 @@
+import numpy as np
+
+# Candles passed to custom_strategy in backtests. The RSI below uses Wilder
+# smoothing, where every older candle keeps some weight; after 300 candles
+# that weight is below 1e-9, so the RSI of the window matches the one
+# signals() computes on the whole history.
+max_lookback = 300
+
 def custom_strategy(data):
     # data is a pandas DataFrame with columns: open, high, low, close, volume
     # Available indicators: RSI, SMA, EMA, MACD, etc. (using pandas_ta)
@@ -12,3 +20,16 @@ def custom_strategy(data):
 
     return 'NEUTRAL'
 
+
+
+def signals(data):
+    # Optional: the same rules on the whole history at once, one signal per
+    # candle. Backtests use this instead of calling custom_strategy per candle,
+    # so each value may only depend on candles up to its own.
+    rsi = data.ta.rsi(close='close', length=14)
+    sma20 = data.ta.sma(close='close', length=20)
+    close = data['close']
+
+    buy = (rsi < 30) & (close > sma20)
+    sell = (rsi > 70) & (close < sma20)
+    return np.where(buy, 'BUY', np.where(sell, 'SELL', 'NEUTRAL'))
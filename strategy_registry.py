@@ -0,0 +1,236 @@
+import hashlib
+import os
+import threading
+import time
+import types
+
+import strategy_rules
+from lazy_imports import lazy_import
+
+# Registers the DataFrame.ta accessor custom strategies use
+ta = lazy_import('pandas_ta')
+
+STRATEGY_DIR = "strategies"
+
+# Strategy file extensions: Python code or rule text, see strategy_rules.
+# A .rule file wins over a .py file of the same name.
+STRATEGY_EXTENSIONS = ('.py', '.rule')
+
+
+class StrategyEntry:
+    """One strategy file and the version of it that is currently loaded
+
+    Attributes:
+        name (str): File name without extension
+        path (str): Strategy file
+        source (str): File contents
+        description (str): First line comment, if any
+        strategy: Module or strategy_rules.CompiledRule, None if no version
+            of the file has loaded yet
+        error (str): Why the latest contents failed to load, None if they
+            are the ones in use
+        version (int): Incremented on every successful reload
+        load_seconds (float): Time the latest load took
+    """
+
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.stat = None
+        self.digest = None
+        self.source = ""
+        self.description = ""
+        self.strategy = None
+        self.error = None
+        self.version = 0
+        self.load_seconds = 0.0
+
+
+class StrategyRegistry:
+    """Strategies of a directory, compiled once and reloaded when files change
+
+    Code objects and compiled rules are cached by the SHA-256 of the file,
+    so a file is only compiled when its contents are new; touching a file
+    or saving identical code reuses the cached code. A file that fails to
+    load keeps its previous version in use and records the error, so a bad
+    save never stops a running strategy.
+
+    get() checks the file of the requested strategy on every call; watch()
+    additionally polls the whole directory on a background thread and
+    reports changes to a callback. Readers always see a complete strategy:
+    a reload builds the new version first and then swaps it in.
+    """
+
+    def __init__(self, directory=STRATEGY_DIR):
+        self.directory = directory
+        self.entries = {}
+        self._compiled = {}  # (extension, digest) -> code object or CompiledRule
+        self._lock = threading.RLock()
+        self._watcher = None
+        self._stop = threading.Event()
+
+    def _files(self):
+        """Strategy name -> path of the files currently in the directory"""
+        files = {}
+        try:
+            names = sorted(os.listdir(self.directory))
+        except FileNotFoundError:
+            return files
+        for file in names:
+            name, extension = os.path.splitext(file)
+            if extension in STRATEGY_EXTENSIONS and (name not in files or extension == '.rule'):
+                files[name] = os.path.join(self.directory, file)
+        return files
+
+    def refresh(self):
+        """Load new and changed strategy files and forget deleted ones
+
+        Returns:
+            tuple: (changed, removed) strategy names
+        """
+        with self._lock:
+            files = self._files()
+            removed = [name for name in self.entries if name not in files]
+            for name in removed:
+                del self.entries[name]
+            changed = [name for name, path in files.items() if self._update(name, path)]
+        return changed, removed
+
+    def _update(self, name, path):
+        """Reload one strategy if its file changed, True if it did"""
+        entry = self.entries.get(name)
+        if entry is None or entry.path != path:
+            entry = self.entries[name] = StrategyEntry(name, path)
+
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return False
+        stat = (stat.st_mtime_ns, stat.st_size)
+        if stat == entry.stat:
+            return False
+
+        with open(path, "rb") as f:
+            data = f.read()
+        entry.stat = stat
+        digest = hashlib.sha256(data).hexdigest()
+        if digest == entry.digest:
+            return False
+
+        started = time.perf_counter()
+        entry.digest = digest
+        entry.source = data.decode("utf-8", errors="replace")
+        lines = entry.source.split("\n")
+        entry.description = lines[0][1:].strip() if lines and lines[0].startswith("#") else ""
+        try:
+            strategy = self._load(name, path, digest, entry.source)
+        except Exception as e:
+            entry.error = f"{type(e).__name__}: {e}"
+            print(f"Strategy {name} failed to load, keeping version {entry.version}: {entry.error}")
+            return True
+
+        entry.strategy = strategy
+        entry.error = None
+        entry.version += 1
+        entry.load_seconds = time.perf_counter() - started
+        return True
+
+    def _load(self, name, path, digest, source):
+        extension = os.path.splitext(path)[1]
+        compiled = self._compiled.get((extension, digest))
+
+        if extension == '.rule':
+            if compiled is None:
+                compiled = strategy_rules.CompiledRule(source)
+                self._compiled[(extension, digest)] = compiled
+            return compiled
+
+        if compiled is None:
+            compiled = compile(source, path, 'exec')
+            self._compiled[(extension, digest)] = compiled
+
+        # Strategies call data.ta without importing pandas_ta themselves
+        try:
+            ta._load()
+        except ImportError:
+            pass
+
+        module = types.ModuleType(f"{STRATEGY_DIR}.{name}")
+        module.__file__ = path
+        exec(compiled, module.__dict__)
+        if not any(callable(getattr(module, f, None)) for f in ('signals', 'custom_strategy')):
+            raise ValueError(f"Strategy '{name}' has no signals or custom_strategy function")
+        return module
+
+    def entry(self, name):
+        """StrategyEntry of a strategy, loading or reloading its file first
+
+        Only the file of `name` is loaded, the other strategies of the
+        directory are left as they are.
+        """
+        with self._lock:
+            entry = self.entries.get(name)
+            if entry is not None and os.path.exists(entry.path):
+                path = entry.path
+            else:
+                path = self._files().get(name)
+            if path is None:
+                self.entries.pop(name, None)
+            else:
+                self._update(name, path)
+            entry = self.entries.get(name)
+        if entry is None:
+            raise ValueError(f"Unknown strategy '{name}'")
+        return entry
+
+    def get(self, name):
+        """Current version of a strategy: a module or a CompiledRule"""
+        entry = self.entry(name)
+        if entry.strategy is None:
+            raise ValueError(f"Strategy '{name}' failed to load: {entry.error}")
+        return entry.strategy
+
+    def names(self):
+        with self._lock:
+            return list(self.entries)
+
+    def watch(self, callback=None, interval=0.5):
+        """Poll the directory every `interval` seconds on a daemon thread
+
+        callback(changed, removed) is called from the watcher thread after
+        every refresh that found changes.
+        """
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    changed, removed = self.refresh()
+                    if callback is not None and (changed or removed):
+                        callback(changed, removed)
+                except Exception as e:
+                    print(f"Strategy watcher error: {e}")
+
+        self._watcher = threading.Thread(target=run, name="strategy-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def strategy_registry(directory=STRATEGY_DIR):
+    """Process-wide StrategyRegistry of a directory"""
+    key = os.path.abspath(directory)
+    with _registries_lock:
+        if key not in _registries:
+            _registries[key] = StrategyRegistry(directory)
+        return _registries[key]
@@ -0,0 +1,456 @@
+"""Rule expressions for strategies, compiled to array operations
+
+A rule strategy is plain text with a buy and an optional sell rule:
+
+    # Oversold bounce above the trend
+    buy: rsi(14) < 30 and close > sma(20)
+    sell: rsi(14) > 70 or cross_down(wt1, wt2)
+
+Rules are parsed with the Python expression grammar but only the names,
+functions and operators below are accepted, so no strategy code is ever
+executed. Equal subexpressions are compiled to a single node, e.g. both
+rules above share one rsi(14).
+
+Prices:     open, high, low, close, volume
+Indicators: ema(x, n), sma(x, n), rma(x, n), rsi(n=14) or rsi(x, n),
+            macd(fast=12, slow=26, signal=9), macd_signal(...), macd_hist(...),
+            wt1(channel_length=10, average_length=21), wt2(...)
+Functions:  cross_up(a, b), cross_down(a, b), prev(x), abs(x)
+Operators:  + - * /  < <= > >= == !=  and or not
+
+Indicators without arguments may be written without parentheses (rsi,
+wt1). A compiled rule runs on one series (backtests), on a (symbols x
+time) matrix (scanner) or one candle at a time (live trading), always with
+the same results.
+"""
+import ast
+import functools
+import math
+
+import numpy as np
+import pandas as pd
+
+import indicator_kernels
+from indicators import StreamingEMA, StreamingSMA, StreamingRMA, StreamingRSI, StreamingMACD, WaveTrend
+
+PRICE_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+# Indicator name -> (computation, output index, parameter defaults, takes a series)
+# None marks a required parameter.
+INDICATORS = {
+    'ema': ('ema', None, (None,), True),
+    'sma': ('sma', None, (None,), True),
+    'rma': ('rma', None, (None,), True),
+    'rsi': ('rsi', None, (14,), True),
+    'macd': ('macd', 0, (12, 26, 9), True),
+    'macd_signal': ('macd', 1, (12, 26, 9), True),
+    'macd_hist': ('macd', 2, (12, 26, 9), True),
+    'wt1': ('wave_trend', 0, (10, 21), False),
+    'wt2': ('wave_trend', 1, (10, 21), False),
+}
+
+FUNCTIONS = {'cross_up': 2, 'cross_down': 2, 'prev': 1, 'abs': 1}
+
+_BINARY = {ast.Add: 'add', ast.Sub: 'sub', ast.Mult: 'mul', ast.Div: 'div'}
+_COMPARE = {ast.Lt: 'lt', ast.LtE: 'le', ast.Gt: 'gt', ast.GtE: 'ge', ast.Eq: 'eq', ast.NotEq: 'ne'}
+# Operands of these are sorted so 'a and b' and 'b and a' are one node
+_COMMUTATIVE = {'add', 'mul', 'eq', 'ne', 'and', 'or'}
+
+
+def _truth(x):
+    # NaN counts as false, like a comparison with NaN
+    return (x != 0) & (x == x)
+
+
+def _previous(x):
+    """x shifted one step along time, NaN first; constants stay constant"""
+    if np.ndim(x) == 0:
+        return x
+    x = np.asarray(x, dtype=np.float64)
+    shifted = np.empty_like(x)
+    shifted[..., :1] = np.nan
+    shifted[..., 1:] = x[..., :-1]
+    return shifted
+
+
+_OPS = {
+    'add': np.add,
+    'sub': np.subtract,
+    'mul': np.multiply,
+    'div': np.divide,
+    'neg': np.negative,
+    'abs': np.abs,
+    'lt': np.less,
+    'le': np.less_equal,
+    'gt': np.greater,
+    'ge': np.greater_equal,
+    'eq': np.equal,
+    'ne': np.not_equal,
+    'and': lambda *args: functools.reduce(np.logical_and, (_truth(a) for a in args)),
+    'or': lambda *args: functools.reduce(np.logical_or, (_truth(a) for a in args)),
+    'not': lambda a: ~_truth(a),
+}
+
+
+def _cross(a, b, a_prev, b_prev, up):
+    if up:
+        return (a_prev <= b_prev) & (a > b)
+    return (a_prev >= b_prev) & (a < b)
+
+
+class _Compiler:
+    """Turns rule expressions into a list of nodes without duplicates
+
+    Every node is (op, args) where args refer to earlier nodes by index,
+    except for 'field', 'const' and the indicator parameters.
+    """
+
+    def __init__(self):
+        self.nodes = []
+        self.index = {}
+        self.series = []  # Whether each node varies over time
+
+    def add(self, op, args, series):
+        key = (op, args)
+        if key not in self.index:
+            self.index[key] = len(self.nodes)
+            self.nodes.append(key)
+            self.series.append(series)
+        return self.index[key]
+
+    def compile(self, text):
+        try:
+            tree = ast.parse(text.strip(), mode='eval')
+        except SyntaxError as e:
+            raise ValueError(f"Invalid rule '{text.strip()}': {e.msg}") from None
+        return self.visit(tree.body)
+
+    def visit(self, node):
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) \
+                and not isinstance(node.value, bool):
+            return self.add('const', (float(node.value),), False)
+
+        if isinstance(node, ast.Name):
+            if node.id in PRICE_FIELDS:
+                return self.add('field', (node.id,), True)
+            if node.id in INDICATORS:
+                return self.indicator(node.id, [])
+            raise ValueError(f"Unknown name '{node.id}'")
+
+        if isinstance(node, ast.UnaryOp):
+            operand = self.visit(node.operand)
+            if isinstance(node.op, ast.UAdd):
+                return operand
+            op = 'neg' if isinstance(node.op, ast.USub) else 'not' if isinstance(node.op, ast.Not) else None
+            if op is None:
+                raise ValueError(f"Operator {type(node.op).__name__} is not allowed in rules")
+            return self.operation(op, (operand,))
+
+        if isinstance(node, ast.BinOp):
+            if type(node.op) not in _BINARY:
+                raise ValueError(f"Operator {type(node.op).__name__} is not allowed in rules")
+            return self.operation(_BINARY[type(node.op)], (self.visit(node.left), self.visit(node.right)))
+
+        if isinstance(node, ast.BoolOp):
+            op = 'and' if isinstance(node.op, ast.And) else 'or'
+            return self.operation(op, tuple(self.visit(v) for v in node.values))
+
+        if isinstance(node, ast.Compare):
+            # a < b < c is (a < b) and (b < c)
+            operands = [self.visit(node.left)] + [self.visit(c) for c in node.comparators]
+            parts = []
+            for i, op in enumerate(node.ops):
+                if type(op) not in _COMPARE:
+                    raise ValueError(f"Operator {type(op).__name__} is not allowed in rules")
+                parts.append(self.operation(_COMPARE[type(op)], (operands[i], operands[i + 1])))
+            return parts[0] if len(parts) == 1 else self.operation('and', tuple(parts))
+
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.keywords:
+                raise ValueError("Only calls like name(arg, ...) are allowed in rules")
+            name = node.func.id
+            if name in INDICATORS:
+                return self.indicator(name, node.args)
+            if name in FUNCTIONS:
+                if len(node.args) != FUNCTIONS[name]:
+                    raise ValueError(f"{name}() takes {FUNCTIONS[name]} argument(s)")
+                args = tuple(self.visit(a) for a in node.args)
+                if name == 'abs':
+                    return self.operation('abs', args)
+                return self.add(name, args, any(self.series[a] for a in args))
+            raise ValueError(f"Unknown function '{name}'")
+
+        raise ValueError(f"{type(node).__name__} is not allowed in rules")
+
+    def operation(self, op, args):
+        if op in _COMMUTATIVE:
+            args = tuple(sorted(args))
+        return self.add(op, args, any(self.series[a] for a in args))
+
+    def indicator(self, name, args):
+        computation, output, defaults, takes_series = INDICATORS[name]
+        args = list(args)
+
+        source = None
+        if takes_series:
+            if args and not (isinstance(args[0], ast.Constant) and isinstance(args[0].value, (int, float))):
+                source = self.visit(args.pop(0))
+                if not self.series[source]:
+                    raise ValueError(f"{name}() needs a series, not a constant")
+            else:
+                source = self.add('field', ('close',), True)
+
+        if len(args) > len(defaults):
+            raise ValueError(f"{name}() takes at most {len(defaults)} parameter(s)")
+        params = []
+        for i, default in enumerate(defaults):
+            if i < len(args):
+                arg = args[i]
+                if not (isinstance(arg, ast.Constant) and isinstance(arg.value, int)
+                        and not isinstance(arg.value, bool)) or arg.value < 1:
+                    raise ValueError(f"Parameters of {name}() must be positive integers")
+                params.append(arg.value)
+            elif default is None:
+                raise ValueError(f"{name}() needs a length, e.g. {name}(20)")
+            else:
+                params.append(default)
+
+        inputs = (source,) if takes_series else ()
+        node = self.add(computation, inputs + tuple(params), True)
+        if output is None:
+            return node
+        return self.add('item', (node, output), True)
+
+
+def parse_rules(text):
+    """Split rule text into {'buy': expression, 'sell': expression}"""
+    rules = {}
+    for number, line in enumerate(text.splitlines(), start=1):
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            continue
+        name, separator, expression = line.partition(':')
+        name = name.strip().lower()
+        if not separator or name not in ('buy', 'sell'):
+            raise ValueError(f"Line {number}: expected 'buy: <rule>' or 'sell: <rule>'")
+        if name in rules:
+            raise ValueError(f"Line {number}: more than one {name} rule")
+        rules[name] = expression.strip()
+    if 'buy' not in rules:
+        raise ValueError("A rule strategy needs a 'buy:' rule")
+    return rules
+
+
+class CompiledRule:
+    """Buy and sell rules compiled to one node list
+
+    Attributes:
+        rules (dict): Rule text by 'buy' and 'sell'
+        nodes (list): (op, args) in evaluation order
+        fields (tuple): Price fields the rules read
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.rules = parse_rules(text)
+        compiler = _Compiler()
+        self.outputs = {name: compiler.compile(expression) for name, expression in self.rules.items()}
+        self.nodes = compiler.nodes
+        fields = {args[0] for op, args in self.nodes if op == 'field'}
+        if any(op == 'wave_trend' for op, _ in self.nodes):
+            fields.update(('high', 'low', 'close'))
+        self.fields = tuple(f for f in PRICE_FIELDS if f in fields)
+
+    def evaluate(self, prices):
+        """Buy and sell masks over whole price arrays
+
+        Args:
+            prices (dict): Price field -> 1-D series or (symbols x time)
+                matrix, oldest candle first
+
+        Returns:
+            tuple: (buy, sell) boolean arrays shaped like the prices
+        """
+        shape = np.shape(prices[self.fields[0] if self.fields else next(iter(prices))])
+        values = []
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for op, args in self.nodes:
+                values.append(self._batch(op, args, values, prices))
+        buy = np.broadcast_to(_truth(values[self.outputs['buy']]), shape).copy()
+        if 'sell' in self.outputs:
+            sell = np.broadcast_to(_truth(values[self.outputs['sell']]), shape).copy()
+        else:
+            sell = np.zeros(shape, dtype=bool)
+        return buy, sell
+
+    @staticmethod
+    def _batch(op, args, values, prices):
+        if op == 'const':
+            return args[0]
+        if op == 'field':
+            return np.asarray(prices[args[0]], dtype=np.float64)
+        if op == 'item':
+            return values[args[0]][args[1]]
+        if op in ('ema', 'sma', 'rma', 'rsi'):
+            return getattr(indicator_kernels, op)(values[args[0]], args[1])
+        if op == 'macd':
+            return indicator_kernels.macd(values[args[0]], *args[1:])
+        if op == 'wave_trend':
+            return indicator_kernels.wave_trend(
+                np.asarray(prices['high'], dtype=np.float64),
+                np.asarray(prices['low'], dtype=np.float64),
+                np.asarray(prices['close'], dtype=np.float64),
+                *args
+            )
+        if op == 'prev':
+            return _previous(values[args[0]])
+        if op in ('cross_up', 'cross_down'):
+            a, b = values[args[0]], values[args[1]]
+            return _cross(a, b, _previous(a), _previous(b), op == 'cross_up')
+        return _OPS[op](*(values[a] for a in args))
+
+    def signals(self, data):
+        """'BUY', 'SELL' or 'NEUTRAL' per candle of a DataFrame, see strategy_runner"""
+        buy, sell = self.evaluate(rule_prices(data))
+        return np.where(buy, 'BUY', np.where(sell, 'SELL', 'NEUTRAL'))
+
+    def scan(self, symbols, frames):
+        """Rule signals on the newest candle of several symbols at once
+
+        Args:
+            symbols (list): Row labels
+            frames (list): Candle DataFrames, one per symbol
+
+        Returns:
+            DataFrame: buy and sell flags indexed by symbol
+        """
+        length = max((len(df) for df in frames), default=0)
+        if length:
+            prices = {f: _stack(frames, f, length) for f in self.fields or ('close',)}
+            buy, sell = self.evaluate(prices)
+            buy, sell = buy[:, -1], sell[:, -1]
+        else:
+            buy = sell = np.zeros(len(frames), dtype=bool)
+        return pd.DataFrame({'buy': buy, 'sell': sell}, index=pd.Index(symbols, name='symbol'))
+
+    def stream(self):
+        """RuleStream evaluating these rules one candle at a time"""
+        return RuleStream(self)
+
+
+def _stack(frames, field, length):
+    # Same left-padding as indicator_engine.stack_columns
+    matrix = np.full((len(frames), length), np.nan)
+    for i, df in enumerate(frames):
+        values = np.asarray(df[field], dtype=np.float64)[-length:]
+        if len(values):
+            matrix[i, length - len(values):] = values
+    return matrix
+
+
+def rule_prices(data):
+    """Price columns of a DataFrame or CandleBuffer as float64 arrays"""
+    return {f: np.asarray(data[f], dtype=np.float64) for f in PRICE_FIELDS if f in data}
+
+
+class _Started:
+    """Streaming indicator that starts at its first valid input
+
+    The batch kernels begin EMAs at the first non-NaN value, so nested
+    indicators only feed their state once their input is defined.
+    """
+
+    def __init__(self, indicator):
+        self.indicator = indicator
+        self.started = False
+
+    def update(self, x):
+        if not self.started:
+            if math.isnan(x):
+                return math.nan
+            self.started = True
+        return self.indicator.update(x)
+
+
+class RuleStream:
+    """Incremental evaluation of a CompiledRule for live trading
+
+    Each closed candle is added with update() in constant time per node and
+    gives the same signal as evaluating the whole history at once.
+    """
+
+    def __init__(self, rule):
+        self.rule = rule
+        self.states = [self._state(op, args) for op, args in rule.nodes]
+        # Constants keep their value on the bar before the first candle
+        self.values = [args[0] if op == 'const' else math.nan for op, args in rule.nodes]
+        self.buy = False
+        self.sell = False
+
+    @staticmethod
+    def _state(op, args):
+        if op == 'ema':
+            return _Started(StreamingEMA(args[1]))
+        if op == 'sma':
+            return StreamingSMA(args[1])
+        if op == 'rma':
+            return StreamingRMA(args[1])
+        if op == 'rsi':
+            return StreamingRSI(args[1])
+        if op == 'macd':
+            return _Started(StreamingMACD(*args[1:]))
+        if op == 'wave_trend':
+            return WaveTrend(*args)
+        return None
+
+    def update(self, open=math.nan, high=math.nan, low=math.nan, close=math.nan, volume=math.nan):
+        """Add one closed candle and return (buy, sell)"""
+        candle = {'open': open, 'high': high, 'low': low, 'close': close, 'volume': volume}
+        previous = self.values
+        values = []
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for (op, args), state in zip(self.rule.nodes, self.states):
+                if op == 'const':
+                    value = args[0]
+                elif op == 'field':
+                    value = float(candle[args[0]])
+                elif op == 'item':
+                    value = values[args[0]][args[1]]
+                elif op in ('ema', 'sma', 'rma', 'rsi', 'macd'):
+                    value = state.update(float(values[args[0]]))
+                    if op == 'macd' and not isinstance(value, tuple):
+                        value = (math.nan, math.nan, math.nan)
+                elif op == 'wave_trend':
+                    value = state.update(float(candle['high']), float(candle['low']), float(candle['close']))
+                elif op == 'prev':
+                    value = previous[args[0]]
+                elif op in ('cross_up', 'cross_down'):
+                    a, b = args
+                    value = _cross(values[a], values[b], previous[a], previous[b], op == 'cross_up')
+                else:
+                    value = _OPS[op](*(values[a] for a in args))
+                values.append(value)
+        self.values = values
+
+        outputs = self.rule.outputs
+        self.buy = bool(_truth(values[outputs['buy']]))
+        self.sell = bool(_truth(values[outputs['sell']])) if 'sell' in outputs else False
+        return self.buy, self.sell
+
+    def seed(self, data):
+        """Feed a history of closed candles and return the latest (buy, sell)"""
+        prices = rule_prices(data)
+        length = len(next(iter(prices.values()))) if prices else 0
+        for i in range(length):
+            self.update(**{f: float(values[i]) for f, values in prices.items()})
+        return self.buy, self.sell
+
+
+def compile_rules(text):
+    """Parse and compile rule text, raising ValueError on invalid rules"""
+    return CompiledRule(text)
+
+
+def load_rules(path):
+    with open(path, "r") as f:
+        return CompiledRule(f.read())
@@ -0,0 +1,160 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from strategy_registry import STRATEGY_DIR, strategy_registry
+
+# Columns of the frame a custom strategy sees, as documented in the editor
+STRATEGY_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+
+def load_strategy(name, directory=STRATEGY_DIR):
+    """Current version of strategies/<name>.py or <name>.rule
+
+    Python strategies are modules, rule strategies are compiled to a
+    strategy_rules.CompiledRule; both provide signals(data) or
+    custom_strategy(data). Files are compiled once and loaded again only
+    after they change, see strategy_registry.StrategyRegistry.
+    """
+    return strategy_registry(directory).get(name)
+
+
+def strategy_frame(df):
+    """Candles as one preallocated float64 block that windows are sliced from
+
+    With a single block every df.iloc[start:stop] is a view, so calling a
+    strategy on a window never copies candles. The block is read-only;
+    pandas copies on write if a strategy modifies its window, so the
+    candles of later windows are never changed.
+    """
+    values = np.empty((len(df), len(STRATEGY_COLUMNS)), dtype=np.float64)
+    for column, name in enumerate(STRATEGY_COLUMNS):
+        values[:, column] = np.asarray(df[name], dtype=np.float64)
+    values.flags.writeable = False
+    return pd.DataFrame(values, index=df.index, columns=list(STRATEGY_COLUMNS), copy=False)
+
+
+def run_strategy(df, strategy, max_lookback=None, check_lookahead=True):
+    """Signal of a custom strategy for every bar of df
+
+    A strategy module can provide signals(data), which receives the whole
+    history once and returns one signal per bar; it is preferred over the
+    per-bar custom_strategy(data). Its output is checked for lookahead
+    unless check_lookahead is False, see check_lookahead.
+
+    Args:
+        df (DataFrame): Candles with open, high, low, close and volume
+        strategy: Module or function; a module provides signals(data)
+            and/or custom_strategy(data) and optionally max_lookback
+        max_lookback (int): Window size of per-bar calls, defaults to the
+            strategy's own
+
+    Returns:
+        tuple: (signals, seconds) where signals holds 'BUY', 'SELL' or
+            'NEUTRAL' per bar and seconds is the time spent in the strategy
+    """
+    vectorized = getattr(strategy, 'signals', None)
+    if callable(vectorized):
+        started = time.perf_counter()
+        frame = strategy_frame(df)
+        # A shallow copy keeps columns the strategy assigns out of the lookahead check
+        signals = normalize_signals(vectorized(frame.copy(deep=False)), len(frame))
+        if check_lookahead:
+            check_signals(frame, vectorized, signals)
+        return signals, time.perf_counter() - started
+
+    function = getattr(strategy, 'custom_strategy', strategy)
+    if max_lookback is None:
+        max_lookback = getattr(strategy, 'max_lookback', None)
+    return run_per_bar(df, function, max_lookback)
+
+
+def run_per_bar(df, function, max_lookback=None):
+    """Call custom_strategy(data) on every bar of df
+
+    Bar i is decided on the candles up to and including i, or on the last
+    `max_lookback` of them when the strategy declares a bound, which keeps
+    the cost per bar flat on long histories. Errors raised before the
+    strategy first returns a signal are taken as its warm-up, e.g. pandas_ta
+    returning None on too few candles.
+
+    Returns:
+        tuple: (signals, seconds) as in run_strategy
+    """
+    if max_lookback is not None and int(max_lookback) < 1:
+        raise ValueError("max_lookback must be at least 1")
+
+    frame = strategy_frame(df)
+    signals = np.full(len(frame), 'NEUTRAL', dtype=object)
+    warm = False
+    error = None
+
+    started = time.perf_counter()
+    for i in range(len(frame)):
+        start = 0 if max_lookback is None else max(0, i + 1 - int(max_lookback))
+        try:
+            signal = function(frame.iloc[start:i + 1])
+        except Exception as e:
+            if warm:
+                raise
+            error = e
+            continue
+        warm = True
+        if signal in ('BUY', 'SELL'):
+            signals[i] = signal
+    seconds = time.perf_counter() - started
+
+    if not warm and error is not None:
+        raise error
+    return signals, seconds
+
+
+def normalize_signals(values, bars):
+    """Output of signals(data) as an object array of 'BUY', 'SELL' and 'NEUTRAL'
+
+    Numbers are accepted as well: positive buys, negative sells.
+    """
+    values = np.asarray(values)
+    if values.shape != (bars,):
+        raise ValueError(f"signals(data) returned shape {values.shape}, expected ({bars},)")
+
+    signals = np.full(bars, 'NEUTRAL', dtype=object)
+    if values.dtype.kind in 'biuf':
+        with np.errstate(invalid='ignore'):
+            signals[values > 0] = 'BUY'
+            signals[values < 0] = 'SELL'
+    else:
+        signals[values == 'BUY'] = 'BUY'
+        signals[values == 'SELL'] = 'SELL'
+    return signals
+
+
+def check_signals(frame, function, signals, samples=8):
+    """Raise ValueError if signals(data) uses candles after the bar it decides
+
+    signals(data) is called again on the history up to a few sampled bars.
+    Under the per-bar contract the last value of each call must equal the
+    full-history signal of that bar; a difference means the full-history
+    output was decided with future candles.
+    """
+    bars = len(frame)
+    if bars < 2:
+        return
+    # Sample the second half so indicators are past their warm-up
+    bars_checked = np.unique(np.linspace(bars // 2, bars - 2, samples).astype(np.int64))
+    leaks = []
+    for i in bars_checked.tolist():
+        prefix = normalize_signals(function(frame.iloc[:i + 1]), i + 1)
+        if prefix[-1] != signals[i]:
+            leaks.append(i)
+    if leaks:
+        raise ValueError(
+            f"signals(data) looks ahead: bars {', '.join(map(str, leaks))} change "
+            f"when later candles are removed"
+        )
+
+
+def signal_masks(signals):
+    """Buy and sell masks of a per-bar signal array"""
+    return signals == 'BUY', signals == 'SELL'
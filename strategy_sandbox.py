@@ -0,0 +1,332 @@
+import collections
+import math
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows: only the wall-clock timeout applies
+    resource = None
+
+import backtest_engine
+import strategy_runner
+from strategy_registry import STRATEGY_DIR, strategy_registry, ta
+
+# Columns of the shared input block: open time in ms, then the candles
+BLOCK_COLUMNS = ('timestamp',) + strategy_runner.STRATEGY_COLUMNS
+SIGNAL_CODES = {'BUY': 1, 'SELL': -1}
+# Seconds a new worker may take to import NumPy, pandas and pandas_ta
+STARTUP_TIMEOUT = 60.0
+
+
+def _address_space():
+    """Virtual memory of this process in bytes, None where unknown"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _limit_memory(memory_limit):
+    # Relative to what the interpreter, NumPy and pandas already mapped
+    current = _address_space()
+    if resource is None or not memory_limit or current is None:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    limit = current + int(memory_limit)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def _limit_cpu(seconds):
+    """Let the kernel stop this process after `seconds` more CPU time (SIGXCPU)"""
+    if resource is None:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if seconds is None:
+        resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = math.ceil(usage.ru_utime + usage.ru_stime + seconds)
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _latest_signal(strategy, frame):
+    """Signal of the newest candle the way the live loop asks for it"""
+    # Writes of the strategy go to a copy instead of failing on the read-only block
+    frame = frame.copy(deep=False)
+    if callable(getattr(strategy, 'signals', None)):
+        return strategy_runner.normalize_signals(strategy.signals(frame), len(frame))[-1]
+    signal = strategy.custom_strategy(frame)
+    return signal if signal in SIGNAL_CODES else 'NEUTRAL'
+
+
+def _worker(conn, directory, memory_limit):
+    """Worker process: evaluates strategies on candles in shared memory
+
+    Sends 'ready' once the limits are set, then answers requests of
+    (strategy name, block name, rows, latest only, CPU seconds) with
+    ('ok', signal codes, seconds) or ('error', message, 0). Strategy files
+    are loaded on their first request, inside its limits.
+    """
+    # Libraries are trusted and load before the limits, strategy code after
+    try:
+        ta._load()
+    except ImportError:
+        pass
+    _limit_memory(memory_limit)
+    registry = strategy_registry(directory)
+    conn.send('ready')
+
+    block = None
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+
+        name, block_name, rows, latest, cpu_limit = request
+        try:
+            if block is None or block.name != block_name:
+                if block is not None:
+                    block.close()
+                block = shared_memory.SharedMemory(name=block_name)
+            values = np.ndarray((rows, len(BLOCK_COLUMNS)), dtype=np.float64, buffer=block.buf)
+            # Read-only like strategy_runner.strategy_frame
+            values.flags.writeable = False
+            frame = pd.DataFrame(values[:, 1:], index=pd.to_datetime(values[:, 0], unit='ms'),
+                                 columns=list(strategy_runner.STRATEGY_COLUMNS), copy=False)
+
+            started = time.perf_counter()
+            _limit_cpu(cpu_limit)
+            try:
+                strategy = registry.get(name)
+                if latest:
+                    signals = np.array([_latest_signal(strategy, frame)], dtype=object)
+                else:
+                    signals, _ = strategy_runner.run_strategy(frame, strategy)
+            finally:
+                _limit_cpu(None)
+            seconds = time.perf_counter() - started
+
+            codes = np.zeros(len(signals), dtype=np.int8)
+            codes[signals == 'BUY'] = 1
+            codes[signals == 'SELL'] = -1
+            del frame, values
+            conn.send(('ok', codes, seconds))
+        except BaseException as e:
+            conn.send(('error', f"{type(e).__name__}: {e}", 0))
+
+    if block is not None:
+        block.close()
+
+
+class _Worker:
+    """One sandbox process with its pipe and shared input block"""
+
+    def __init__(self, context, directory, memory_limit):
+        self.context = context
+        self.args = (directory, memory_limit)
+        self.process = None
+        self.conn = None
+        self.block = None
+        self.ready = False
+
+    def start(self):
+        self.conn, child = self.context.Pipe()
+        self.process = self.context.Process(
+            target=_worker, args=(child,) + self.args, name="strategy-sandbox", daemon=True
+        )
+        self.process.start()
+        child.close()
+        self.ready = False
+
+    def wait_ready(self, timeout=STARTUP_TIMEOUT):
+        """Wait until a started worker set its limits and accepts requests"""
+        if self.ready:
+            return
+        try:
+            started = self.conn.poll(timeout) and self.conn.recv() == 'ready'
+        except (EOFError, OSError):
+            started = False
+        if not started:
+            code = self.process.exitcode
+            self.kill()
+            raise RuntimeError(f"Strategy sandbox worker failed to start (exit code {code})")
+        self.ready = True
+
+    @property
+    def alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def write(self, df):
+        """Copy the candles of df into the shared block, growing it if needed"""
+        rows = len(df)
+        size = max(rows, 1) * len(BLOCK_COLUMNS) * 8
+        if self.block is None or self.block.size < size:
+            self.release_block()
+            # Room to grow so a live window does not reallocate every candle
+            self.block = shared_memory.SharedMemory(create=True, size=size * 2)
+        values = np.ndarray((rows, len(BLOCK_COLUMNS)), dtype=np.float64, buffer=self.block.buf)
+        values[:, 0] = backtest_engine.timestamps_ms(df.index)
+        for column, name in enumerate(strategy_runner.STRATEGY_COLUMNS, start=1):
+            values[:, column] = np.asarray(df[name], dtype=np.float64)
+        return rows
+
+    def kill(self):
+        if self.process is not None:
+            self.process.kill()
+            self.process.join()
+        if self.conn is not None:
+            self.conn.close()
+        self.process = None
+        self.conn = None
+        self.ready = False
+
+    def stop(self):
+        if self.alive:
+            try:
+                self.conn.send(None)
+                self.process.join(1)
+            except (OSError, ValueError):
+                pass
+        self.kill()
+        self.release_block()
+
+    def release_block(self):
+        if self.block is not None:
+            self.block.close()
+            self.block.unlink()
+            self.block = None
+
+
+class StrategySandbox:
+    """Runs custom Python strategies in worker processes with limits
+
+    Every call has a wall-clock timeout; on POSIX the worker also gets a
+    CPU time limit per call, `cpu_limit` or the call's timeout if that is
+    longer, and an address space limit. A worker that
+    times out or dies is killed, the incident is recorded and printed, and
+    a fresh worker is started for the next call, so a strategy that loops
+    forever or allocates without bound never blocks the caller for longer
+    than the timeout.
+
+    Workers load a strategy on its first call, under that call's limits,
+    and keep it loaded, reloading changed files like StrategyRegistry; the
+    timeout starts once the worker is up, so restarting one after a kill
+    does not count against the next call. Candles are passed in a shared
+    memory block per worker, only the strategy name and the row count are
+    sent through the pipe.
+
+    Args:
+        processes (int): Worker processes
+        timeout (float): Default wall-clock seconds per call
+        cpu_limit (float): CPU seconds per call, raised to the call's timeout
+            for longer calls such as backtests; None for no limit
+        memory_limit (int): Bytes a worker may allocate beyond its warm
+            state, None for no limit
+        start_method (str): multiprocessing start method, 'spawn' is safe
+            from GUI threads
+    """
+
+    def __init__(self, processes=2, timeout=2.0, cpu_limit=2.0, memory_limit=512 * 1024 * 1024,
+                 directory=STRATEGY_DIR, start_method='spawn'):
+        self.timeout = timeout
+        self.cpu_limit = cpu_limit
+        self.incidents = collections.deque(maxlen=100)
+        context = multiprocessing.get_context(start_method)
+        self._workers = [_Worker(context, directory, memory_limit) for _ in range(processes)]
+        self._idle = queue.Queue()
+        for worker in self._workers:
+            self._idle.put(worker)
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def start(self):
+        """Start all workers now instead of on their first call"""
+        for worker in self._workers:
+            if not worker.alive:
+                worker.start()
+        for worker in self._workers:
+            worker.wait_ready()
+
+    def signals(self, name, df, timeout=None):
+        """Signal of strategy `name` for every candle of df, see strategy_runner.run_strategy
+
+        Returns:
+            tuple: (signals, seconds) as in strategy_runner.run_strategy
+
+        Raises:
+            TimeoutError: The strategy ran out of time and was stopped
+            RuntimeError: The strategy raised or its worker died
+        """
+        codes, seconds = self._call(name, df, False, timeout)
+        return strategy_runner.normalize_signals(codes, len(codes)), seconds
+
+    def latest_signal(self, name, df, timeout=None):
+        """'BUY', 'SELL' or 'NEUTRAL' for the newest candle of df"""
+        codes, _ = self._call(name, df, True, timeout)
+        return strategy_runner.normalize_signals(codes, 1)[0]
+
+    def _call(self, name, df, latest, timeout):
+        if self._closed:
+            raise RuntimeError("Strategy sandbox is closed")
+        timeout = self.timeout if timeout is None else timeout
+        cpu_limit = None if self.cpu_limit is None else max(self.cpu_limit, timeout)
+        worker = self._idle.get()
+        try:
+            if not worker.alive:
+                worker.start()
+            worker.wait_ready()
+            rows = worker.write(df)
+            started = time.perf_counter()
+            worker.conn.send((name, worker.block.name, rows, latest, cpu_limit))
+
+            if not worker.conn.poll(timeout):
+                worker.kill()
+                self._report(name, f"timed out after {timeout:.1f} s")
+                raise TimeoutError(f"Strategy {name} took longer than {timeout:.1f} s and was stopped")
+            try:
+                status, result, seconds = worker.conn.recv()
+            except (EOFError, OSError):
+                # Killed by the kernel, e.g. SIGXCPU after its CPU time limit
+                worker.process.join(1)
+                code = worker.process.exitcode
+                worker.kill()
+                self._report(name, f"worker died (exit code {code}) after {time.perf_counter() - started:.1f} s")
+                raise RuntimeError(f"Strategy {name} was stopped (exit code {code})") from None
+
+            if status != 'ok':
+                if result.startswith('MemoryError'):
+                    self._report(name, "exceeded the memory limit")
+                raise RuntimeError(f"Strategy {name} failed: {result}")
+            return result, seconds
+        finally:
+            self._idle.put(worker)
+
+    def _report(self, name, reason):
+        self.incidents.append({'time': time.time(), 'strategy': name, 'reason': reason})
+        print(f"Strategy sandbox: {name} {reason}")
+
+    def close(self):
+        """Stop all workers and free their shared blocks"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        # Waits for calls in progress, which end within their timeout
+        for _ in self._workers:
+            self._idle.get().stop()
@@ -0,0 +1,44 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from account_state import AccountState
+
+
+class FakeClient:
+    def __init__(self):
+        self.usdt = 100.0
+        self.calls = 0
+
+    def get_account(self):
+        self.calls += 1
+        return {'balances': [{'asset': 'USDT', 'free': str(self.usdt), 'locked': '0'}],
+                'commissionRates': {'maker': '0.001'}, 'canTrade': True}
+
+
+def offline_account(client):
+    account = AccountState(client, rest_interval=30.0)
+    account._thread = object()  # User-data stream never connects
+    return account
+
+
+def test_invalidate_refreshes_right_away_while_the_stream_is_down():
+    client = FakeClient()
+    account = offline_account(client)
+    assert account.balance('USDT') == 100.0
+
+    client.usdt = 0.0
+    account.invalidate()  # e.g. after an order filled
+    assert account.balance('USDT') == 0.0
+    assert client.calls == 2
+
+
+def test_stale_snapshot_waits_for_rest_interval():
+    client = FakeClient()
+    account = offline_account(client)
+    account.balance('USDT')
+
+    account._stale = True  # Stream dropped
+    account.balance('USDT')
+    assert client.calls == 1
@@ -0,0 +1,158 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import backtest_engine
+
+
+def candles(bars, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 + rng.standard_normal(bars).cumsum()
+    df = pd.DataFrame({'open': close, 'high': close + 1, 'low': close - 1, 'close': close},
+                      index=pd.date_range('2024-01-01', periods=bars, freq='h'))
+
+    def oscillator(amplitude, noise):
+        # Cycles of 10 to 40 bars with noise on top
+        phase = np.cumsum(2 * np.pi / rng.uniform(10, 40, bars))
+        values = amplitude * np.sin(phase) + noise * rng.standard_normal(bars)
+        values[:20] = np.nan  # Warm-up
+        return values
+
+    df['wt1'] = oscillator(80, 15)
+    df['wt2'] = df['wt1'].rolling(4).mean()
+    # Bars with both a buy and a sell signal
+    for i in range(40, bars - 1, 97):
+        df.iloc[i, df.columns.get_loc('wt1')] = -70
+        df.iloc[i, df.columns.get_loc('wt2')] = 70
+        df.iloc[i + 1, df.columns.get_loc('wt1')] = 0
+        df.iloc[i + 1, df.columns.get_loc('wt2')] = 0
+    df['rsi'] = 50 + oscillator(25, 5)
+    df['macd'] = oscillator(1, 0.3)
+    df['signal'] = df['macd'].rolling(5).mean()
+    return df
+
+
+def loop_backtest(df, strategy_type):
+    """TradingBot.backtest's original per-row loop"""
+    position = None
+    entry_price = 0
+    trades = []
+    for i in range(1, len(df)):
+        current_price = df['close'].iloc[i]
+        timestamp = df.index[i]
+        if strategy_type == "Special":
+            wt1 = df['wt1'].iloc[i]
+            wt2 = df['wt2'].iloc[i]
+            wt1_prev = df['wt1'].iloc[i-1]
+            wt2_prev = df['wt2'].iloc[i-1]
+            buy_signal = (wt1_prev <= -60 or wt2_prev <= -60) and (wt1 > -60 and wt2 > -60)
+            sell_signal = (wt1_prev >= 60 or wt2_prev >= 60) and (wt1 < 60 and wt2 < 60)
+        elif strategy_type == "RSI":
+            rsi = df['rsi'].iloc[i]
+            rsi_prev = df['rsi'].iloc[i-1]
+            buy_signal = rsi_prev <= 30 and rsi > 30
+            sell_signal = rsi_prev >= 70 and rsi < 70
+        else:
+            macd = df['macd'].iloc[i]
+            signal = df['signal'].iloc[i]
+            macd_prev = df['macd'].iloc[i-1]
+            signal_prev = df['signal'].iloc[i-1]
+            buy_signal = macd_prev <= signal_prev and macd > signal
+            sell_signal = macd_prev >= signal_prev and macd < signal
+
+        if position is None and buy_signal:
+            position = "LONG"
+            entry_price = current_price
+            trades.append({'timestamp': int(timestamp.timestamp() * 1000), 'type': 'BUY',
+                           'price': current_price, 'profit': 0})
+        elif position == "LONG" and sell_signal:
+            trades.append({'timestamp': int(timestamp.timestamp() * 1000), 'type': 'SELL',
+                           'price': current_price, 'profit': current_price - entry_price})
+            position = None
+            entry_price = 0
+    return trades
+
+
+def get_signal(wt1, wt2):
+    """TradingBot.get_signal"""
+    if len(wt1) < 2 or len(wt2) < 2:
+        return "neutral"
+    prev_wt1, curr_wt1 = wt1[-2:]
+    prev_wt2, curr_wt2 = wt2[-2:]
+    if prev_wt1 <= prev_wt2 and curr_wt1 > curr_wt2:
+        return "buy"
+    elif prev_wt1 >= prev_wt2 and curr_wt1 < curr_wt2:
+        return "sell"
+    return "neutral"
+
+
+def loop_without_api(close, wt1, wt2, initial_capital, commission_fee):
+    """TradingBot.backtest_without_api's original O(n²) loop, with the final marked assets"""
+    position = 0
+    position_price = 0
+    total_assets = initial_capital
+    trades = []
+    for i in range(1, len(close)):
+        signal = get_signal(wt1[:i+1], wt2[:i+1])
+        if signal == "buy" and position == 0:
+            position = 1
+            position_price = close[i]
+            total_assets *= (1 - commission_fee)
+            trades.append(('buy', i, total_assets))
+        elif signal == "sell" and position == 1:
+            total_assets *= (1 + (close[i] / position_price - 1) * (1 - commission_fee))
+            position = 0
+            trades.append(('sell', i, total_assets))
+    if position == 1:
+        total_assets *= (1 + (close[-1] / position_price - 1) * (1 - commission_fee))
+    return trades, total_assets
+
+
+@pytest.mark.parametrize('strategy_type', ["Special", "RSI", "MACD"])
+def test_run_backtest_matches_the_row_loop(strategy_type):
+    df = candles(2000)
+    expected = loop_backtest(df, strategy_type)
+    trades = backtest_engine.run_backtest(df, strategy_type).to_list()
+
+    assert len(expected) > 10
+    assert [(t['timestamp'], t['type']) for t in trades] == [(t['timestamp'], t['type']) for t in expected]
+    np.testing.assert_allclose([t['price'] for t in trades], [t['price'] for t in expected])
+    np.testing.assert_allclose([t['profit'] for t in trades], [t['profit'] for t in expected])
+
+
+def test_bars_with_both_signals_buy_when_flat_and_sell_when_long():
+    buy, sell = backtest_engine.signal_masks(candles(2000), "Special")
+    assert np.any(buy & sell)
+
+    buy = np.array([0, 1, 1, 1, 0, 1, 0, 1], dtype=bool)
+    sell = np.array([0, 0, 1, 1, 1, 1, 0, 0], dtype=bool)
+    entries, exits = backtest_engine.resolve_positions(buy, sell)
+    assert entries.tolist() == [1, 3, 5]
+    assert exits.tolist() == [2, 4]
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_crossover_trades_and_equity_match_get_signal(seed):
+    df = candles(800, seed)
+    close = df['close'].to_numpy()
+    wt1, wt2 = df['wt1'].to_numpy(), df['wt2'].to_numpy()
+    expected, final_assets = loop_without_api(close, wt1, wt2, 100000, 0.001)
+
+    buy, sell = backtest_engine.crossover_masks(wt1, wt2)
+    entries, exits = backtest_engine.resolve_positions(buy, sell)
+    assets, equity = backtest_engine.compound_trades(close, entries, exits, 100000, 0.001)
+    bars = backtest_engine.trade_bars(entries, exits)
+
+    assert len(expected) > 10
+    assert [(side, i) for side, i, _ in expected] == [('buy' if k % 2 == 0 else 'sell', i)
+                                                       for k, i in enumerate(bars.tolist())]
+    np.testing.assert_allclose(assets, [total for _, _, total in expected])
+    np.testing.assert_allclose(equity[-1], final_assets)
+
+    trades = backtest_engine.trades_from_masks(df, buy, sell)
+    assert trades.index.tolist() == bars.tolist()
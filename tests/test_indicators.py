@@ -0,0 +1,187 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import indicator_kernels as kernels
+from indicators import (StreamingEMA, StreamingMACD, StreamingRMA, StreamingRSI, StreamingSMA, WaveTrend,
+                        WaveTrendSeries)
+
+
+# pandas_ta's pure-pandas code (0.3.14b), the reference the indicators must match
+
+def ta_ema(close, length):
+    close = close.copy()
+    sma_nth = close[0:length].mean()
+    close[:length - 1] = np.nan
+    close.iloc[length - 1] = sma_nth
+    return close.ewm(span=length, adjust=False).mean()
+
+
+def ta_sma(close, length):
+    return close.rolling(length, min_periods=length).mean()
+
+
+def ta_rma(close, length):
+    return close.ewm(alpha=1 / length, min_periods=length).mean()
+
+
+def ta_rsi(close, length=14):
+    negative = close.diff(1)
+    positive = negative.copy()
+    positive[positive < 0] = 0
+    negative[negative > 0] = 0
+    positive_avg = ta_rma(positive, length)
+    negative_avg = ta_rma(negative, length)
+    return 100 * positive_avg / (positive_avg + negative_avg.abs())
+
+
+def ta_macd(close, fast=12, slow=26, signal=9):
+    macd = ta_ema(close, fast) - ta_ema(close, slow)
+    signal_line = ta_ema(macd.loc[macd.first_valid_index():], signal).reindex(macd.index)
+    return macd, signal_line, macd - signal_line
+
+
+def ta_wave_trend(high, low, close, channel_length=10, average_length=21):
+    ap = (high + low + close) / 3
+    esa = ta_ema(ap, channel_length)
+    d = ta_ema(abs(ap - esa), channel_length)
+    ci = (ap - esa) / (0.015 * d)
+    wt1 = ta_ema(ci, average_length)
+    return wt1, ta_sma(wt1, 4)
+
+
+def candles(bars=300, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 + rng.standard_normal(bars).cumsum()
+    high = close + rng.uniform(0, 2, bars)
+    low = close - rng.uniform(0, 2, bars)
+    return pd.Series(high), pd.Series(low), pd.Series(close)
+
+
+def assert_matches(actual, expected):
+    actual = np.asarray(actual, dtype=np.float64)
+    expected = np.asarray(expected, dtype=np.float64)
+    # Same warm-up: NaN exactly where the reference is NaN
+    np.testing.assert_array_equal(np.isnan(actual), np.isnan(expected))
+    np.testing.assert_allclose(actual, expected, rtol=1e-9, atol=1e-9, equal_nan=True)
+
+
+# Kernels
+
+@pytest.mark.parametrize('length', [1, 5, 14, 30])
+def test_moving_average_kernels_match_pandas_ta(length):
+    _, _, close = candles()
+    assert_matches(kernels.ema(close.to_numpy(), length), ta_ema(close, length))
+    assert_matches(kernels.sma(close.to_numpy(), length), ta_sma(close, length))
+    assert_matches(kernels.rma(close.to_numpy(), length), ta_rma(close, length))
+
+
+def test_oscillator_kernels_match_pandas_ta():
+    high, low, close = candles()
+    assert_matches(kernels.rsi(close.to_numpy()), ta_rsi(close))
+    for actual, expected in zip(kernels.macd(close.to_numpy()), ta_macd(close)):
+        assert_matches(actual, expected)
+    for actual, expected in zip(kernels.wave_trend(high.to_numpy(), low.to_numpy(), close.to_numpy()),
+                                ta_wave_trend(high, low, close)):
+        assert_matches(actual, expected)
+
+
+def test_kernels_treat_leading_nan_rows_like_shorter_series():
+    _, _, close = candles()
+    rows = np.vstack([close.to_numpy(), close.to_numpy()])
+    rows[1, :40] = np.nan  # A symbol listed later
+    late = close[40:].reset_index(drop=True)
+
+    assert_matches(kernels.ema(rows, 10)[1, 40:], ta_ema(late, 10))
+    assert_matches(kernels.rsi(rows)[1, 40:], ta_rsi(late))
+    assert_matches(kernels.macd(rows)[1][1, 40:], ta_macd(late)[1])
+    assert_matches(kernels.rsi(rows)[0], ta_rsi(close))
+    assert np.isnan(kernels.ema(rows, 10)[1, :49]).all()
+
+
+# Streaming indicators
+
+def stream(indicator, values):
+    return [indicator.update(float(x)) for x in values]
+
+
+def test_streaming_indicators_match_the_kernels():
+    _, _, close = candles()
+    values = close.to_numpy()
+    assert_matches(stream(StreamingEMA(10), values), kernels.ema(values, 10))
+    assert_matches(stream(StreamingSMA(20), values), kernels.sma(values, 20))
+    assert_matches(stream(StreamingRMA(14), values), kernels.rma(values, 14))
+    assert_matches(stream(StreamingRSI(14), values), kernels.rsi(values, 14))
+
+    macd = np.array(stream(StreamingMACD(12, 26, 9), values))
+    for column, expected in enumerate(kernels.macd(values, 12, 26, 9)):
+        assert_matches(macd[:, column], expected)
+
+    assert StreamingRSI(14).seed(values) == pytest.approx(kernels.rsi(values)[-1])
+    assert StreamingMACD().seed(values) == pytest.approx(tuple(v[-1] for v in kernels.macd(values)))
+
+
+def test_streaming_state_restores_a_partial_candle():
+    _, _, close = candles()
+    rsi = StreamingRSI(14)
+    rsi.seed(close[:100])
+    closed = rsi.state()
+    rsi.update(close[100] + 5)  # Forming candle
+    rsi.restore(closed)
+    assert rsi.update(float(close[100])) == pytest.approx(kernels.rsi(close.to_numpy()[:101])[-1])
+
+
+def test_wave_trend_matches_the_batch_calculation():
+    high, low, close = candles()
+    wt1, wt2 = kernels.wave_trend(high.to_numpy(), low.to_numpy(), close.to_numpy())
+
+    wave_trend = WaveTrend()
+    values = np.array([wave_trend.update(h, l, c) for h, l, c in zip(high, low, close)])
+    assert_matches(values[:, 0], wt1)
+    assert_matches(values[:, 1], wt2)
+    # wt1 starts after the 21 bar EMA seed, wt2 after three more for its SMA
+    assert np.isnan(values[:20, 0]).all() and not np.isnan(values[20:, 0]).any()
+    assert np.isnan(values[:23, 1]).all() and not np.isnan(values[23:, 1]).any()
+
+    seeded = WaveTrend()
+    assert seeded.seed(high, low, close) == pytest.approx((wt1[-1], wt2[-1]))
+    assert (seeded.prev_wt1, seeded.prev_wt2) == pytest.approx((wt1[-2], wt2[-2]))
+
+
+def test_wave_trend_provisional_updates_are_undone():
+    high, low, close = candles()
+    wt1, wt2 = kernels.wave_trend(high.to_numpy(), low.to_numpy(), close.to_numpy())
+
+    wave_trend = WaveTrend()
+    wave_trend.seed(high[:200], low[:200], close[:200])
+    # Updates of the forming candle, replaced by the next update
+    for bump in (3.0, -2.0, 1.0):
+        wave_trend.update(high[200] + bump, low[200] + bump, close[200] + bump, provisional=True)
+    assert wave_trend.update(high[200], low[200], close[200]) == pytest.approx((wt1[200], wt2[200]))
+    assert (wave_trend.prev_wt1, wave_trend.prev_wt2) == pytest.approx((wt1[199], wt2[199]))
+
+    # Or dropped explicitly
+    wave_trend.update(high[201] + 5, low[201] + 5, close[201] + 5, provisional=True)
+    wave_trend.rollback()
+    assert (wave_trend.wt1, wave_trend.wt2) == pytest.approx((wt1[200], wt2[200]))
+    wave_trend.rollback()  # Nothing pending
+    assert wave_trend.update(high[201], low[201], close[201]) == pytest.approx((wt1[201], wt2[201]))
+
+
+def test_wave_trend_series_follows_a_polled_window():
+    high, low, close = candles()
+    wt1, wt2 = kernels.wave_trend(high.to_numpy(), low.to_numpy(), close.to_numpy())
+    timestamps = np.arange(len(close)) * 60_000
+
+    series = WaveTrendSeries(capacity=100)
+    for end in range(100, len(close) + 1, 7):
+        window = slice(end - 100, end)
+        series_wt1, series_wt2 = series.sync(timestamps[window], high[window], low[window], close[window])
+        # The newest candle is provisional but computed from the same values
+        assert_matches(series_wt1, wt1[max(0, end - 100):end][-len(series_wt1):])
+        assert_matches(series_wt2, wt2[max(0, end - 100):end][-len(series_wt2):])
@@ -0,0 +1,117 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import kline_store
+from kline_store import KlineStore, klines_to_columns
+
+MINUTE = 60_000
+T0 = 28_333_334 * MINUTE  # 2023-11-14 22:14 UTC
+
+
+def at(minute):
+    return T0 + minute * MINUTE
+
+
+def klines(minutes, price=1.0):
+    """Raw Binance klines opening at the given minutes after T0"""
+    return klines_to_columns([
+        [at(m), str(price), str(price + 1), str(price - 1), str(price), "10", at(m) + MINUTE - 1, "100", 5,
+         "0", "0", "0"]
+        for m in minutes
+    ])
+
+
+def through(minute):
+    """Inclusive end of the candle opening at `minute`"""
+    return at(minute) + MINUTE - 1
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    now = [at(60)]
+    monkeypatch.setattr(kline_store, 'now_ms', lambda: now[0])
+    store = KlineStore(str(tmp_path))
+    store.now = now
+    return store
+
+
+def generation(store):
+    return store._load_manifest('BTCUSDT', '1m')['generation']
+
+
+def stored_minutes(store, start=None, end=None):
+    timestamps = store.read('BTCUSDT', '1m', start, end)['timestamp']
+    return ((np.asarray(timestamps) - T0) // MINUTE).tolist()
+
+
+def test_newer_and_overlapping_candles_are_written_in_place(store):
+    store.write('BTCUSDT', '1m', klines(range(0, 10)), [(at(0), through(9))])
+    assert generation(store) == 1
+
+    store.write('BTCUSDT', '1m', klines(range(10, 15)), [(at(10), through(14))])
+    # Refreshes the last two candles and adds two new ones
+    store.write('BTCUSDT', '1m', klines(range(13, 17), price=2.0), [(at(13), through(16))])
+    # Newer with a gap before it
+    store.write('BTCUSDT', '1m', klines(range(20, 23)), [(at(20), through(22))])
+
+    assert generation(store) == 1
+    assert stored_minutes(store) == list(range(0, 17)) + [20, 21, 22]
+    candles = store.read('BTCUSDT', '1m', at(12), at(16))
+    assert candles['close'].tolist() == [1.0, 2.0, 2.0, 2.0, 2.0]
+    assert stored_minutes(store, at(5), through(8)) == [5, 6, 7, 8]
+
+
+def test_older_and_out_of_order_candles_rewrite_a_new_generation(store, tmp_path):
+    store.write('BTCUSDT', '1m', klines(range(10, 20)), [(at(10), through(19))])
+    # Out of order, before the stored candles, with a duplicate whose last copy wins
+    batch = klines([5, 3, 4, 5, 1])
+    batch['close'][3] = 7.0
+    store.write('BTCUSDT', '1m', batch, [(at(1), through(5))])
+
+    assert generation(store) == 2
+    assert stored_minutes(store) == [1, 3, 4, 5] + list(range(10, 20))
+    assert store.read('BTCUSDT', '1m', at(5), at(5))['close'].tolist() == [7.0]
+    # Fills the gap in the middle
+    store.write('BTCUSDT', '1m', klines(range(6, 10)), [(at(6), through(9))])
+    assert generation(store) == 3
+    assert stored_minutes(store) == [1, 3, 4] + list(range(5, 20))
+
+    # Old generations are removed and a new store reads the same rows
+    files = os.listdir(tmp_path / 'BTCUSDT' / '1m')
+    assert all(file.endswith('.3.bin') for file in files if file.endswith('.bin'))
+    assert stored_minutes(KlineStore(str(tmp_path))) == stored_minutes(store)
+
+
+def test_missing_ranges_between_covered_ranges(store):
+    store.write('BTCUSDT', '1m', klines(range(0, 10)), [(at(0), through(9))])
+    store.write('BTCUSDT', '1m', klines(range(30, 40)), [(at(30), through(39))])
+    store.write('BTCUSDT', '1m', klines(range(20, 25)), [(at(20), through(24))])
+    # Touching ranges merge
+    store.write('BTCUSDT', '1m', klines(range(25, 30)), [(at(25), through(29))])
+
+    assert store._load_manifest('BTCUSDT', '1m')['covered'] == [[at(0), through(9)], [at(20), through(39)]]
+    assert store.missing('BTCUSDT', '1m', at(0), through(50)) == [(at(10), at(20) - 1), (at(40), through(50))]
+    assert store.missing('BTCUSDT', '1m', at(5), through(8)) == []
+    assert store.missing('BTCUSDT', '1m', at(5), through(25)) == [(at(10), at(20) - 1)]
+    assert store.missing('BTCUSDT', '1m', at(12), through(15)) == [(at(12), through(15))]
+    assert store.covers('BTCUSDT', '1m', at(21), through(39))
+
+
+def test_only_closed_candles_are_covered(store):
+    store.now[0] = at(9) + 30_000  # Minute 9 is still open
+    store.write('BTCUSDT', '1m', klines(range(0, 10)), [(at(0), through(9))])
+
+    assert stored_minutes(store) == list(range(10))
+    assert store.missing('BTCUSDT', '1m', at(0), through(9)) == [(at(9), through(9))]
+
+    # The next fetch after the candle closed replaces it and covers it
+    store.now[0] = at(12)
+    store.write('BTCUSDT', '1m', klines(range(9, 12), price=3.0), [(at(9), through(11))])
+    assert generation(store) == 1
+    assert store.read('BTCUSDT', '1m', at(9), at(9))['close'].tolist() == [3.0]
+    assert store.covers('BTCUSDT', '1m', at(0), through(11))
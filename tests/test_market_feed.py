@@ -0,0 +1,59 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import market_feed
+from market_feed import MarketFeed
+
+
+def ticker(symbol, volume=1e9):
+    return {'s': symbol, 'c': '101', 'o': '100', 'h': '110', 'l': '90', 'v': '1', 'q': str(volume)}
+
+
+def history(symbols, interval, limit):
+    loaded = {}
+    for symbol in symbols:
+        if symbol == 'GONEUSDT':
+            continue  # Delisted, no candles
+        close = np.linspace(100, 110, limit)
+        loaded[symbol] = pd.DataFrame({'open': close, 'high': close, 'low': close, 'close': close},
+                                      index=np.arange(limit, dtype=float) * 60_000)
+    return loaded
+
+
+def seed_queued(feed):
+    keys = []
+    while not feed._seed_queue.empty():
+        keys.append(feed._seed_queue.get())
+    feed._seed(keys)
+    return keys
+
+
+def test_failed_history_is_retried_with_backoff(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(market_feed.time, 'monotonic', lambda: now[0])
+    feed = MarketFeed(None, load_histories=history)
+
+    feed._on_tickers([ticker('BTCUSDT'), ticker('GONEUSDT')])
+    assert sorted(seed_queued(feed)) == [('BTCUSDT', '1m'), ('GONEUSDT', '1m')]
+    assert ('BTCUSDT', '1m') in feed.markets
+
+    # Not queued again by the tickers of the next seconds
+    for _ in range(5):
+        now[0] += 1
+        feed._on_tickers([ticker('BTCUSDT'), ticker('GONEUSDT')])
+        assert seed_queued(feed) == []
+
+    now[0] += market_feed.RETRY_DELAY
+    feed._on_tickers([ticker('GONEUSDT')])
+    assert seed_queued(feed) == [('GONEUSDT', '1m')]
+    assert feed._failed[('GONEUSDT', '1m')][1] == 2 * market_feed.RETRY_DELAY
+
+    now[0] += market_feed.RETRY_DELAY
+    feed._on_tickers([ticker('GONEUSDT')])
+    assert seed_queued(feed) == []
+    assert feed.history_loads == 3
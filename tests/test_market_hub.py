@@ -0,0 +1,73 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import market_hub
+from market_hub import MarketHub, SingleFlight
+
+
+class FakeClient:
+    pass
+
+
+class FakeBot:
+    interval = '1m'
+
+    def __init__(self):
+        self.client = FakeClient()
+        self.requested = []
+        self._lock = threading.Lock()
+
+    def get_recent_data(self, symbol, interval, limit):
+        return self.get_recent_data_many([symbol], interval, limit)[symbol]
+
+    def get_recent_data_many(self, symbols, interval, limit):
+        with self._lock:
+            self.requested.extend(symbols)
+        time.sleep(0.2)
+        return {symbol: f"{symbol} {interval} {limit}" for symbol in symbols if symbol != 'FAILUSDT'}
+
+
+def test_concurrent_batches_request_each_symbol_once():
+    bot = FakeBot()
+    hub = MarketHub(bot)
+    batches = [['BTCUSDT', 'ETHUSDT'], ['ETHUSDT', 'SOLUSDT', 'FAILUSDT'], ['BTCUSDT', 'SOLUSDT']]
+    results = [None] * len(batches)
+
+    def load(i):
+        results[i] = hub.candles_many(batches[i], '1m')
+
+    threads = [threading.Thread(target=load, args=(i,)) for i in range(len(batches))]
+    threads.append(threading.Thread(target=hub.candles, args=('BTCUSDT', '1m')))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(bot.requested) == ['BTCUSDT', 'ETHUSDT', 'FAILUSDT', 'SOLUSDT']
+    assert results[1] == {'ETHUSDT': 'ETHUSDT 1m 100', 'SOLUSDT': 'SOLUSDT 1m 100'}
+    assert set(results[2]) == {'BTCUSDT', 'SOLUSDT'}
+
+    # Shared with later callers for the ttl, failed symbols are retried
+    hub.candles_many(['BTCUSDT', 'FAILUSDT'], '1m')
+    assert sorted(bot.requested) == ['BTCUSDT', 'ETHUSDT', 'FAILUSDT', 'FAILUSDT', 'SOLUSDT']
+
+
+def test_expired_results_are_dropped(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(market_hub.time, 'monotonic', lambda: now[0])
+    requests = SingleFlight(ttl=2.0)
+
+    # A scanner going through many pairs, one second apart
+    for i in range(500):
+        now[0] += 1.0
+        requests.do(('klines', f"PAIR{i}USDT", '1m', 100), lambda: object())
+        assert len(requests._results) <= 3
+
+    assert requests.do(('klines', 'PAIR499USDT', '1m', 100), lambda: None) is not None
+    now[0] += 10.0
+    requests.do('tickers', dict)
+    assert list(requests._results) == ['tickers']
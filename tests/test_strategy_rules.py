@@ -0,0 +1,93 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from strategy_rules import CompiledRule
+
+RULES = [
+    "buy: rsi(14) < 40 and close > ema(5)\nsell: rsi > 60 or cross_down(wt1, wt2)",
+    "buy: cross_up(macd, macd_signal)\nsell: cross_down(ema(close, 12), ema(sma(20), 5))",
+    "buy: prev(close) < close and abs(close - open) > 0.5 and 20 < rsi(7) < 50\n"
+    "sell: not (close > ema(9)) and macd_hist(5, 13, 4) < 0",
+    "buy: cross_up(wt1(5, 10), -20)\nsell: cross_down(rma(high - low, 5), prev(rma(high - low, 5)))",
+]
+
+
+def candles(bars, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 + 5 * np.sin(np.arange(bars) / 6) + rng.standard_normal(bars).cumsum() * 0.5
+    open = close + rng.normal(0, 0.6, bars)
+    return pd.DataFrame({'open': open, 'high': np.maximum(open, close) + rng.uniform(0, 1, bars),
+                         'low': np.minimum(open, close) - rng.uniform(0, 1, bars), 'close': close,
+                         'volume': rng.uniform(1, 10, bars)},
+                        index=pd.date_range('2024-01-01', periods=bars, freq='h'))
+
+
+@pytest.mark.parametrize('text', RULES)
+def test_batch_scan_and_stream_agree(text):
+    rule = CompiledRule(text)
+    df = candles(300)
+    signals = rule.signals(df)
+    assert (signals == 'BUY').any() and (signals == 'SELL').any()
+
+    # Streaming, one closed candle at a time
+    stream = rule.stream()
+    streamed = []
+    for row in df.itertuples():
+        buy, sell = stream.update(row.open, row.high, row.low, row.close, row.volume)
+        streamed.append('BUY' if buy else 'SELL' if sell else 'NEUTRAL')
+    assert streamed == signals.tolist()
+
+    # Scanner, newest candle of histories of different lengths side by side
+    ends = list(range(5, 301, 5))
+    scanned = rule.scan([f"S{end}" for end in ends], [df.iloc[:end] for end in ends])
+    buy, sell = rule.evaluate({f: df[f].to_numpy() for f in df})
+    assert scanned['buy'].tolist() == [bool(buy[end - 1]) for end in ends]
+    assert scanned['sell'].tolist() == [bool(sell[end - 1]) for end in ends]
+
+
+def test_scan_matches_symbols_evaluated_one_by_one():
+    rule = CompiledRule(RULES[0])
+    frames = [candles(300, seed)[-length:] for seed, length in enumerate((300, 120, 40, 299))]
+    scanned = rule.scan(['A', 'B', 'C', 'D'], frames)
+    for symbol, df in zip('ABCD', frames):
+        buy, sell = rule.evaluate({f: df[f].to_numpy() for f in df})
+        assert (scanned.loc[symbol, 'buy'], scanned.loc[symbol, 'sell']) == (buy[-1], sell[-1])
+
+
+def test_stream_seed_matches_the_last_batch_signal():
+    rule = CompiledRule(RULES[1])
+    df = candles(300)
+    signals = rule.signals(df)
+    for end in (50, 173, 300):
+        buy, sell = rule.stream().seed(df.iloc[:end])
+        assert ('BUY' if buy else 'SELL' if sell else 'NEUTRAL') == signals[end - 1]
+
+
+@pytest.mark.parametrize('text, message', [
+    ("buy: close.real > 1", "Attribute is not allowed"),
+    ("buy: __import__('os').system('true')", "Only calls like"),
+    ("buy: eval('1') > 0", "Unknown function 'eval'"),
+    ("buy: open(1) > 0", "Unknown function 'open'"),
+    ("buy: secret > 1", "Unknown name 'secret'"),
+    ("buy: close[0] > 1", "Subscript is not allowed"),
+    ("buy: (lambda: 1)() > 0", "Only calls like"),
+    ("buy: rsi(length=14) < 30", "Only calls like"),
+    ("buy: close ** 2 > 1", "Pow is not allowed"),
+    ("buy: close > 'a'", "Constant is not allowed"),
+    ("buy: [close][0] > 1", "is not allowed"),
+    ("buy: close if close > 1 else open", "IfExp is not allowed"),
+    ("buy: sma(close) > 1", "needs a length"),
+    ("buy: ema(close, 2.5) > 1", "positive integers"),
+    ("buy: ema(close, 0) > 1", "positive integers"),
+    ("sell: close > 1", "needs a 'buy:' rule"),
+    ("buy: close > 1\nbuy: close < 2", "more than one buy rule"),
+])
+def test_rules_outside_the_whitelist_are_rejected(text, message):
+    with pytest.raises(ValueError, match=message):
+        CompiledRule(text)
@@ -0,0 +1,95 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import indicator_kernels
+import strategy_runner
+from strategy_registry import StrategyRegistry
+
+
+def candles(bars, seed=0):
+    close = 100 + np.random.default_rng(seed).standard_normal(bars).cumsum()
+    return pd.DataFrame({'open': close + 0.1, 'high': close + 1, 'low': close - 1,
+                         'close': close, 'volume': 1.0},
+                        index=pd.date_range('2024-01-01', periods=bars, freq='min'))
+
+
+def example():
+    return StrategyRegistry(os.path.join(ROOT, 'strategies')).get('example')
+
+
+def test_per_bar_writes_to_data_stay_in_the_window():
+    df = candles(50)
+    original = df.copy()
+    seen = []
+
+    def strategy(data):
+        seen.append(data['close'].to_numpy().copy())
+        data.iloc[0, 3] = -1.0
+        data.loc[:, 'open'] = 0.0
+        data['close'] = data['close'] * 2
+        data['high'] = 0.0
+        return 'BUY'
+
+    signals, _ = strategy_runner.run_per_bar(df, strategy, max_lookback=10)
+
+    assert (signals == 'BUY').all()
+    for i, close in enumerate(seen):
+        np.testing.assert_array_equal(close, original['close'].to_numpy()[max(0, i - 9):i + 1])
+    pd.testing.assert_frame_equal(df, original)
+
+
+def test_strategy_frame_is_a_read_only_block():
+    frame = strategy_runner.strategy_frame(candles(20))
+    window = frame.iloc[5:10]
+    window.iloc[0, 3] = -1.0
+    assert frame['close'].iloc[5] != -1.0
+    with pytest.raises(ValueError):
+        frame['close'].to_numpy()[0] = 0.0
+
+
+def test_vectorized_writes_to_data_do_not_reach_the_lookahead_check():
+    def signals(data):
+        close = data['close'].to_numpy().copy()
+        # Scratch columns and in-place edits of the history it received
+        data['close'] = 0.0
+        data.iloc[:, 0] = -1.0
+        return np.where(close > np.roll(close, 1), 'BUY', 'SELL')
+
+    class Strategy:
+        pass
+
+    strategy = Strategy()
+    strategy.signals = signals
+    df = candles(200)
+    original = df.copy()
+
+    result, _ = strategy_runner.run_strategy(df, strategy)
+
+    close = original['close'].to_numpy()
+    np.testing.assert_array_equal(result, np.where(close > np.roll(close, 1), 'BUY', 'SELL'))
+    pd.testing.assert_frame_equal(df, original)
+
+
+def test_example_lookback_is_long_enough_for_its_rsi():
+    max_lookback = example().max_lookback
+    close = candles(3000)['close'].to_numpy()
+    full = indicator_kernels.rsi(close, 14)
+    windows = [indicator_kernels.rsi(close[end - max_lookback:end], 14)[-1]
+               for end in range(max_lookback, len(close) + 1, 50)]
+    np.testing.assert_allclose(windows, full[max_lookback - 1::50], rtol=0, atol=1e-6)
+
+
+def test_example_per_bar_and_vectorized_signals_agree():
+    pytest.importorskip('pandas_ta')
+    strategy = example()
+    df = candles(1500)
+    per_bar, _ = strategy_runner.run_per_bar(df, strategy.custom_strategy, strategy.max_lookback)
+    vectorized, _ = strategy_runner.run_strategy(df, strategy)
+    assert per_bar.tolist() == vectorized.tolist()
@@ -0,0 +1,95 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import strategy_sandbox
+from strategy_sandbox import StrategySandbox
+
+# Per-bar strategy spending about 1 ms of CPU time on every call
+BUSY_STRATEGY = '''
+import time
+
+def custom_strategy(data):
+    started = time.process_time()
+    while time.process_time() - started < 0.001:
+        pass
+    return 'BUY' if data['close'].iloc[-1] > data['open'].iloc[-1] else 'SELL'
+'''
+
+
+def candles(bars):
+    close = 100 + np.random.default_rng(0).standard_normal(bars).cumsum()
+    index = pd.date_range('2024-01-01', periods=bars, freq='min')
+    return pd.DataFrame({'open': close + 0.1, 'high': close + 1, 'low': close - 1,
+                         'close': close, 'volume': 1.0}, index=index)
+
+
+@pytest.fixture
+def sandbox(tmp_path):
+    (tmp_path / "busy.py").write_text(BUSY_STRATEGY)
+    sandbox = StrategySandbox(processes=1, timeout=1.0, cpu_limit=2.0, directory=str(tmp_path))
+    yield sandbox
+    sandbox.close()
+
+
+@pytest.mark.skipif(strategy_sandbox.resource is None, reason="CPU limits need the resource module")
+def test_backtest_may_use_more_cpu_than_a_live_call(sandbox):
+    df = candles(3000)
+    started = time.process_time()
+    signals, seconds = sandbox.signals("busy", df, timeout=60.0)
+
+    assert seconds > 2.0
+    assert len(signals) == len(df)
+    assert set(signals) <= {'BUY', 'SELL'}
+    assert not sandbox.incidents
+    assert time.process_time() - started < seconds  # The work ran in the worker
+
+
+def test_live_call_still_times_out(sandbox):
+    with pytest.raises(TimeoutError):
+        sandbox.signals("busy", candles(3000), timeout=0.5)
+    assert sandbox.incidents[-1]['strategy'] == "busy"
+
+
+def test_strategy_code_loads_inside_the_limits(sandbox, tmp_path):
+    (tmp_path / "hang.py").write_text("while True:\n    pass\n")
+    (tmp_path / "hog.py").write_text("hog = bytearray(2 * 1024 ** 3)\n\ndef custom_strategy(data):\n    return 'BUY'\n")
+
+    with pytest.raises(TimeoutError):
+        sandbox.latest_signal("hang", candles(50), timeout=1.0)
+    if strategy_sandbox.resource is not None:
+        with pytest.raises(RuntimeError, match="MemoryError"):
+            sandbox.latest_signal("hog", candles(50), timeout=5.0)
+    # Other strategies of the directory are unaffected
+    assert sandbox.latest_signal("busy", candles(50)) in ('BUY', 'SELL')
+
+
+def test_worker_restart_does_not_count_against_the_timeout(sandbox):
+    with pytest.raises(TimeoutError):
+        sandbox.signals("busy", candles(3000), timeout=0.2)
+
+    started = time.perf_counter()
+    assert sandbox.latest_signal("busy", candles(50), timeout=0.2) in ('BUY', 'SELL')
+    assert time.perf_counter() - started > 0.2  # Includes starting the new worker
+
+
+def test_strategies_cannot_write_to_the_shared_block(sandbox, tmp_path):
+    (tmp_path / "writer.py").write_text(
+        "def custom_strategy(data):\n"
+        "    data.iloc[-1, 3] = -1.0\n"
+        "    data.loc[:, 'open'] = 0.0\n"
+        "    return 'BUY'\n"
+    )
+    df = candles(50)
+    assert sandbox.latest_signal("writer", df) == 'BUY'
+
+    worker = sandbox._workers[0]
+    columns = strategy_sandbox.BLOCK_COLUMNS
+    values = np.ndarray((len(df), len(columns)), dtype=np.float64, buffer=worker.block.buf)
+    np.testing.assert_array_equal(values[:, 1:], df[list(columns[1:])].to_numpy())
@@ -0,0 +1,58 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import backtest_engine
+import walk_forward
+from parameter_sweep import price_matrix
+
+
+def candles(bars):
+    close = 100 + np.random.default_rng(1).standard_normal(bars).cumsum()
+    index = pd.date_range('2024-01-01', periods=bars, freq='h')
+    return pd.DataFrame({'high': close + 1, 'low': close - 1, 'close': close}, index=index)
+
+
+def continuous_run(prices, params, start, stop):
+    """Equity of one run over all bars, traded from bar `start` on"""
+    high, low, close = prices
+    columns = backtest_engine.compute_indicators('MACD', high, low, close, params)
+    buy, sell = backtest_engine.signal_masks(columns, 'MACD', params)
+    entries, exits = backtest_engine.resolve_positions(buy[start:stop], sell[start:stop])
+    _, equity = backtest_engine.compound_trades(close[start:stop], entries, exits, 1.0, 0.001)
+    return equity
+
+
+def test_test_windows_trade_a_crossover_on_their_first_bar():
+    prices = price_matrix(candles(1000))
+    params = dict(backtest_engine.DEFAULT_PARAMS['MACD'])
+    high, low, close = prices
+    columns = backtest_engine.compute_indicators('MACD', high, low, close, params)
+    buy, _ = backtest_engine.signal_masks(columns, 'MACD', params)
+    starts = np.flatnonzero(buy)[:5]
+    assert len(starts) == 5
+
+    tests = [(number, params, start, start + 50) for number, start in enumerate(starts)]
+    results = walk_forward.test_windows(prices, 'MACD', params, tests, 0.001)
+    for (_, metrics, equity), start in zip(results, starts):
+        assert metrics['trades'] >= 1
+        np.testing.assert_allclose(equity, continuous_run(prices, params, start, start + 50))
+
+
+def test_walk_forward_windows_match_continuous_runs():
+    df = candles(600)
+    windows, equity = walk_forward.walk_forward(df, 'MACD', {'fast': [12], 'slow': [26], 'signal': [9]},
+                                                train_bars=200, test_bars=100, processes=1)
+    prices = price_matrix(df)
+    params = dict(backtest_engine.DEFAULT_PARAMS['MACD'])
+    capital = 100000
+    for row in windows.itertuples():
+        start = df.index.get_loc(row.test_start)
+        stop = df.index.get_loc(row.test_end) + 1
+        expected = continuous_run(prices, params, start, stop) * capital
+        np.testing.assert_allclose(equity.iloc[start - 200:stop - 200].to_numpy(), expected)
+        capital = expected[-1]
@@ -1,19 +1,38 @@
-import websocket
 import json
 import pandas as pd
-import pandas_ta as ta
 import numpy as np
 from binance.client import Client
 from binance.enums import *
 import requests
 from datetime import datetime, timedelta
-import matplotlib.pyplot as plt
 from os import system
 from time import sleep
 import ssl
 from urllib import request
-import yfinance as yf
 import traceback
+from concurrent.futures import ThreadPoolExecutor
+from kline_store import KlineStore, klines_to_columns, columns_to_frame, interval_to_ms, now_ms
+from kline_downloader import KlineDownloader, PAGE_LIMIT
+from account_state import AccountState
+from market_hub import MarketHub
+from request_scheduler import ScheduledClient
+from async_exchange import SyncExchange
+from candle_buffer import CandleBuffer
+from indicators import WaveTrend
+from indicator_cache import indicator_cache
+import indicator_kernels
+import backtest_engine
+import parameter_sweep
+import walk_forward
+import portfolio_backtest
+import strategy_runner
+import strategy_rules
+from strategy_registry import strategy_registry
+from strategy_sandbox import StrategySandbox
+from lazy_imports import lazy_import
+
+# Only needed once live trading starts
+websocket = lazy_import('websocket')
 
 def read_api_keys(file_path='config.txt'):
     try:
@@ -31,11 +50,28 @@ class TradingBot:
         if not self.api_key or not self.api_secret:
             raise ValueError("API keys could not be loaded from config.txt")
         
-        self.client = Client(self.api_key, self.api_secret)
+        # REST calls are queued by priority within the request weight limit
+        self.client = ScheduledClient(self.api_key, self.api_secret)
+        # Pooled asyncio client for kline downloads and fan-outs over many symbols
+        self.exchange = SyncExchange(self.api_key, self.api_secret, scheduler=self.client.scheduler)
         self.symbol = symbol
         self.interval = interval
         self.in_position = False
-        self.data = pd.DataFrame(columns=['open', 'high', 'low', 'close', 'hcl3'])
+        self.candle_buffers = {}  # Live candles per symbol
+        self.wave_trends = {}  # Streaming Wave Trend state per symbol
+        self.rule = None  # Optional strategy_rules.CompiledRule traded instead of Wave Trend
+        self.rule_streams = {}  # Streaming rule state per symbol
+        self.strategy_name = None  # Saved strategy traded live, see set_strategy
+        self.sandbox = None  # Worker processes running Python strategies, see strategy_sandbox()
+        self.live_timeout = 1.0  # Seconds a Python strategy may take per live candle
+        self.backtest_timeout = 300.0  # Seconds a Python strategy may take per backtest
+        self.buffer_capacity = 50
+        self.kline_store = KlineStore()
+        self.downloader = KlineDownloader(self.exchange)
+        self.account = AccountState(self.client)  # Connects its stream on the first balance read
+        self.market_hub = MarketHub(self)  # Tickers and candles shared by every view and thread
+        self.download_progress = None  # Optional callback(done_pages, total_pages)
+        self.strategy_timings = {}  # Last custom strategy run per strategy name
         
         # Wave Trend parameters
         self.channel_length = 10
@@ -60,46 +96,150 @@ class TradingBot:
             'usdt_balance': self.get_usdt_balance(),
             'symbol_balance': self.get_symbol_balance(),
             'maker_commission': self.get_maker_commission(),
-            'can_trade': self.client.get_account()['canTrade']
+            'can_trade': self.account.trading_allowed()
         }
 
+    # Balances are read from the account snapshot kept by the user-data stream
     def get_usdt_balance(self):
-        account_info = self.client.get_account()
-        for balance in account_info['balances']:
-            if balance['asset'] == 'USDT':
-                return float(balance['free'])
-        return 0
+        return self.account.balance('USDT')
 
     def get_symbol_balance(self):
-        account_info = self.client.get_account()
         symbol_without_usdt = self.symbol.replace('USDT', '')
-        for balance in account_info['balances']:
-            if balance['asset'] == symbol_without_usdt:
-                return float(balance['free'])
-        return 0
+        return self.account.balance(symbol_without_usdt)
 
     def get_maker_commission(self):
-        account_info = self.client.get_account()
-        return account_info['commissionRates']["maker"]
+        return self.account.maker_commission()
+
+    def candle_buffer(self, symbol=None):
+        """Return the live candle ring buffer of a symbol, creating it on first use"""
+        symbol = symbol or self.symbol
+        if symbol not in self.candle_buffers:
+            self.candle_buffers[symbol] = CandleBuffer(self.buffer_capacity)
+        return self.candle_buffers[symbol]
+
+    def wave_trend(self, symbol=None):
+        """Return the streaming Wave Trend state of a symbol, creating it on first use"""
+        symbol = symbol or self.symbol
+        if symbol not in self.wave_trends:
+            self.wave_trends[symbol] = WaveTrend(self.channel_length, self.average_length)
+        return self.wave_trends[symbol]
+
+    def set_rule(self, rule):
+        """Trade buy:/sell: rules (text or CompiledRule) live, None for Wave Trend"""
+        if isinstance(rule, str):
+            rule = strategy_rules.compile_rules(rule)
+        self.rule = rule
+        self.rule_streams = {}
 
-    def calculate_wave_trend(self, data):
-        # Convert data to use integer index to avoid warnings
-        df = data.copy()
-        df.reset_index(inplace=True, drop=True)
+    def rule_stream(self, symbol=None):
+        """Return the streaming rule state of a symbol, seeded from its live candles on first use"""
+        symbol = symbol or self.symbol
+        if symbol not in self.rule_streams:
+            stream = self.rule.stream()
+            candles = self.candle_buffer(symbol)
+            if len(candles):
+                stream.seed(candles)
+            self.rule_streams[symbol] = stream
+        return self.rule_streams[symbol]
+
+    def rule_signal(self, candle):
+        """Signal of self.rule after a closed websocket candle, already in the buffer"""
+        if self.symbol in self.rule_streams:
+            buy, sell = self.rule_streams[self.symbol].update(
+                float(candle['o']), float(candle['h']), float(candle['l']),
+                float(candle['c']), float(candle['v'])
+            )
+        else:
+            # First use is seeded with the buffer, new candle included
+            stream = self.rule_stream()
+            buy, sell = stream.buy, stream.sell
+        return "buy" if buy else "sell" if sell else "neutral"
+
+    def set_strategy(self, name):
+        """Trade a strategy from strategies/ live, None for Wave Trend
         
-        # Calculate HLC3
-        df["hcl3"] = (df["high"] + df["close"] + df["low"]) / 3
+        The strategy is looked up in the registry on every candle, so a saved
+        change takes effect on the next candle without restarting anything.
+        """
+        if name is not None:
+            strategy_registry().get(name)  # Fail early on unknown or broken strategies
+        self.strategy_name = name
+        self.set_rule(None)
+
+    def strategy_signal(self, candle):
+        """Signal of the live strategy after a closed websocket candle"""
+        strategy = strategy_registry().get(self.strategy_name)
+        if isinstance(strategy, strategy_rules.CompiledRule):
+            if strategy is not self.rule:
+                # New version of the rules, seeded again from the buffer
+                self.set_rule(strategy)
+            return self.rule_signal(candle)
         
-        # Calculate Wave Trend
-        esa = ta.ema(df["hcl3"], self.channel_length)
-        d = ta.ema(abs(df["hcl3"] - esa), self.channel_length)
-        ci = (df["hcl3"] - esa) / (0.015 * d)
-        tci = ta.ema(ci, self.average_length)
+        # Python strategies run in the sandbox so a slow one cannot stall the stream
+        candles = self.candle_buffer()
+        data = pd.DataFrame({f: candles[f] for f in strategy_runner.STRATEGY_COLUMNS},
+                            index=pd.to_datetime(candles['timestamp'], unit='ms'))
+        try:
+            signal = self.strategy_sandbox().latest_signal(self.strategy_name, data, self.live_timeout)
+        except Exception as e:
+            print(f"Strategy {self.strategy_name} error: {e}")
+            return "neutral"
+        return signal.lower()
+
+    def strategy_sandbox(self):
+        """Return the StrategySandbox for Python strategies, starting it on first use"""
+        if self.sandbox is None:
+            self.sandbox = StrategySandbox()
+            self.sandbox.start()
+        return self.sandbox
 
-        wt1 = tci
-        wt2 = ta.sma(wt1, 4)
+    def close_sandbox(self):
+        if self.sandbox is not None:
+            self.sandbox.close()
+            self.sandbox = None
 
-        return wt1, wt2
+    def calculate_wave_trend(self, data, symbol=None, interval=None, channel_length=None, average_length=None):
+        """Calculate Wave Trend, reusing the shared cache when symbol and interval are given
+        
+        channel_length and average_length default to the bot's settings.
+        """
+        channel_length = channel_length or self.channel_length
+        average_length = average_length or self.average_length
+        return indicator_cache.get_or_compute(
+            symbol, interval, 'wave_trend',
+            (channel_length, average_length), data,
+            lambda df: self._wave_trend(df, channel_length, average_length)
+        )
+
+    def _wave_trend(self, data, channel_length=None, average_length=None):
+        # Works on a DataFrame or a CandleBuffer; only the price columns are read
+        high = np.asarray(data["high"], dtype=np.float64)
+        low = np.asarray(data["low"], dtype=np.float64)
+        close = np.asarray(data["close"], dtype=np.float64)
+        
+        wt1, wt2 = indicator_kernels.wave_trend(
+            high, low, close,
+            channel_length or self.channel_length,
+            average_length or self.average_length
+        )
+        return pd.Series(wt1), pd.Series(wt2)
+
+    def calculate_rsi(self, data, length=14, symbol=None, interval=None):
+        """Calculate RSI of the close column through the shared cache"""
+        return indicator_cache.get_or_compute(
+            symbol, interval, 'rsi', (length,), data,
+            lambda df: pd.Series(indicator_kernels.rsi(df['close'].values, length), index=df.index)
+        )
+
+    def calculate_macd(self, data, fast=12, slow=26, signal=9, symbol=None, interval=None):
+        """Calculate MACD line, signal and histogram through the shared cache"""
+        def compute(df):
+            lines = indicator_kernels.macd(df['close'].values, fast, slow, signal)
+            return tuple(pd.Series(values, index=df.index) for values in lines)
+        
+        return indicator_cache.get_or_compute(
+            symbol, interval, 'macd', (fast, slow, signal), data, compute
+        )
 
     def get_signal(self, wt1, wt2):
         """Get trading signal based on Wave Trend crossover
@@ -131,6 +271,8 @@ class TradingBot:
                 type=ORDER_TYPE_MARKET,
                 quantity=quantity
             )
+            # Balances change with the fill; without the stream the next read refreshes
+            self.account.invalidate()
             return order
         except Exception as e:
             print(f'Order Error: {e}')
@@ -148,20 +290,31 @@ class TradingBot:
             is_candle_closed = candle['x']
             
             if is_candle_closed:
-                new_row = {
-                    'open': float(candle['o']),
-                    'high': float(candle['h']),
-                    'low': float(candle['l']),
-                    'close': float(candle['c']),
-                    'hcl3': 0
-                }
-                
-                self.data.loc[len(self.data)] = new_row
-                if len(self.data) > 50:  # Keep only last 50 candles
-                    self.data = self.data.iloc[1:]
+                # Oldest candle is overwritten once the buffer is full
+                candles = self.candle_buffer()
+                candles.append(
+                    candle['t'],
+                    open=float(candle['o']),
+                    high=float(candle['h']),
+                    low=float(candle['l']),
+                    close=float(candle['c']),
+                    volume=float(candle['v'])
+                )
                 
-                wt1, wt2 = self.calculate_wave_trend(self.data)
-                signal = self.get_signal(wt1, wt2)
+                # Only the new candle is fed to the indicator state. Wave Trend
+                # keeps up even while a custom strategy trades, so switching
+                # back needs no warm-up.
+                wave_trend = self.wave_trend()
+                wave_trend.update(float(candle['h']), float(candle['l']), float(candle['c']))
+                if self.strategy_name is not None:
+                    signal = self.strategy_signal(candle)
+                elif self.rule is not None:
+                    signal = self.rule_signal(candle)
+                else:
+                    signal = self.get_signal(
+                        [wave_trend.prev_wt1, wave_trend.wt1],
+                        [wave_trend.prev_wt2, wave_trend.wt2]
+                    )
                 
                 print(f"Current price: {candle['c']}")
                 print(f"Signal: {signal}")
@@ -185,7 +338,8 @@ class TradingBot:
                             self.in_position = False
                             print(f"Sold {quantity} {self.symbol}")
 
-    def backtest(self, start_time=None, end_time=None, strategy_type="Special"):
+    def backtest(self, start_time=None, end_time=None, strategy_type="Special", params=None,
+                 symbol=None, interval=None):
         """
         Run backtest for the specified period
         
@@ -193,128 +347,59 @@ class TradingBot:
             start_time (int): Start timestamp in milliseconds
             end_time (int): End timestamp in milliseconds
             strategy_type (str): Strategy type to use for backtesting
+            params (dict): Indicator lengths and thresholds overriding
+                backtest_engine.DEFAULT_PARAMS
+            symbol (str): Trading pair, defaults to self.symbol
+            interval (str): Kline interval, defaults to self.interval
             
         Returns:
             list: List of trades executed during backtest
         """
+        symbol = symbol or self.symbol
+        interval = interval or self.interval
+        
         try:
-            print(f"Starting backtest for {self.symbol} from {start_time} to {end_time}")
+            print(f"Starting backtest for {symbol} from {start_time} to {end_time}")
+            
+            params = backtest_engine.strategy_params(strategy_type, params)
             
             # Get historical data
-            klines = self.client.get_historical_klines(
-                self.symbol,
-                self.interval,
-                start_str=start_time,
-                end_str=end_time
-            )
+            df = self.load_klines(symbol, interval, start_time, end_time)
             
-            if not klines:
+            if df.empty:
                 print("No data available for the specified period")
                 return []
-                
-            # Convert to DataFrame
-            df = pd.DataFrame(klines, columns=[
-                'timestamp', 'open', 'high', 'low', 'close', 'volume',
-                'close_time', 'quote_volume', 'trades_count',
-                'taker_buy_base', 'taker_buy_quote', 'ignore'
-            ])
-            
-            # Convert values to float
-            df[['open', 'high', 'low', 'close', 'volume']] = df[['open', 'high', 'low', 'close', 'volume']].astype(float)
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            df.set_index('timestamp', inplace=True)
             
             # Calculate indicators based on strategy
             if strategy_type == "Special":
                 # Wave Trend calculation
-                ap = (df['high'] + df['low'] + df['close']) / 3
-                esa = ta.ema(ap, length=10)
-                d = ta.ema(abs(ap - esa), length=10)
-                ci = (ap - esa) / (0.015 * d)
-                wt1 = ta.ema(ci, length=21)
-                wt2 = ta.sma(wt1, length=4)
+                wt1, wt2 = self.calculate_wave_trend(
+                    df, symbol, interval,
+                    params['channel_length'], params['average_length']
+                )
                 
-                df['wt1'] = wt1
-                df['wt2'] = wt2
+                df['wt1'] = wt1.values
+                df['wt2'] = wt2.values
                 
             elif strategy_type == "RSI":
-                df['rsi'] = ta.rsi(df['close'], length=14)
+                df['rsi'] = self.calculate_rsi(df, params['length'], symbol, interval).values
                 
             elif strategy_type == "MACD":
-                macd = ta.macd(df['close'], fast=12, slow=26, signal=9)
-                df['macd'] = macd['MACD_12_26_9']
-                df['signal'] = macd['MACDs_12_26_9']
-                df['histogram'] = macd['MACDh_12_26_9']
-            
-            # Initialize variables
-            position = None
-            entry_price = 0
-            trades = []
-            
-            # Simulate trading
-            for i in range(1, len(df)):
-                current_price = df['close'].iloc[i]
-                timestamp = df.index[i]
-                
-                # Get signals based on strategy
-                if strategy_type == "Special":
-                    wt1 = df['wt1'].iloc[i]
-                    wt2 = df['wt2'].iloc[i]
-                    wt1_prev = df['wt1'].iloc[i-1]
-                    wt2_prev = df['wt2'].iloc[i-1]
-                    
-                    # Buy signal: WT1 and WT2 cross above -60
-                    buy_signal = (wt1_prev <= -60 or wt2_prev <= -60) and (wt1 > -60 and wt2 > -60)
-                    
-                    # Sell signal: WT1 and WT2 cross below 60
-                    sell_signal = (wt1_prev >= 60 or wt2_prev >= 60) and (wt1 < 60 and wt2 < 60)
-                    
-                elif strategy_type == "RSI":
-                    rsi = df['rsi'].iloc[i]
-                    rsi_prev = df['rsi'].iloc[i-1]
-                    
-                    # Buy signal: RSI crosses above 30
-                    buy_signal = rsi_prev <= 30 and rsi > 30
-                    
-                    # Sell signal: RSI crosses below 70
-                    sell_signal = rsi_prev >= 70 and rsi < 70
-                    
-                elif strategy_type == "MACD":
-                    macd = df['macd'].iloc[i]
-                    signal = df['signal'].iloc[i]
-                    macd_prev = df['macd'].iloc[i-1]
-                    signal_prev = df['signal'].iloc[i-1]
-                    
-                    # Buy signal: MACD crosses above Signal
-                    buy_signal = macd_prev <= signal_prev and macd > signal
-                    
-                    # Sell signal: MACD crosses below Signal
-                    sell_signal = macd_prev >= signal_prev and macd < signal
-                    
-                else:
-                    continue
-                
-                # Execute trades
-                if position is None and buy_signal:
-                    position = "LONG"
-                    entry_price = current_price
-                    trades.append({
-                        'timestamp': int(timestamp.timestamp() * 1000),
-                        'type': 'BUY',
-                        'price': current_price,
-                        'profit': 0
-                    })
-                    
-                elif position == "LONG" and sell_signal:
-                    profit = current_price - entry_price
-                    trades.append({
-                        'timestamp': int(timestamp.timestamp() * 1000),
-                        'type': 'SELL',
-                        'price': current_price,
-                        'profit': profit
-                    })
-                    position = None
-                    entry_price = 0
+                macd, signal, histogram = self.calculate_macd(
+                    df, params['fast'], params['slow'], params['signal'], symbol, interval
+                )
+                df['macd'] = macd.values
+                df['signal'] = signal.values
+                df['histogram'] = histogram.values
+            
+            if strategy_type not in backtest_engine.DEFAULT_PARAMS:
+                # Custom strategies decide bar by bar on windows of the candles
+                signals = self.run_strategy(df, strategy_type)
+                buy, sell = strategy_runner.signal_masks(signals)
+                trades = backtest_engine.trades_from_masks(df, buy, sell).to_list()
+            else:
+                # Crossover masks and position changes are resolved on whole arrays
+                trades = backtest_engine.run_backtest(df, strategy_type, params).to_list()
             
             print(f"Backtest completed with {len(trades)} trades")
             return trades
@@ -324,28 +409,209 @@ class TradingBot:
             traceback.print_exc()
             return []
 
+    def sweep(self, start_time, end_time, strategy_type, grid, processes=None,
+              initial_capital=100000, start_method=None, symbol=None, interval=None):
+        """Backtest every combination of a parameter grid on a process pool
+        
+        Args:
+            start_time (int): Start timestamp in milliseconds
+            end_time (int): End timestamp in milliseconds
+            strategy_type (str): 'Special', 'RSI' or 'MACD'
+            grid (dict): Parameter name -> list of values
+            processes (int): Worker processes, defaults to the CPU count
+            symbol (str): Trading pair, defaults to self.symbol
+            interval (str): Kline interval, defaults to self.interval
+            
+        Returns:
+            DataFrame: Ranked results, see parameter_sweep.sweep
+        """
+        symbol = symbol or self.symbol
+        interval = interval or self.interval
+        df = self.load_klines(symbol, interval, start_time, end_time)
+        if df.empty:
+            print("No data available for the specified period")
+            return pd.DataFrame()
+        
+        print(f"Sweeping {strategy_type} parameters for {symbol} on {len(df)} candles")
+        return parameter_sweep.sweep(
+            df, strategy_type, grid, processes,
+            initial_capital=initial_capital, start_method=start_method
+        )
+
+    def walk_forward(self, start_time, end_time, strategy_type, grid, train_bars, test_bars,
+                     processes=None, initial_capital=100000, start_method=None, symbol=None, interval=None):
+        """Walk-forward optimization over the stored history
+        
+        Args:
+            start_time (int): Start timestamp in milliseconds
+            end_time (int): End timestamp in milliseconds
+            strategy_type (str): 'Special', 'RSI' or 'MACD'
+            grid (dict): Parameter name -> list of values
+            train_bars (int): Candles in each in-sample window
+            test_bars (int): Candles in each out-of-sample window
+            symbol (str): Trading pair, defaults to self.symbol
+            interval (str): Kline interval, defaults to self.interval
+            
+        Returns:
+            tuple: (windows, equity), see walk_forward.walk_forward
+        """
+        symbol = symbol or self.symbol
+        interval = interval or self.interval
+        df = self.load_klines(symbol, interval, start_time, end_time)
+        if df.empty:
+            print("No data available for the specified period")
+            return pd.DataFrame(), pd.Series(dtype=float)
+        
+        print(f"Walk-forward {strategy_type} on {len(df)} {interval} candles of {symbol}")
+        return walk_forward.walk_forward(
+            df, strategy_type, grid, train_bars, test_bars, processes,
+            initial_capital=initial_capital, start_method=start_method
+        )
+
+    def usdt_symbols(self, min_volume=0):
+        """USDT pairs whose 24h quote volume is at least min_volume, largest first"""
+        return self.market_hub.usdt_symbols(min_volume)
+
+    def portfolio_backtest(self, symbols, start_time, end_time, strategy_type="Special", params=None,
+                           interval=None, processes=None, initial_capital=100000, start_method=None):
+        """Backtest a strategy on several symbols as one equally weighted portfolio
+        
+        Candles are loaded through the kline store without touching
+        self.symbol, the simulations run in worker processes.
+        
+        Args:
+            symbols (list): Trading pairs, e.g. from usdt_symbols()
+            start_time (int): Start timestamp in milliseconds
+            end_time (int): End timestamp in milliseconds
+            strategy_type (str): 'Special', 'RSI' or 'MACD'
+            params (dict): Overrides of backtest_engine.DEFAULT_PARAMS
+            interval (str): Kline interval, defaults to self.interval
+            
+        Returns:
+            tuple: (stats, equity), see portfolio_backtest.run_portfolio
+        """
+        interval = interval or self.interval
+        
+        def load(symbol):
+            try:
+                return symbol, self.load_klines(symbol, interval, start_time, end_time)
+            except Exception as e:
+                print(f"Error loading {symbol}: {e}")
+                return symbol, pd.DataFrame()
+        
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            frames = dict(executor.map(load, symbols))
+        
+        print(f"Portfolio backtest of {strategy_type} on {len(symbols)} symbols")
+        return portfolio_backtest.run_portfolio(
+            frames, strategy_type, params, processes,
+            initial_capital=initial_capital, start_method=start_method
+        )
+
+    def load_klines(self, symbol, interval, start_time, end_time, datetime_index=True):
+        """Read klines through the local store, downloading only the missing gaps
+        
+        Args:
+            symbol (str): Trading pair, e.g. BTCUSDT
+            interval (str): Kline interval, e.g. 1m
+            start_time (int): Start timestamp in milliseconds
+            end_time (int): End timestamp in milliseconds
+            datetime_index (bool): Index by datetime instead of float milliseconds
+            
+        Returns:
+            DataFrame: OHLCV, quote volume and trade count indexed by open time
+        """
+        start_time = int(start_time)
+        end_time = int(end_time) if end_time is not None else now_ms()
+        
+        # Only fetch the parts of the range that are not stored yet
+        gaps = self.kline_store.missing(symbol, interval, start_time, end_time)
+        if gaps:
+            klines = self.downloader.download_ranges(
+                symbol,
+                interval,
+                gaps,
+                progress=self.download_progress
+            )
+            self.kline_store.write(symbol, interval, klines_to_columns(klines), gaps)
+        
+        columns = self.kline_store.read(symbol, interval, start_time, end_time)
+        return columns_to_frame(columns, datetime_index=datetime_index)
+
+    @staticmethod
+    def period_to_ms(period):
+        """Convert a period such as '1y', '6M', '30d' or '12h' to milliseconds"""
+        units = {
+            'y': 365 * 24 * 60 * 60 * 1000,
+            'M': 30 * 24 * 60 * 60 * 1000,
+            'w': 7 * 24 * 60 * 60 * 1000,
+            'd': 24 * 60 * 60 * 1000,
+            'h': 60 * 60 * 1000,
+            'm': 60 * 1000
+        }
+        if isinstance(period, (int, float)):
+            return int(period)
+        if period[-1] not in units:
+            raise ValueError(f"Unsupported period: {period}")
+        return int(period[:-1]) * units[period[-1]]
+
     def get_recent_data(self, symbol=None, interval=None, limit=50):
         """Get recent market data for a symbol"""
         symbol = symbol or self.symbol
         interval = interval or self.interval
         
         try:
-            klines = self.client.get_klines(
-                symbol=symbol,
-                interval=interval,
-                limit=limit
-            )
-            
-            df = pd.DataFrame(klines, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume', 'close_time', 'quote_av', 'trades', 'tb_base_av', 'tb_quote_av', 'ignore'])
-            df = df[['timestamp', 'open', 'high', 'low', 'close']]
-            df = df.astype(float)
-            df.set_index('timestamp', inplace=True)
+            end_time = now_ms()
+            start_time = end_time - (end_time % interval_to_ms(interval)) - (limit - 1) * interval_to_ms(interval)
+            df = self.load_klines(symbol, interval, start_time, end_time, datetime_index=False)
+            df = df[['open', 'high', 'low', 'close', 'volume']].tail(limit)
             return df
             
         except Exception as e:
             print(f"Error getting recent data: {e}")
             return pd.DataFrame()
 
+    def get_recent_data_many(self, symbols, interval=None, limit=50):
+        """Recent market data of many symbols, see get_recent_data
+        
+        The candles missing from the kline store are requested for all
+        symbols at once through the asyncio exchange client, so the time
+        taken is a few round trips rather than one per symbol.
+        
+        Returns:
+            dict: Symbol -> DataFrame, symbols that failed are left out
+        """
+        interval = interval or self.interval
+        step = interval_to_ms(interval)
+        end_time = now_ms()
+        start_time = end_time - (end_time % step) - (limit - 1) * step
+        
+        gaps = {symbol: self.kline_store.missing(symbol, interval, start_time, end_time) for symbol in symbols}
+        fetch = [symbol for symbol in symbols if gaps[symbol]]
+        # At most `limit` candles are missing, one page per symbol covers them
+        pages = self.exchange.get_klines_many([
+            {'symbol': symbol, 'interval': interval, 'startTime': gaps[symbol][0][0],
+             'endTime': gaps[symbol][-1][1], 'limit': PAGE_LIMIT}
+            for symbol in fetch
+        ])
+        
+        failed = set()
+        for symbol, klines in zip(fetch, pages):
+            if isinstance(klines, Exception):
+                print(f"Error getting recent data for {symbol}: {klines}")
+                failed.add(symbol)
+                continue
+            self.kline_store.write(symbol, interval, klines_to_columns(klines), gaps[symbol])
+        
+        frames = {}
+        for symbol in symbols:
+            if symbol in failed:
+                continue
+            columns = self.kline_store.read(symbol, interval, start_time, end_time)
+            df = columns_to_frame(columns, datetime_index=False)
+            frames[symbol] = df[['open', 'high', 'low', 'close', 'volume']].tail(limit)
+        return frames
+
     def start_websocket(self):
         ws = websocket.WebSocketApp(
             f"wss://stream.binance.com:9443/ws/{self.symbol.lower()}@kline_{self.interval}",
@@ -359,82 +625,111 @@ class TradingBot:
         historicaldata = self.client.get_klines(
             symbol=self.symbol,
             interval=self.interval,
-            limit=50
+            limit=self.buffer_capacity
         )
         
+        candles = self.candle_buffer()
+        candles.clear()
         for candle in historicaldata:
-            self.data.loc[len(self.data)] = {
-                'open': float(candle[1]),
-                'high': float(candle[2]),
-                'low': float(candle[3]),
-                'close': float(candle[4]),
-                'hcl3': 0
-            }
+            candles.append(
+                candle[0],
+                open=float(candle[1]),
+                high=float(candle[2]),
+                low=float(candle[3]),
+                close=float(candle[4]),
+                volume=float(candle[5])
+            )
+        
+        # Warm up the indicator state, the newest candle is still open
+        wave_trend = WaveTrend(self.channel_length, self.average_length)
+        wave_trend.seed(candles['high'][:-1], candles['low'][:-1], candles['close'][:-1])
+        if len(candles):
+            wave_trend.update(candles['high'][-1], candles['low'][-1], candles['close'][-1], provisional=True)
+        self.wave_trends[self.symbol] = wave_trend
         
         print(f"Starting WebSocket for {self.symbol}")
         ws.run_forever()
 
     def backtest_without_api(self, symbol, period="1y", initial_capital=100000):
-        """Backtest without using API - for offline testing"""
+        """Backtest without using API - for offline testing
+        
+        Trades on wt1/wt2 crossovers (see get_signal), evaluated for all bars
+        in a single pass.
+        
+        Returns:
+            tuple: (trades, df, equity) where equity holds the commission
+                adjusted total assets at every close
+        """
         try:
             # Get historical data
-            data = self.client.get_historical_klines(
-                symbol,
-                self.interval,
-                period
-            )
+            end_time = now_ms()
+            start_time = end_time - self.period_to_ms(period)
+            df = self.load_klines(symbol, self.interval, start_time, end_time, datetime_index=False)
             
-            if not data:
+            if df.empty:
                 raise ValueError(f"No data available for {symbol}")
             
-            df = pd.DataFrame(data, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume', 'close_time', 'quote_av', 'trades', 'tb_base_av', 'tb_quote_av', 'ignore'])
-            df = df[['timestamp', 'open', 'high', 'low', 'close']]
-            df = df.astype(float)
-            df.set_index('timestamp', inplace=True)
+            df = df[['open', 'high', 'low', 'close']]
             
-            wt1, wt2 = self.calculate_wave_trend(df)
+            wt1, wt2 = self.calculate_wave_trend(df, symbol, self.interval)
             
-            position = 0
-            position_price = 0
-            total_assets = initial_capital
             commission_fee = 0.001  # Default commission fee
+            close = df['close'].values
             
-            trades = []
-            
-            for i in range(1, len(df)):
-                signal = self.get_signal(wt1[:i+1], wt2[:i+1])
-                current_time = df.index[i]
-                current_price = df['close'].iloc[i]
-                
-                if signal == "buy" and position == 0:
-                    position = 1
-                    position_price = current_price
-                    total_assets *= (1 - commission_fee)
-                    trades.append({
-                        'type': 'buy',
-                        'price': position_price,
-                        'timestamp': current_time,
-                        'total_assets': total_assets
-                    })
-                    
-                elif signal == "sell" and position == 1:
-                    total_assets *= (1 + (current_price / position_price - 1) * (1 - commission_fee))
-                    position = 0
-                    trades.append({
-                        'type': 'sell',
-                        'price': current_price,
-                        'timestamp': current_time,
-                        'total_assets': total_assets
-                    })
+            buy, sell = backtest_engine.crossover_masks(wt1, wt2)
+            entries, exits = backtest_engine.resolve_positions(buy, sell)
+            assets, equity = backtest_engine.compound_trades(
+                close, entries, exits, initial_capital, commission_fee
+            )
             
-            if position == 1:
-                total_assets *= (1 + (df['close'].iloc[-1] / position_price - 1) * (1 - commission_fee))
+            trades = []
+            for k, i in enumerate(backtest_engine.trade_bars(entries, exits).tolist()):
+                trades.append({
+                    'type': 'buy' if k % 2 == 0 else 'sell',
+                    'price': close[i],
+                    'timestamp': df.index[i],
+                    'total_assets': assets[k]
+                })
             
-            return trades, df
+            return trades, df, equity
             
         except Exception as e:
             print(f"Backtest error: {e}")
-            return [], pd.DataFrame()
+            return [], pd.DataFrame(), np.array([])
+
+    def run_strategy(self, data, strategy):
+        """Signal of a custom strategy from strategies/ for every candle
+        
+        Uses the strategy's signals(data) when it has one, otherwise calls
+        custom_strategy(data) bar by bar.
+        
+        Args:
+            data (DataFrame): Candles with open, high, low, close and volume
+            strategy (str): Strategy name, the file name without .py
+            
+        Returns:
+            ndarray: 'BUY', 'SELL' or 'NEUTRAL' per candle
+        """
+        module = strategy_runner.load_strategy(strategy)
+        if isinstance(module, strategy_rules.CompiledRule):
+            # Rules are compiled, not executed, so they run in this process
+            signals, seconds = strategy_runner.run_strategy(data, module)
+            mode = 'rules'
+        else:
+            signals, seconds = self.strategy_sandbox().signals(strategy, data, self.backtest_timeout)
+            if callable(getattr(module, 'signals', None)):
+                mode = 'vectorized, sandboxed'
+            else:
+                mode = f"per bar, lookback {getattr(module, 'max_lookback', None) or 'unbounded'}, sandboxed"
+        self.strategy_timings[strategy] = {
+            'bars': len(data),
+            'seconds': seconds,
+            'mode': mode
+        }
+        per_bar = seconds / len(data) * 1e6 if len(data) else 0.0
+        print(f"Strategy {strategy}: {len(data)} bars in {seconds:.3f} s "
+              f"({per_bar:.1f} us/bar, {mode})")
+        return signals
 
     def run_backtest(self, start_date, end_date, strategy):
         """Run backtest with selected parameters"""
@@ -536,45 +831,17 @@ class TradingBot:
             if symbol is None:
                 symbol = self.symbol
                 
-            # Convert timestamps to string format if they are integers
-            if isinstance(start_time, int):
-                start_time = str(start_time)
-            if isinstance(end_time, int):
-                end_time = str(end_time)
-                
-            # Get klines data
-            klines = self.client.get_klines(
-                symbol=symbol,
-                interval=interval,
-                startTime=start_time,
-                endTime=end_time,
-                limit=1000
-            )
+            end_time = int(end_time) if end_time is not None else now_ms()
+            if start_time is None:
+                start_time = end_time - 1000 * interval_to_ms(interval)
             
-            if not klines:
+            df = self.load_klines(symbol, interval, int(start_time), end_time)
+            
+            if df.empty:
                 print(f"No historical data available for {symbol}")
                 return None
-                
-            # Convert to DataFrame
-            df = pd.DataFrame(klines, columns=[
-                'timestamp', 'open', 'high', 'low', 'close', 'volume',
-                'close_time', 'quote_volume', 'trades', 'taker_buy_base',
-                'taker_buy_quote', 'ignore'
-            ])
-            
-            # Convert types
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            for col in ['open', 'high', 'low', 'close', 'volume']:
-                df[col] = df[col].astype(float)
-                
-            # Set timestamp as index and sort
-            df.set_index('timestamp', inplace=True)
-            df.sort_index(inplace=True)
             
-            # Make sure index is timezone-naive
-            df.index = df.index.tz_localize(None)
-            
-            return df
+            return df[['open', 'high', 'low', 'close', 'volume', 'quote_volume', 'trades_count']]
             
         except Exception as e:
             print(f"Error getting historical data: {e}")
@@ -1,20 +1,34 @@
 import sys
-from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
-                           QHBoxLayout, QPushButton, QLabel, QComboBox, 
-                           QTableWidget, QTableWidgetItem, QTabWidget, 
-                           QLineEdit, QGridLayout, QProgressBar, QMessageBox,
-                           QSplitter, QCompleter, QFrame, QTextEdit, QDateTimeEdit)
-from PyQt5.QtCore import Qt, QTimer, pyqtSignal, QThread, QStringListModel, QDateTime
-from PyQt5.QtGui import QPalette, QColor, QFont
-import pandas as pd
-from trading_bot import TradingBot
+from lazy_imports import startup_timer
+
+with startup_timer.phase('PyQt5', kind='import'):
+    from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
+                               QHBoxLayout, QPushButton, QLabel, QComboBox, 
+                               QTableWidget, QTableWidgetItem, QTabWidget, 
+                               QLineEdit, QGridLayout, QProgressBar, QMessageBox,
+                               QSplitter, QCompleter, QFrame, QTextEdit, QDateTimeEdit)
+    from PyQt5.QtCore import Qt, QTimer, pyqtSignal, QThread, QStringListModel, QDateTime
+    from PyQt5.QtGui import QPalette, QColor, QFont
+with startup_timer.phase('pandas, numpy', kind='import'):
+    import pandas as pd
+    import numpy as np
+with startup_timer.phase('trading_bot', kind='import'):
+    from trading_bot import TradingBot
 from datetime import datetime
 import threading
-from chart_widget import TradingChart
-import pandas_ta as ta
+import time
+with startup_timer.phase('chart_widget', kind='import'):
+    from chart_widget import TradingChart
 import traceback
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import os
+with startup_timer.phase('indicators', kind='import'):
+    from indicators import WaveTrendSeries, StreamingRSI, StreamingSMA, StreamingMACD
+    import indicator_engine
+    import parameter_sweep
+    import strategy_rules
+    from strategy_registry import strategy_registry
+    from request_scheduler import SCANNER
 
 class CoinInfoWidget(QFrame):
     def __init__(self, parent=None):
@@ -203,40 +217,57 @@ class MarketOverviewWidget(QFrame):
 class ScannerThread(QThread):
     signal_update = pyqtSignal(list)
     
-    def __init__(self, min_volume):
+    def __init__(self, bot, min_volume, rule=None):
         super().__init__()
-        self.bot = TradingBot()  # Create a single bot instance
+        self.bot = bot  # Tickers and candles come from the bot's shared market hub
         self.min_volume = min_volume
+        self.rule = rule  # Optional strategy_rules.CompiledRule replacing the Wave Trend signal
         self.is_running = True
         
     def run(self):
         while self.is_running:
             try:
                 # Get all USDT pairs
-                tickers = self.bot.client.get_ticker()
+                hub = self.bot.market_hub
+                tickers = hub.tickers()
                 signals = []
                 
-                for ticker in tickers:
-                    if ticker['symbol'].endswith('USDT'):
-                        volume_usdt = float(ticker['volume']) * float(ticker['lastPrice'])
-                        
-                        if volume_usdt >= self.min_volume:
-                            try:
-                                # Get recent data and calculate signal
-                                data = self.bot.get_recent_data(symbol=ticker['symbol'], limit=50)
-                                wt1, wt2 = self.bot.calculate_wave_trend(data)
-                                signal = self.bot.get_signal(wt1, wt2)
-                                
-                                if signal != "neutral":  # Only add if there's a signal
-                                    signals.append({
-                                        'symbol': ticker['symbol'],
-                                        'signal': signal,
-                                        'price': float(ticker['lastPrice']),
-                                        'volume': volume_usdt,
-                                        'timestamp': datetime.now()
-                                    })
-                            except:
-                                continue
+                # Collect recent candles of every eligible pair, behind
+                # orders and live data in the REST queue
+                candidates = []
+                frames = []
+                with self.bot.client.priority(SCANNER):
+                    data = hub.candles_many(hub.usdt_symbols(self.min_volume), self.bot.interval, 50)
+                for symbol, df in data.items():
+                    if df is None or df.empty:
+                        continue
+                    candidates.append((symbol, tickers[symbol]))
+                    frames.append(df)
+                
+                # Calculate signals for all pairs in one vectorized pass
+                if frames:
+                    symbols = [symbol for symbol, _ in candidates]
+                    if self.rule is not None:
+                        results = self.rule.scan(symbols, frames)
+                        results['signal'] = np.where(results['buy'], 'buy', np.where(results['sell'], 'sell', 'neutral'))
+                    else:
+                        results = indicator_engine.scan(
+                            symbols,
+                            indicator_engine.stack_columns(frames, 'high'),
+                            indicator_engine.stack_columns(frames, 'low'),
+                            indicator_engine.stack_columns(frames, 'close'),
+                            self.bot.channel_length,
+                            self.bot.average_length
+                        )
+                    for (symbol, ticker), signal in zip(candidates, results['signal']):
+                        if signal != "neutral":  # Only add if there's a signal
+                            signals.append({
+                                'symbol': symbol,
+                                'signal': signal,
+                                'price': ticker['price'],
+                                'volume': ticker['volume'],
+                                'timestamp': datetime.now()
+                            })
                 
                 # Sort by volume
                 signals.sort(key=lambda x: x['volume'], reverse=True)
@@ -265,8 +296,19 @@ class TradingThread(QThread):
         self.symbol = symbol
         self.interval = interval
         self.is_running = True
+        # Incremental Wave Trend over the polled window
+        self.wave_trend = WaveTrendSeries(100, bot.channel_length, bot.average_length)
         
     def run(self):
+        # Candles of the traded pair stream into the hub's buffer
+        hub = self.bot.market_hub
+        hub.subscribe(self.symbol, self.interval)
+        try:
+            self.poll()
+        finally:
+            hub.unsubscribe(self.symbol, self.interval)
+            
+    def poll(self):
         while self.is_running:
             try:
                 # Get account info
@@ -279,9 +321,9 @@ class TradingThread(QThread):
                 self.signal_update.emit(info)
                 
                 # Get latest market data
-                data = self.bot.get_recent_data(symbol=self.symbol, interval=self.interval, limit=100)
-                wt1, wt2 = self.bot.calculate_wave_trend(data)
-                self.signal_chart_update.emit(data, wt1, wt2)
+                data = self.bot.market_hub.candles(self.symbol, self.interval, 100)
+                wt1, wt2 = self.wave_trend.sync(data.index, data['high'], data['low'], data['close'])
+                self.signal_chart_update.emit(data, pd.Series(np.array(wt1)), pd.Series(np.array(wt2)))
                 
             except Exception as e:
                 print(f"Trading thread error: {e}")
@@ -305,7 +347,66 @@ class TradingThread(QThread):
     def stop(self):
         self.is_running = False
 
+class SweepThread(QThread):
+    signal_finished = pyqtSignal(object)  # ranked results DataFrame
+    signal_error = pyqtSignal(str)
+    
+    def __init__(self, bot, symbol, interval, start_time, end_time, strategy_type, grid, initial_capital):
+        super().__init__()
+        self.bot = bot
+        self.symbol = symbol
+        self.interval = interval
+        self.start_time = start_time
+        self.end_time = end_time
+        self.strategy_type = strategy_type
+        self.grid = grid
+        self.initial_capital = initial_capital
+        
+    def run(self):
+        try:
+            # Forking a threaded Qt process is unsafe, workers are spawned instead
+            results = self.bot.sweep(
+                self.start_time, self.end_time, self.strategy_type, self.grid,
+                initial_capital=self.initial_capital, start_method='spawn',
+                symbol=self.symbol, interval=self.interval
+            )
+            self.signal_finished.emit(results)
+        except Exception as e:
+            traceback.print_exc()
+            self.signal_error.emit(str(e))
+
+class PortfolioThread(QThread):
+    signal_finished = pyqtSignal(object, object)  # per-symbol stats, combined equity
+    signal_error = pyqtSignal(str)
+    
+    def __init__(self, bot, min_volume, interval, start_time, end_time, strategy_type, params, initial_capital):
+        super().__init__()
+        self.bot = bot
+        self.min_volume = min_volume
+        self.interval = interval
+        self.start_time = start_time
+        self.end_time = end_time
+        self.strategy_type = strategy_type
+        self.params = params
+        self.initial_capital = initial_capital
+        
+    def run(self):
+        try:
+            symbols = self.bot.usdt_symbols(self.min_volume)
+            if not symbols:
+                raise ValueError(f"No USDT pairs above {self.min_volume:,.0f} USDT volume")
+            stats, equity = self.bot.portfolio_backtest(
+                symbols, self.start_time, self.end_time, self.strategy_type, self.params,
+                interval=self.interval, initial_capital=self.initial_capital, start_method='spawn'
+            )
+            self.signal_finished.emit(stats, equity)
+        except Exception as e:
+            traceback.print_exc()
+            self.signal_error.emit(str(e))
+
 class TradingGUI(QMainWindow):
+    strategies_changed = pyqtSignal(list, list)  # changed and removed strategy names, from the watcher
+    
     def __init__(self):
         super().__init__()
         self.setWindowTitle("HolyStar Trading Bot")
@@ -403,7 +504,8 @@ class TradingGUI(QMainWindow):
         try:
             print("Initializing Trading Bot...")
             # Create single TradingBot instance
-            self.trading_bot = TradingBot()
+            with startup_timer.phase('TradingGUI: trading bot'):
+                self.trading_bot = TradingBot()
             self.current_symbol = ""  # Track current symbol
             self.current_interval = "1m"  # Track current interval
             
@@ -423,10 +525,14 @@ class TradingGUI(QMainWindow):
             strategy_tab = QWidget()  
             
             # Setup all tabs
-            self.setup_trading_tab(trading_tab)
-            self.setup_market_tab(market_tab)
-            self.setup_backtest_tab(backtest_tab)
-            self.setup_strategy_tab(strategy_tab) 
+            with startup_timer.phase('TradingGUI: trading tab'):
+                self.setup_trading_tab(trading_tab)
+            with startup_timer.phase('TradingGUI: market tab'):
+                self.setup_market_tab(market_tab)
+            with startup_timer.phase('TradingGUI: backtest tab'):
+                self.setup_backtest_tab(backtest_tab)
+            with startup_timer.phase('TradingGUI: strategy tab'):
+                self.setup_strategy_tab(strategy_tab) 
             
             # Add tabs
             tabs.addTab(trading_tab, "Trading")
@@ -439,17 +545,21 @@ class TradingGUI(QMainWindow):
             self.market_thread = None
             
             # Load custom strategies
-            self.load_custom_strategies()
+            with startup_timer.phase('TradingGUI: custom strategies'):
+                self.load_custom_strategies()
             
             # Set dark theme
-            self.set_dark_theme()
+            with startup_timer.phase('TradingGUI: dark theme'):
+                self.set_dark_theme()
             
             # Initialize coin list and completer
-            self.initialize_coin_list()
+            with startup_timer.phase('TradingGUI: coin list'):
+                self.initialize_coin_list()
             
             print("Starting market updates...")
             # Start market updates
-            self.start_market_updates()
+            with startup_timer.phase('TradingGUI: market updates'):
+                self.start_market_updates()
             
             print("GUI initialization completed")
             
@@ -458,6 +568,18 @@ class TradingGUI(QMainWindow):
             traceback.print_exc()
             QMessageBox.critical(self, "Error", f"Failed to initialize application: {str(e)}")
             
+    def finish_startup(self):
+        """Create the deferred charts and print the startup timing report"""
+        try:
+            with startup_timer.phase('TradingGUI: charts'):
+                self.chart_widget.ensure_canvas()
+                self.backtest_chart.ensure_canvas()
+            startup_timer.mark('charts ready')
+        except Exception as e:
+            print(f"Error creating charts: {e}")
+            traceback.print_exc()
+        print(startup_timer.report())
+        
     def start_market_updates(self):
         """Start market data updates in a separate thread"""
         try:
@@ -472,6 +594,7 @@ class TradingGUI(QMainWindow):
             # Connect signals before starting the thread
             print("Connecting market update signals...")
             self.market_thread.signal_update.connect(self.update_market_table)
+            self.market_thread.signal_changes.connect(self.update_market_rows)
             self.market_thread.signal_stats.connect(self.update_market_stats)
             
             print("Starting market thread...")
@@ -495,54 +618,9 @@ class TradingGUI(QMainWindow):
         try:
             print(f"Updating market table with {len(market_data)} coins")
             self.market_table.setRowCount(len(market_data))
+            self.market_rows = {}
             for i, data in enumerate(market_data):
-                # Symbol
-                self.market_table.setItem(i, 0, QTableWidgetItem(f"🔸 {data['symbol']}"))
-                
-                # Price
-                self.market_table.setItem(i, 1, QTableWidgetItem(f"{data['price']:.8f}"))
-                
-                # Change
-                change_item = QTableWidgetItem(f"{data['change']:+.2f}%")
-                change_item.setForeground(QColor("green" if data['change'] >= 0 else "red"))
-                self.market_table.setItem(i, 2, change_item)
-                
-                # High & Low
-                self.market_table.setItem(i, 3, QTableWidgetItem(f"{data['high']:.8f}"))
-                self.market_table.setItem(i, 4, QTableWidgetItem(f"{data['low']:.8f}"))
-                
-                # Volume
-                self.market_table.setItem(i, 5, QTableWidgetItem(f"{data['volume']:,.2f}"))
-                
-                # Market Cap
-                market_cap = data['price'] * data['volume']
-                self.market_table.setItem(i, 6, QTableWidgetItem(f"{market_cap:,.2f}"))
-                
-                # Signal
-                signal_item = QTableWidgetItem(f"🟢 {data['signal'].upper()}")
-                if data['signal'] == "BUY":
-                    signal_item.setForeground(QColor("green"))
-                elif data['signal'] == "SELL":
-                    signal_item.setForeground(QColor("red"))
-                self.market_table.setItem(i, 7, signal_item)
-                
-                # RSI
-                if 'rsi' in data:
-                    rsi_item = QTableWidgetItem(f"{data['rsi']:.1f}")
-                    if data['rsi'] >= 70:
-                        rsi_item.setForeground(QColor("red"))
-                    elif data['rsi'] <= 30:
-                        rsi_item.setForeground(QColor("green"))
-                    self.market_table.setItem(i, 8, rsi_item)
-                
-                # Trend
-                if 'trend' in data:
-                    trend_item = QTableWidgetItem(data['trend'])
-                    if data['trend'] == "BULLISH":
-                        trend_item.setForeground(QColor("green"))
-                    elif data['trend'] == "BEARISH":
-                        trend_item.setForeground(QColor("red"))
-                    self.market_table.setItem(i, 9, trend_item)
+                self.set_market_row(i, data)
             
             print("Market table updated successfully")
             
@@ -555,6 +633,79 @@ class TradingGUI(QMainWindow):
         except Exception as e:
             print(f"Market table update error: {e}")
             
+    def update_market_rows(self, market_data):
+        """Update the rows of the pairs that changed, appending new pairs"""
+        try:
+            rows = getattr(self, 'market_rows', {})
+            for data in market_data:
+                i = rows.get(data['symbol'])
+                if i is None:
+                    i = self.market_table.rowCount()
+                    self.market_table.setRowCount(i + 1)
+                self.set_market_row(i, data)
+            
+            if (self.volume_filter.text() or 
+                self.change_filter.text() or 
+                self.cap_filter.text()):
+                self.apply_market_filters()
+                
+        except Exception as e:
+            print(f"Market rows update error: {e}")
+            
+    def set_market_row(self, i, data):
+        """Fill one market table row"""
+        if not hasattr(self, 'market_rows'):
+            self.market_rows = {}
+        self.market_rows[data['symbol']] = i
+        
+        # Symbol
+        self.market_table.setItem(i, 0, QTableWidgetItem(f"🔸 {data['symbol']}"))
+        
+        # Price
+        self.market_table.setItem(i, 1, QTableWidgetItem(f"{data['price']:.8f}"))
+        
+        # Change
+        change_item = QTableWidgetItem(f"{data['change']:+.2f}%")
+        change_item.setForeground(QColor("green" if data['change'] >= 0 else "red"))
+        self.market_table.setItem(i, 2, change_item)
+        
+        # High & Low
+        self.market_table.setItem(i, 3, QTableWidgetItem(f"{data['high']:.8f}"))
+        self.market_table.setItem(i, 4, QTableWidgetItem(f"{data['low']:.8f}"))
+        
+        # Volume
+        self.market_table.setItem(i, 5, QTableWidgetItem(f"{data['volume']:,.2f}"))
+        
+        # Market Cap
+        market_cap = data['price'] * data['volume']
+        self.market_table.setItem(i, 6, QTableWidgetItem(f"{market_cap:,.2f}"))
+        
+        # Signal
+        signal_item = QTableWidgetItem(f"🟢 {data['signal'].upper()}")
+        if data['signal'] == "BUY":
+            signal_item.setForeground(QColor("green"))
+        elif data['signal'] == "SELL":
+            signal_item.setForeground(QColor("red"))
+        self.market_table.setItem(i, 7, signal_item)
+        
+        # RSI
+        if 'rsi' in data:
+            rsi_item = QTableWidgetItem(f"{data['rsi']:.1f}")
+            if data['rsi'] >= 70:
+                rsi_item.setForeground(QColor("red"))
+            elif data['rsi'] <= 30:
+                rsi_item.setForeground(QColor("green"))
+            self.market_table.setItem(i, 8, rsi_item)
+        
+        # Trend
+        if 'trend' in data:
+            trend_item = QTableWidgetItem(data['trend'])
+            if data['trend'] == "BULLISH":
+                trend_item.setForeground(QColor("green"))
+            elif data['trend'] == "BEARISH":
+                trend_item.setForeground(QColor("red"))
+            self.market_table.setItem(i, 9, trend_item)
+            
     def update_market_stats(self, stats):
         """Update market statistics"""
         try:
@@ -997,6 +1148,13 @@ class TradingGUI(QMainWindow):
         # Hide custom strategy editor by default
         self.custom_strategy_frame.hide()
         
+        # Saved strategies trade live from their latest version, built-in
+        # ones through the Wave Trend signal
+        try:
+            self.trading_bot.set_strategy(strategy if strategy in getattr(self, 'custom_strategies', {}) else None)
+        except Exception as e:
+            QMessageBox.warning(self, "Error", str(e))
+        
         if strategy == "RSI":
             self.show_rsi_params()
         elif strategy == "MACD":
@@ -1053,8 +1211,8 @@ class TradingGUI(QMainWindow):
         
         # Initial chart update
         try:
-            data = self.trading_bot.get_recent_data(symbol=symbol, interval=interval, limit=100)
-            wt1, wt2 = self.trading_bot.calculate_wave_trend(data)
+            data = self.trading_bot.market_hub.candles(symbol, interval, 100)
+            wt1, wt2 = self.trading_bot.calculate_wave_trend(data, symbol, interval)
             self.chart_widget.update_chart(data, wt1, wt2)
         except Exception as e:
             print(f"Initial chart update error: {e}")
@@ -1286,6 +1444,47 @@ class TradingGUI(QMainWindow):
         
         left_layout.addWidget(capital_frame)
         
+        # Parameter sweep
+        sweep_frame = QFrame()
+        sweep_layout = QGridLayout(sweep_frame)
+        
+        sweep_label = QLabel("Parameter Grid:")
+        sweep_label.setStyleSheet("font-weight: bold;")
+        self.sweep_grid_input = QLineEdit()
+        self.sweep_grid_input.setPlaceholderText("channel_length=8:12:2; oversold=-70,-60")
+        self.sweep_grid_input.setToolTip(
+            "Special: channel_length, average_length, oversold, overbought\n"
+            "RSI: length, oversold, overbought\n"
+            "MACD: fast, slow, signal\n"
+            "Values: comma separated or start:stop:step"
+        )
+        self.run_sweep_button = QPushButton("Run Sweep")
+        self.run_sweep_button.clicked.connect(self.run_sweep)
+        
+        sweep_layout.addWidget(sweep_label, 0, 0)
+        sweep_layout.addWidget(self.sweep_grid_input, 0, 1)
+        sweep_layout.addWidget(self.run_sweep_button, 1, 1)
+        
+        left_layout.addWidget(sweep_frame)
+        self.sweep_thread = None
+        
+        # Portfolio backtest over all USDT pairs above a volume threshold
+        portfolio_frame = QFrame()
+        portfolio_layout = QGridLayout(portfolio_frame)
+        
+        portfolio_label = QLabel("Min Volume (USDT):")
+        portfolio_label.setStyleSheet("font-weight: bold;")
+        self.portfolio_volume_input = QLineEdit("10000000")
+        self.run_portfolio_button = QPushButton("Run Portfolio")
+        self.run_portfolio_button.clicked.connect(self.run_portfolio_backtest)
+        
+        portfolio_layout.addWidget(portfolio_label, 0, 0)
+        portfolio_layout.addWidget(self.portfolio_volume_input, 0, 1)
+        portfolio_layout.addWidget(self.run_portfolio_button, 1, 1)
+        
+        left_layout.addWidget(portfolio_frame)
+        self.portfolio_thread = None
+        
         # Run backtest button
         self.run_backtest_button = QPushButton("Run Backtest")
         self.run_backtest_button.setStyleSheet("""
@@ -1332,6 +1531,12 @@ class TradingGUI(QMainWindow):
         self.backtest_results.setWordWrap(True)
         right_layout.addWidget(self.backtest_results)
         
+        # Sweep results, ranked best first
+        self.results_table = QTableWidget()
+        self.results_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.results_table.hide()
+        right_layout.addWidget(self.results_table)
+        
         # Ana layout'a panelleri ekle
         splitter = QSplitter(Qt.Horizontal)
         splitter.addWidget(left_panel)
@@ -1409,14 +1614,21 @@ class TradingGUI(QMainWindow):
             interval = self.backtest_interval_combo.currentText()
             strategy = self.backtest_strategy_combo.currentText()
             
+            params = self.backtest_params(strategy)
+            
             # Run backtest
-            self.trading_bot.symbol = symbol
-            self.trading_bot.interval = interval
-            trades = self.trading_bot.backtest(
-                start_time=start_timestamp,
-                end_time=end_timestamp,
-                strategy_type=strategy
-            )
+            self.trading_bot.download_progress = self.on_download_progress
+            try:
+                trades = self.trading_bot.backtest(
+                    start_time=start_timestamp,
+                    end_time=end_timestamp,
+                    strategy_type=strategy,
+                    params=params,
+                    symbol=symbol,
+                    interval=interval
+                )
+            finally:
+                self.trading_bot.download_progress = None
             
             if trades:
                 # Calculate statistics
@@ -1426,11 +1638,15 @@ class TradingGUI(QMainWindow):
                 win_rate = (winning_trades / total_trades * 100) if total_trades > 0 else 0
                 
                 # Update results
-                self.backtest_results.setText(f"Backtest Results ({interval}):\n"
-                                               f"Total Trades: {total_trades}\n"
-                                               f"Winning Trades: {winning_trades}\n"
-                                               f"Win Rate: {win_rate:.2f}%\n"
-                                               f"Total Profit: {total_profit:.2f} USDT")
+                results = (f"Backtest Results ({interval}):\n"
+                           f"Total Trades: {total_trades}\n"
+                           f"Winning Trades: {winning_trades}\n"
+                           f"Win Rate: {win_rate:.2f}%\n"
+                           f"Total Profit: {total_profit:.2f} USDT")
+                timing = self.trading_bot.strategy_timings.get(strategy)
+                if timing is not None:
+                    results += f"\nStrategy Time: {timing['seconds']:.2f} s for {timing['bars']} bars ({timing['mode']})"
+                self.backtest_results.setText(results)
                 
                 # Get historical data for chart
                 data = self.trading_bot.get_historical_data(
@@ -1443,20 +1659,22 @@ class TradingGUI(QMainWindow):
                 if data is not None:
                     # Calculate indicators based on strategy
                     indicators = {}
+                    # Same candles as the backtest, so these come from the indicator cache
                     if strategy == "Special":
-                        ap = (data['high'] + data['low'] + data['close']) / 3
-                        esa = ta.ema(close=ap, length=10)
-                        d = ta.ema(close=abs(ap - esa), length=10)
-                        ci = (ap - esa) / (0.015 * d)
-                        indicators['wt1'] = ta.ema(close=ci, length=21)
-                        indicators['wt2'] = ta.sma(close=indicators['wt1'], length=4)
+                        wt1, wt2 = self.trading_bot.calculate_wave_trend(data, symbol, interval)
+                        indicators['wt1'] = wt1.values
+                        indicators['wt2'] = wt2.values
                     elif strategy == "RSI":
-                        indicators['rsi'] = ta.rsi(close=data['close'], length=14)
+                        indicators['rsi'] = self.trading_bot.calculate_rsi(
+                            data, params['length'], symbol, interval
+                        ).values
                     elif strategy == "MACD":
-                        macd = ta.macd(close=data['close'], fast=12, slow=26, signal=9)
-                        indicators['macd'] = macd['MACD_12_26_9']
-                        indicators['signal'] = macd['MACDs_12_26_9']
-                        indicators['histogram'] = macd['MACDh_12_26_9']
+                        macd, signal, histogram = self.trading_bot.calculate_macd(
+                            data, params['fast'], params['slow'], params['signal'], symbol, interval
+                        )
+                        indicators['macd'] = macd.values
+                        indicators['signal'] = signal.values
+                        indicators['histogram'] = histogram.values
                     
                     # Update chart
                     self.backtest_chart.clear()
@@ -1480,6 +1698,140 @@ class TradingGUI(QMainWindow):
             self.backtest_results.setText(f"Error during backtest: {str(e)}")
             traceback.print_exc()
 
+    def backtest_params(self, strategy):
+        """Strategy parameters entered in the backtest tab"""
+        if strategy == "RSI":
+            return {
+                'length': int(self.backtest_rsi_length.text()),
+                'overbought': float(self.backtest_rsi_overbought.text()),
+                'oversold': float(self.backtest_rsi_oversold.text())
+            }
+        if strategy == "MACD":
+            return {
+                'fast': int(self.backtest_macd_fast.text()),
+                'slow': int(self.backtest_macd_slow.text()),
+                'signal': int(self.backtest_macd_signal.text())
+            }
+        return {}
+        
+    def run_sweep(self):
+        """Backtest a grid of strategy parameters in worker processes"""
+        if self.sweep_thread is not None and self.sweep_thread.isRunning():
+            return
+        try:
+            strategy = self.backtest_strategy_combo.currentText()
+            grid = parameter_sweep.parse_grid(self.sweep_grid_input.text())
+            if not grid:
+                raise ValueError("Enter at least one parameter, e.g. oversold=-70,-60")
+            combinations = len(parameter_sweep.parameter_grid(grid))
+            
+            self.sweep_thread = SweepThread(
+                self.trading_bot,
+                self.backtest_symbol_combo.currentText(),
+                self.backtest_interval_combo.currentText(),
+                int(self.from_date.dateTime().toSecsSinceEpoch() * 1000),
+                int(self.to_date.dateTime().toSecsSinceEpoch() * 1000),
+                strategy,
+                grid,
+                float(self.capital_input.text())
+            )
+            self.sweep_thread.signal_finished.connect(self.on_sweep_finished)
+            self.sweep_thread.signal_error.connect(self.on_sweep_error)
+            self.run_sweep_button.setEnabled(False)
+            self.backtest_results.setText(f"Running {combinations} {strategy} backtests...")
+            self.sweep_thread.start()
+            
+        except Exception as e:
+            self.backtest_results.setText(f"Error starting sweep: {str(e)}")
+            traceback.print_exc()
+            
+    def on_sweep_finished(self, results):
+        """Show the ranked sweep results"""
+        self.run_sweep_button.setEnabled(True)
+        if results is None or results.empty:
+            self.backtest_results.setText("No results for the selected period")
+            return
+        
+        self.show_results_table(results.head(100), "Rank")
+        
+        best = results.iloc[0]
+        self.backtest_results.setText(f"Sweep Results ({len(results)} combinations):\n"
+                                       f"Best Return: {best['total_return']:.2f}%\n"
+                                       f"Trades: {int(best['trades'])}\n"
+                                       f"Win Rate: {best['win_rate']:.2f}%\n"
+                                       f"Max Drawdown: {best['max_drawdown']:.2f}%")
+        
+    def on_sweep_error(self, message):
+        self.run_sweep_button.setEnabled(True)
+        self.backtest_results.setText(f"Error during sweep: {message}")
+        
+    def show_results_table(self, results, index_label):
+        """Fill the results table below the backtest chart with a DataFrame"""
+        self.results_table.setRowCount(len(results))
+        self.results_table.setColumnCount(len(results.columns) + 1)
+        self.results_table.setHorizontalHeaderLabels([index_label] + [str(c) for c in results.columns])
+        for row, label in enumerate(results.index):
+            self.results_table.setItem(row, 0, QTableWidgetItem(str(label)))
+        for column, name in enumerate(results.columns, start=1):
+            for row, value in enumerate(results[name].tolist()):
+                text = f"{value:.2f}" if isinstance(value, float) else str(value)
+                self.results_table.setItem(row, column, QTableWidgetItem(text))
+        self.results_table.resizeColumnsToContents()
+        self.results_table.show()
+        
+    def run_portfolio_backtest(self):
+        """Backtest the selected strategy on every USDT pair above the volume threshold"""
+        if self.portfolio_thread is not None and self.portfolio_thread.isRunning():
+            return
+        try:
+            strategy = self.backtest_strategy_combo.currentText()
+            min_volume = float(self.portfolio_volume_input.text())
+            self.portfolio_thread = PortfolioThread(
+                self.trading_bot,
+                min_volume,
+                self.backtest_interval_combo.currentText(),
+                int(self.from_date.dateTime().toSecsSinceEpoch() * 1000),
+                int(self.to_date.dateTime().toSecsSinceEpoch() * 1000),
+                strategy,
+                self.backtest_params(strategy),
+                float(self.capital_input.text())
+            )
+            self.portfolio_thread.signal_finished.connect(self.on_portfolio_finished)
+            self.portfolio_thread.signal_error.connect(self.on_portfolio_error)
+            self.run_portfolio_button.setEnabled(False)
+            self.backtest_results.setText(f"Running {strategy} on USDT pairs above {min_volume:,.0f} USDT volume...")
+            self.portfolio_thread.start()
+            
+        except Exception as e:
+            self.backtest_results.setText(f"Error starting portfolio backtest: {str(e)}")
+            traceback.print_exc()
+            
+    def on_portfolio_finished(self, stats, equity):
+        """Show per-symbol stats and the combined portfolio result"""
+        self.run_portfolio_button.setEnabled(True)
+        if stats is None or stats.empty:
+            self.backtest_results.setText("No data available for the selected symbols")
+            return
+        
+        self.show_results_table(stats, "Symbol")
+        
+        initial = equity.iloc[0]
+        drawdown = (1 - equity / equity.cummax()).max() * 100
+        self.backtest_results.setText(f"Portfolio Results ({len(stats)} symbols):\n"
+                                       f"Total Return: {(equity.iloc[-1] / initial - 1) * 100:.2f}%\n"
+                                       f"Final Value: {equity.iloc[-1]:.2f} USDT\n"
+                                       f"Max Drawdown: {drawdown:.2f}%\n"
+                                       f"Profitable Symbols: {(stats['total_return'] > 0).sum()}/{len(stats)}")
+        
+    def on_portfolio_error(self, message):
+        self.run_portfolio_button.setEnabled(True)
+        self.backtest_results.setText(f"Error during portfolio backtest: {message}")
+
+    def on_download_progress(self, done, total):
+        """Show kline download progress while a backtest fetches missing history"""
+        self.backtest_results.setText(f"Downloading historical data... {done}/{total} pages")
+        QApplication.processEvents()
+
     def on_coin_search_changed(self, text):
         """Handle coin search changes"""
         if text:
@@ -1488,14 +1840,14 @@ class TradingGUI(QMainWindow):
                 self.current_symbol = symbol
                 # Use existing trading bot instance
                 self.trading_bot.symbol = symbol
-                ticker = self.trading_bot.client.get_ticker(symbol=symbol)
+                ticker = self.trading_bot.market_hub.ticker(symbol)
                 
                 info = {
-                    'price': float(ticker['lastPrice']),
-                    'volume': float(ticker['volume']) * float(ticker['lastPrice']),
-                    'price_change': float(ticker['priceChangePercent']),
-                    'high': float(ticker['highPrice']),
-                    'low': float(ticker['lowPrice'])
+                    'price': ticker['price'],
+                    'volume': ticker['volume'],
+                    'price_change': ticker['change'],
+                    'high': ticker['high'],
+                    'low': ticker['low']
                 }
                 
                 # Update coin info display
@@ -1503,8 +1855,8 @@ class TradingGUI(QMainWindow):
                 
                 # Update chart with new symbol
                 try:
-                    data = self.trading_bot.get_recent_data(symbol=symbol, interval=self.current_interval, limit=100)
-                    wt1, wt2 = self.trading_bot.calculate_wave_trend(data)
+                    data = self.trading_bot.market_hub.candles(symbol, self.current_interval, 100)
+                    wt1, wt2 = self.trading_bot.calculate_wave_trend(data, symbol, self.current_interval)
                     self.chart_widget.update_chart(data, wt1, wt2)
                 except Exception as e:
                     print(f"Chart update error on symbol change: {e}")
@@ -1524,6 +1876,7 @@ class TradingGUI(QMainWindow):
         """Clean up when closing the application"""
         print("Closing application...")
         try:
+            # The threads use everything closed below, let them finish first
             if self.trading_thread:
                 print("Stopping trading thread...")
                 self.trading_thread.stop()
@@ -1532,6 +1885,12 @@ class TradingGUI(QMainWindow):
                 print("Stopping market thread...")
                 self.market_thread.stop()
                 self.market_thread.wait()
+            if getattr(self, 'strategy_registry', None) is not None:
+                self.strategy_registry.stop()
+            self.trading_bot.close_sandbox()
+            self.trading_bot.account.stop()
+            self.trading_bot.market_hub.stop()
+            self.trading_bot.exchange.close()
         except Exception as e:
             print(f"Error during cleanup: {e}")
         event.accept()
@@ -1539,34 +1898,27 @@ class TradingGUI(QMainWindow):
     def calculate_indicators(self, df):
         """Calculate technical indicators for a dataframe"""
         try:
-            # Convert index to integer to avoid warnings
-            df = df.copy()
-            df.reset_index(inplace=True, drop=True)
+            close = df['close'].values
             
             # RSI
-            rsi = df.ta.rsi(close='close', length=14)
-            if pd.isna(rsi.iloc[-1]):
+            rsi = StreamingRSI(14).seed(close)
+            if pd.isna(rsi):
                 return None, None, None, None, None
             
             # Moving Averages
-            sma20 = df.ta.sma(close='close', length=20)
-            sma50 = df.ta.sma(close='close', length=50)
+            sma20 = StreamingSMA(20).seed(close)
+            sma50 = StreamingSMA(50).seed(close)
             
-            if pd.isna(sma20.iloc[-1]) or pd.isna(sma50.iloc[-1]):
+            if pd.isna(sma20) or pd.isna(sma50):
                 return None, None, None, None, None
             
             # MACD
-            macd = df.ta.macd(close='close', fast=12, slow=26, signal=9)
-            if macd is None or macd.empty:
-                return None, None, None, None, None
-                
-            macd_val = macd[f'MACD_12_26_9'].iloc[-1]
-            macd_signal = macd[f'MACDs_12_26_9'].iloc[-1]
+            macd_val, macd_signal, _ = StreamingMACD(12, 26, 9).seed(close)
             
             if pd.isna(macd_val) or pd.isna(macd_signal):
                 return None, None, None, None, None
                 
-            return rsi.iloc[-1], sma20.iloc[-1], sma50.iloc[-1], macd_val, macd_signal
+            return rsi, sma20, sma50, macd_val, macd_signal
             
         except Exception as e:
             print(f"Error calculating indicators: {e}")
@@ -1735,7 +2087,7 @@ class TradingGUI(QMainWindow):
         editor_layout.addLayout(desc_layout)
         
         # Code editor
-        editor_label = QLabel("Strategy Code:")
+        editor_label = QLabel("Strategy Code (Python, or rules such as 'buy: rsi(14) < 30'):")
         self.strategy_editor = QTextEdit()
         self.strategy_editor.setFont(QFont("Courier", 10))
         self.strategy_editor.setPlaceholderText(
@@ -1789,23 +2141,15 @@ class TradingGUI(QMainWindow):
             if not os.path.exists("strategies"):
                 os.makedirs("strategies")
                 
-            # Load strategies
-            self.custom_strategies = {}
-            for file in os.listdir("strategies"):
-                if file.endswith(".py"):
-                    name = file[:-3]  # Remove .py extension
-                    with open(os.path.join("strategies", file), "r") as f:
-                        code = f.read()
-                        # Extract description from first line comment if exists
-                        desc = ""
-                        lines = code.split("\n")
-                        if lines and lines[0].startswith("#"):
-                            desc = lines[0][1:].strip()
-                        self.custom_strategies[name] = {
-                            "code": code,
-                            "description": desc
-                        }
-                        
+            # Compile every strategy once; later saves are reloaded by the watcher
+            self.strategy_registry = strategy_registry("strategies")
+            self.strategy_registry.refresh()
+            self.strategies_changed.connect(self.on_strategies_changed)
+            self.strategy_registry.watch(
+                lambda changed, removed: self.strategies_changed.emit(changed, removed)
+            )
+            self.custom_strategies = self.registry_strategies()
+            
             # Update strategy list
             self.update_strategy_list()
             
@@ -1816,12 +2160,41 @@ class TradingGUI(QMainWindow):
             print(f"Error loading custom strategies: {e}")
             traceback.print_exc()
             
+    def registry_strategies(self):
+        """Saved strategies as shown in the strategy tab, by name"""
+        strategies = {}
+        for name in sorted(self.strategy_registry.names()):
+            entry = self.strategy_registry.entries.get(name)
+            if entry is None:
+                continue
+            strategies[name] = {
+                "code": entry.source,
+                "description": entry.description,
+                "path": entry.path,
+                "error": entry.error
+            }
+        return strategies
+        
+    def on_strategies_changed(self, changed, removed):
+        """Show strategies that were saved, edited or deleted on disk"""
+        for name in changed:
+            entry = self.strategy_registry.entries.get(name)
+            if entry is not None and entry.error is None:
+                print(f"Reloaded strategy {name} (version {entry.version}, "
+                      f"{entry.load_seconds * 1000:.1f} ms)")
+        self.custom_strategies = self.registry_strategies()
+        self.update_strategy_list()
+        self.update_strategy_combos()
+        
     def update_strategy_list(self):
         """Update strategy list table"""
         self.strategy_list.setRowCount(len(self.custom_strategies))
         for i, (name, strategy) in enumerate(self.custom_strategies.items()):
             self.strategy_list.setItem(i, 0, QTableWidgetItem(name))
-            self.strategy_list.setItem(i, 1, QTableWidgetItem(strategy["description"]))
+            description = strategy["description"]
+            if strategy.get("error"):
+                description = f"{description} [load error: {strategy['error']}]".strip()
+            self.strategy_list.setItem(i, 1, QTableWidgetItem(description))
             
     def update_strategy_combos(self):
         """Update strategy selection combos"""
@@ -1832,6 +2205,8 @@ class TradingGUI(QMainWindow):
         # Update items
         strategies = ["Special", "RSI", "MACD"] + list(self.custom_strategies.keys())
         
+        # Refilling must not switch the live strategy back and forth
+        self.strategy_combo.blockSignals(True)
         self.strategy_combo.clear()
         self.strategy_combo.addItems(strategies)
         
@@ -1842,6 +2217,9 @@ class TradingGUI(QMainWindow):
         index = self.strategy_combo.findText(trading_strategy)
         if index >= 0:
             self.strategy_combo.setCurrentIndex(index)
+        self.strategy_combo.blockSignals(False)
+        if self.strategy_combo.currentText() != trading_strategy:
+            self.on_strategy_changed(self.strategy_combo.currentText())
             
         index = self.backtest_strategy_combo.findText(backtest_strategy)
         if index >= 0:
@@ -1887,28 +2265,38 @@ class TradingGUI(QMainWindow):
             if not code:
                 raise ValueError("Please enter strategy code")
                 
-            if "def custom_strategy" not in code:
-                raise ValueError("Strategy must contain 'custom_strategy' function")
+            if "def custom_strategy" in code or "def signals" in code:
+                extension = ".py"
+            else:
+                # Anything else must be buy:/sell: rules, which are never executed
+                strategy_rules.compile_rules(code)
+                extension = ".rule"
                 
             # Add description as comment if provided
             if desc:
                 code = f"# {desc}\n{code}"
                 
-            # Save to file
-            with open(os.path.join("strategies", f"{name}.py"), "w") as f:
+            # Save to file, replacing a saved strategy of the other kind
+            path = os.path.join("strategies", f"{name}{extension}")
+            previous = self.custom_strategies.get(name, {}).get("path")
+            with open(path, "w") as f:
                 f.write(code)
+            if previous and previous != path and os.path.exists(previous):
+                os.remove(previous)
                 
-            # Update strategies
-            self.custom_strategies[name] = {
-                "code": code,
-                "description": desc
-            }
+            # Compile now rather than on the next watcher poll; a strategy
+            # that fails keeps trading its previous version
+            entry = self.strategy_registry.entry(name)
+            self.custom_strategies = self.registry_strategies()
             
             # Update UI
             self.update_strategy_list()
             self.update_strategy_combos()
             
-            QMessageBox.information(self, "Success", "Strategy saved successfully!")
+            if entry.error:
+                QMessageBox.warning(self, "Error", f"Strategy saved but failed to load:\n{entry.error}")
+            else:
+                QMessageBox.information(self, "Success", "Strategy saved successfully!")
             
         except Exception as e:
             QMessageBox.warning(self, "Error", str(e))
@@ -1931,10 +2319,11 @@ class TradingGUI(QMainWindow):
             
             if reply == QMessageBox.Yes:
                 # Delete file
-                os.remove(os.path.join("strategies", f"{name}.py"))
+                os.remove(self.custom_strategies[name]["path"])
                 
                 # Remove from strategies
-                del self.custom_strategies[name]
+                self.strategy_registry.refresh()
+                self.custom_strategies = self.registry_strategies()
                 
                 # Update UI
                 self.update_strategy_list()
@@ -1959,234 +2348,50 @@ class TradingGUI(QMainWindow):
         self.delete_strategy_btn.setEnabled(True)
 
 class MarketUpdateThread(QThread):
-    signal_update = pyqtSignal(list)  # market data
-    signal_stats = pyqtSignal(dict)   # market stats
+    signal_update = pyqtSignal(list)   # market data, all listed pairs
+    signal_changes = pyqtSignal(list)  # market data of pairs that changed
+    signal_stats = pyqtSignal(dict)    # market stats
     
-    def __init__(self, bot):
+    def __init__(self, bot, refresh_interval=1, full_interval=10):
         super().__init__()
         print("Initializing MarketUpdateThread...")
         self.bot = bot
+        self.refresh_interval = refresh_interval
+        self.full_interval = full_interval
         self.is_running = True
-        
-    def process_ticker(self, ticker, symbols_data):
-        """Process a single ticker"""
-        try:
-            symbol = ticker['symbol']
-            if symbol not in symbols_data:
-                return None
-                
-            data = symbols_data[symbol]
-            price = float(ticker['lastPrice'])
-            volume = ticker['volume_usdt']
-            change = float(ticker['priceChangePercent'])
-            
-            # Calculate indicators
-            try:
-                wt1, wt2 = self.bot.calculate_wave_trend(data)
-                signal = self.bot.get_signal(wt1, wt2)
-                
-                rsi = data.ta.rsi(close='close', length=14).iloc[-1]
-                sma20 = data.ta.sma(close='close', length=20).iloc[-1]
-                
-                if pd.isna(rsi) or pd.isna(sma20):
-                    return None
-                    
-                if rsi > 50 and sma20 > data['close'].mean():
-                    trend = "BULLISH"
-                elif rsi < 50 and sma20 < data['close'].mean():
-                    trend = "BEARISH"
-                else:
-                    trend = "NEUTRAL"
-                    
-            except Exception as e:
-                print(f"Error calculating indicators for {symbol}: {e}")
-                signal = "N/A"
-                rsi = 50
-                trend = "NEUTRAL"
-            
-            return {
-                'symbol': symbol,
-                'price': price,
-                'change': change,
-                'high': float(ticker['highPrice']),
-                'low': float(ticker['lowPrice']),
-                'volume': volume,
-                'signal': signal,
-                'rsi': rsi,
-                'trend': trend
-            }
-            
-        except Exception as e:
-            print(f"Error processing {ticker['symbol']}: {e}")
-            return None
+        # Tickers and candles arrive over the hub's websocket streams, REST
+        # is only used once per pair to load its recent candles
+        self.feed = bot.market_hub.feed
+        
+    @staticmethod
+    def ready(rows):
+        """Rows whose indicators are past their warm-up"""
+        return [row for row in rows if not pd.isna(row['rsi'])]
 
     def run(self):
         print("MarketUpdateThread started running")
-        error_count = 0
+        self.feed.start()
+        last_full = None
         while self.is_running:
             try:
-                print("\nFetching market data...")
-                # Get market data
-                tickers = self.bot.client.get_ticker()
-                print(f"Got {len(tickers)} tickers")
-                
-                if not tickers:
-                    print("No tickers received!")
-                    raise ValueError("No market data available")
-                
-                # Prepare data structures
-                market_data = []
-                total_volume = 0
-                total_market_cap = 0
-                btc_price = 0
-                btc_market_cap = 0
-                eth_market_cap = 0
-                price_changes = []
-                volumes = {}
-                
-                # Filter USDT pairs and calculate volumes in one pass
-                high_volume_pairs = []
-                for t in tickers:
-                    try:
-                        if t['symbol'].endswith('USDT'):
-                            price = float(t['lastPrice'])
-                            volume = float(t['volume']) * price
-                            if volume > 5000000:  # 5M USDT minimum volume
-                                t['volume_usdt'] = volume
-                                high_volume_pairs.append(t)
-                                
-                                symbol = t['symbol']
-                                if symbol == 'BTCUSDT':
-                                    btc_price = price
-                                    btc_market_cap = volume
-                                elif symbol == 'ETHUSDT':
-                                    eth_market_cap = volume
-                    except Exception as e:
-                        print(f"Error processing ticker {t['symbol']}: {e}")
-                        continue
-                
-                print(f"Processing {len(high_volume_pairs)} high volume pairs...")
-                
-                # Process pairs in smaller batches
-                batch_size = 10
-                for i in range(0, len(high_volume_pairs), batch_size):
-                    batch = high_volume_pairs[i:i+batch_size]
-                    for ticker in batch:
-                        try:
-                            symbol = ticker['symbol']
-                            price = float(ticker['lastPrice'])
-                            volume = ticker['volume_usdt']
-                            change = float(ticker['priceChangePercent'])
-                            
-                            # Get recent data with fewer periods
-                            self.bot.symbol = symbol
-                            data = self.bot.get_recent_data(limit=20)
-                            
-                            if data is None or data.empty:
-                                print(f"No data received for {symbol}")
-                                continue
-                            
-                            # Calculate basic indicators
-                            try:
-                                rsi = data.ta.rsi(close='close', length=14).iloc[-1]
-                                sma20 = data.ta.sma(close='close', length=20).iloc[-1]
-                                
-                                if pd.isna(rsi) or pd.isna(sma20):
-                                    print(f"Invalid indicator values for {symbol}")
-                                    continue
-                                
-                                # Simplified trend calculation
-                                if rsi > 50 and data['close'].iloc[-1] > sma20:
-                                    trend = "BULLISH"
-                                elif rsi < 50 and data['close'].iloc[-1] < sma20:
-                                    trend = "BEARISH"
-                                else:
-                                    trend = "NEUTRAL"
-                                
-                                # Simplified signal based on RSI
-                                if rsi < 30:
-                                    signal = "BUY"
-                                elif rsi > 70:
-                                    signal = "SELL"
-                                else:
-                                    signal = "NEUTRAL"
-                                
-                                # Add to market data
-                                market_data.append({
-                                    'symbol': symbol,
-                                    'price': price,
-                                    'change': change,
-                                    'high': float(ticker['highPrice']),
-                                    'low': float(ticker['lowPrice']),
-                                    'volume': volume,
-                                    'signal': signal,
-                                    'rsi': rsi,
-                                    'trend': trend
-                                })
-                                
-                                total_volume += volume
-                                total_market_cap += volume
-                                price_changes.append((symbol, change))
-                                volumes[symbol] = volume
-                                
-                            except Exception as e:
-                                print(f"Error calculating indicators for {symbol}: {e}")
-                                continue
-                                
-                        except Exception as e:
-                            print(f"Error processing {symbol}: {e}")
-                            continue
-                    
-                    # Emit partial updates for better responsiveness
+                now = time.monotonic()
+                if last_full is None or now - last_full >= self.full_interval:
+                    # Periodic full pass keeps the table sorted by volume
+                    self.feed.changes()
+                    market_data = self.ready(self.feed.rows())
                     if market_data:
-                        print(f"Processed {len(market_data)} pairs successfully...")
-                        self.signal_update.emit(market_data.copy())
-                
-                if not market_data:
-                    print("No market data was processed successfully!")
-                    raise ValueError("Failed to process any market data")
-                
-                # Sort by volume
-                market_data.sort(key=lambda x: x['volume'], reverse=True)
-                
-                # Calculate stats
-                stats = {
-                    'total_volume': total_volume,
-                    'total_market_cap': total_market_cap,
-                    'btc_price': btc_price,
-                    'btc_market_cap': btc_market_cap,
-                    'eth_market_cap': eth_market_cap,
-                    'price_changes': price_changes,
-                    'volumes': volumes
-                }
-                
-                # Final update
-                print(f"Emitting final data for {len(market_data)} pairs...")
-                self.signal_update.emit(market_data)
-                self.signal_stats.emit(stats)
-                print("Market data update completed")
-                
-                # Reset error count on successful update
-                error_count = 0
-                
+                        market_data.sort(key=lambda x: x['volume'], reverse=True)
+                        self.signal_update.emit(market_data)
+                        self.signal_stats.emit(self.feed.stats(market_data))
+                        last_full = now
+                else:
+                    changes = self.ready(self.feed.changes())
+                    if changes:
+                        self.signal_changes.emit(changes)
             except Exception as e:
-                error_count += 1
                 print(f"Market update error: {e}")
                 traceback.print_exc()
-                
-                if error_count >= 3:
-                    print("Too many consecutive errors, stopping market updates")
-                    self.stop()
-                    break
-            
-            # Sleep for 30 seconds
-            print("Sleeping for 30 seconds...")
-            for i in range(30):
-                if not self.is_running:
-                    break
-                if i % 5 == 0:
-                    print(f"Next update in {30-i} seconds...")
-                self.sleep(1)
+            self.msleep(int(self.refresh_interval * 1000))
     
     def stop(self):
         print("Stopping MarketUpdateThread...")
@@ -2204,8 +2409,12 @@ def main():
         
         print("Showing main window...")
         window.show()
+        startup_timer.mark('window shown')
         print("Main window shown")
         
+        # Build the charts once the window is on screen
+        QTimer.singleShot(0, window.finish_startup)
+        
         print("Entering event loop...")
         sys.exit(app.exec_())
     except Exception as e:
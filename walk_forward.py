@@ -0,0 +1,196 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import backtest_engine
+from parameter_sweep import backtest_metrics, group_combinations, parameter_grid, price_matrix, run_tasks
+
+# Indicator columns computed by this process, keyed by (strategy, setting)
+# and valid for one prices array. Indicators only look back in time, so
+# one pass over the full history serves every window and later tasks with
+# the same setting reuse it.
+_indicator_cache = {}
+_INDICATOR_CACHE_SIZE = 4
+
+
+def walk_forward_windows(bars, train_bars, test_bars):
+    """Rolling train/test windows over `bars` candles
+
+    Windows advance by test_bars, so the test parts tile the history after
+    the first train window.
+
+    Returns:
+        list: (train_start, test_start, test_end) bar indices
+    """
+    if train_bars <= 0 or test_bars <= 0:
+        raise ValueError("Window lengths must be positive")
+
+    windows = []
+    train_start = 0
+    while train_start + train_bars < bars:
+        test_start = train_start + train_bars
+        windows.append((train_start, test_start, min(test_start + test_bars, bars)))
+        train_start += test_bars
+    return windows
+
+
+def _indicators(prices, strategy_type, indicator_params):
+    key = (strategy_type, tuple(sorted(indicator_params.items())))
+    cached = _indicator_cache.get(key)
+    if cached is not None and cached[0] is prices:
+        return cached[1]
+
+    if len(_indicator_cache) >= _INDICATOR_CACHE_SIZE:
+        _indicator_cache.pop(next(iter(_indicator_cache)))
+    high, low, close = prices
+    columns = backtest_engine.compute_indicators(strategy_type, high, low, close, indicator_params)
+    columns['close'] = close
+    _indicator_cache[key] = (prices, columns)
+    return columns
+
+
+def _window(columns, start, stop):
+    """Columns of bars start to stop after one lead-in bar, and the lead-in length
+
+    A crossover compares a bar with the one before it, so the first bar of
+    a window needs its predecessor to signal as in one continuous run.
+    """
+    lead_in = min(start, 1)
+    return {name: values[start - lead_in:stop] for name, values in columns.items()}, lead_in
+
+
+def fit_windows(prices, strategy_type, indicator_params, variants, windows, initial_capital, commission_fee, sort_by):
+    """Best threshold variant of one indicator setting in each train window
+
+    Returns:
+        list: (score, params, metrics) per window
+    """
+    columns = _indicators(prices, strategy_type, indicator_params)
+    best = []
+    for train_start, test_start, _ in windows:
+        train, lead_in = _window(columns, train_start, test_start)
+        fits = []
+        for thresholds in variants:
+            params = dict(indicator_params, **thresholds)
+            metrics, _ = backtest_metrics(train['close'], train, strategy_type, params, initial_capital,
+                                          commission_fee, lead_in)
+            fits.append((metrics[sort_by], params, metrics))
+        # First variant wins ties, as in the stable ranking of a sweep
+        best.append(max(fits, key=lambda fit: fit[0]))
+    return best
+
+
+def test_windows(prices, strategy_type, indicator_params, tests, commission_fee):
+    """Out-of-sample runs of the chosen parameters
+
+    Args:
+        tests (list): (window number, params, test_start, test_end)
+
+    Returns:
+        list: (window number, metrics, equity curve starting from 1.0)
+    """
+    columns = _indicators(prices, strategy_type, indicator_params)
+    results = []
+    for number, params, test_start, test_end in tests:
+        test, lead_in = _window(columns, test_start, test_end)
+        metrics, equity = backtest_metrics(test['close'], test, strategy_type, params, 1.0, commission_fee, lead_in)
+        results.append((number, metrics, equity))
+    return results
+
+
+def walk_forward(df, strategy_type, grid, train_bars, test_bars, processes=None,
+                 initial_capital=100000, commission_fee=0.001, sort_by='total_return', start_method=None):
+    """Walk-forward optimization of a built-in strategy
+
+    For every rolling window the grid is fitted on the train candles and
+    the best parameters are traded on the following test candles. The test
+    runs are chained into one out-of-sample equity curve; a position still
+    open at the end of a test window is carried over at its marked-to-market
+    value and the next window starts flat.
+
+    Args:
+        df (DataFrame): Candles with high, low and close columns
+        strategy_type (str): 'Special', 'RSI' or 'MACD'
+        grid (dict): Parameter name -> values, see parameter_sweep.sweep
+        train_bars (int): Candles in each in-sample window
+        test_bars (int): Candles in each out-of-sample window
+        processes (int): Worker processes, defaults to the CPU count
+        sort_by (str): In-sample metric that selects the parameters
+
+    Returns:
+        tuple: (windows, equity) where windows is a DataFrame with the
+            train/test ranges, chosen parameters and in/out-of-sample
+            returns, and equity is the stitched out-of-sample equity curve
+            indexed like df
+    """
+    if strategy_type not in backtest_engine.DEFAULT_PARAMS:
+        raise ValueError(f"Walk-forward supports {', '.join(backtest_engine.DEFAULT_PARAMS)}")
+
+    windows = walk_forward_windows(len(df), train_bars, test_bars)
+    if not windows:
+        raise ValueError(f"{len(df)} candles are not enough for a {train_bars} bar train window")
+
+    groups = group_combinations(strategy_type, parameter_grid(grid))
+    prices = price_matrix(df)
+    processes = processes or os.cpu_count() or 1
+
+    # Split the windows so there is enough work for every process while
+    # each task still reuses one indicator pass for all of its windows
+    pieces = max(1, min(len(windows), -(-processes * 2 // len(groups))))
+    size = -(-len(windows) // pieces)
+    spans = [(i, windows[i:i + size]) for i in range(0, len(windows), size)]
+
+    fit_tasks = []
+    fit_firsts = []
+    for key, variants in groups.items():
+        for first, span in spans:
+            fit_tasks.append((strategy_type, dict(key), variants, span, initial_capital, commission_fee, sort_by))
+            fit_firsts.append(first)
+    try:
+        fits = run_tasks(prices, fit_windows, fit_tasks, processes, start_method)
+
+        # Best setting per window across all indicator settings
+        chosen = [None] * len(windows)
+        for first, span_fits in zip(fit_firsts, fits):
+            for offset, fit in enumerate(span_fits):
+                current = chosen[first + offset]
+                if current is None or fit[0] > current[0]:
+                    chosen[first + offset] = fit
+
+        # Out-of-sample runs, grouped by indicator setting again
+        indicator_names = backtest_engine.INDICATOR_PARAMS[strategy_type]
+        test_groups = {}
+        for number, ((_, test_start, test_end), (_, params, _)) in enumerate(zip(windows, chosen)):
+            key = tuple((name, params[name]) for name in indicator_names)
+            test_groups.setdefault(key, []).append((number, params, test_start, test_end))
+        test_tasks = [(strategy_type, dict(key), tests, commission_fee) for key, tests in test_groups.items()]
+        tested = sorted(
+            (result for results in run_tasks(prices, test_windows, test_tasks, processes, start_method)
+             for result in results),
+            key=lambda result: result[0]
+        )
+    finally:
+        # Drop the arrays cached by in-process runs
+        _indicator_cache.clear()
+
+    # Chain the test windows, each one starts with the capital the previous ended with
+    rows = []
+    curve = []
+    capital = initial_capital
+    for (train_start, test_start, test_end), (_, params, fit_metrics), (_, metrics, equity) in zip(windows, chosen, tested):
+        curve.append(equity * capital)
+        capital *= equity[-1]
+        rows.append(dict(
+            params,
+            train_start=df.index[train_start],
+            test_start=df.index[test_start],
+            test_end=df.index[test_end - 1],
+            in_sample_return=fit_metrics['total_return'],
+            out_of_sample_return=metrics['total_return'],
+            out_of_sample_trades=metrics['trades']
+        ))
+
+    equity = np.concatenate(curve) if curve else np.empty(0)
+    start = windows[0][1]
+    return pd.DataFrame(rows), pd.Series(equity, index=df.index[start:start + len(equity)], name='equity')